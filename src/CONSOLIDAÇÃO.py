@@ -1,233 +1,226 @@
 from pathlib import Path
-from datetime import datetime
-import traceback
-import time
-
-# ============================================================
-# CONFIGURAÇÕES FIXAS (CONFORME ESPECIFICAÇÃO)
-# ============================================================
-
-SEPARADOR_FORTE = "=" * 80
-SEPARADOR_BLOCO = "-" * 80
-DELIMITADOR = "\n\n---\n\n"
-FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
-FORMATO_RUN = "%Y-%m-%d_%H-%M-%S"
-
-# ============================================================
-# INÍCIO
-# ============================================================
-
-inicio_execucao = datetime.now()
-timestamp_str = inicio_execucao.strftime(FORMATO_RUN)
-timestamp_humano = inicio_execucao.strftime(FORMATO_DATA)
-
-ROOT = Path(__file__).resolve().parent
-SCRIPT_PATH = Path(__file__).resolve()
-
-BASE_CONSOLIDACAO = ROOT / "códigos_consolidados"
-PASTA_LOGS = BASE_CONSOLIDACAO / "LOGS"
-PASTA_RUN = BASE_CONSOLIDACAO / f"RUN_{timestamp_str}"
-
-LOG_PATH = PASTA_LOGS / f"consolidacao_{timestamp_str}.log"
-ARQUIVO_CONSOLIDACAO_GERAL = PASTA_RUN / f"consolidacao_{timestamp_str}.txt"
-INDEX_PATH = PASTA_RUN / "INDEX.txt"
-
-# ============================================================
-# ESTRUTURAS DE CONTROLE
-# ============================================================
-
-erros_leitura = []
-mapa_por_pasta = {}          # { "KERNEL": [Path, Path, ...], "ROOT": [...] }
-tamanho_por_txt = {}        # { "KERNEL.txt": bytes }
-total_arquivos = 0
-total_bytes = 0
-
-# ============================================================
-# FUNÇÕES AUXILIARES
-# ============================================================
-
-def registrar_erro(path, exc):
-    erros_leitura.append((str(path), repr(exc)))
-
-def escrever_cabecalho_txt(out, nome_pasta, total_arquivos_txt):
-    out.write(f"ROOT: {ROOT}\n")
-    out.write(f"PASTA CONSOLIDADA: {nome_pasta}\n")
-    out.write(f"DATA DA CONSOLIDAÇÃO: {timestamp_humano}\n")
-    out.write(f"TOTAL DE ARQUIVOS: {total_arquivos_txt}\n\n")
-    out.write(SEPARADOR_FORTE + "\n\n")
-
-def escrever_cabecalho_bloco(out, caminho_arquivo):
-    stat = caminho_arquivo.stat()
-    modificado = datetime.fromtimestamp(stat.st_mtime).strftime(FORMATO_DATA)
-
-    # Determinar pasta origem imediata
+import argparse
+import sys
+
+from motor_consolidacao import DESTINOS, Fragmentador, Motor, WORKERS_PADRAO, base_comum
+
+"""
+CONSOLIDAÇÃO DOS .js EM ARQUIVOS .txt POR PASTA E GERAL
+-------------------------------------------------------
+Linha de comando do motor_consolidacao.py. Por padrão consolida a pasta
+onde este script está; --root aponta para outra pasta sem copiar o script.
+Com --root repetido (ex.: --root src --root scripts --root tests) as raízes
+saem numa única RUN_, uma seção por raiz, no códigos_consolidados da pasta
+comum a elas (que não pode ser a raiz do disco nem a pasta do usuário).
+--sem-pausa dispensa o "Pressione Enter" do final (automação).
+Os tempos por fase ficam em LOGS/consolidacao_<ts>.tempos.json; com
+CONSOLIDACAO_PERFIL=cprofile ou tracemalloc o perfil é gravado ao lado.
+"""
+
+# ============================================================
+# ARGUMENTOS DE LINHA DE COMANDO
+# ============================================================
+
+parser = argparse.ArgumentParser(
+    description="Consolida os .js da pasta do script em arquivos .txt por pasta e geral."
+)
+parser.add_argument(
+    "comando", nargs="?", default="consolidar", choices=("consolidar", "materializar", "gc", "diff"),
+    help="consolidar (padrão); materializar RUN_... gera as saídas de uma execução --blobs; "
+         "gc apaga blobs que nenhuma RUN_ existente referencia; "
+         "diff RUN_a RUN_b mostra o diff unificado só dos arquivos que mudaram",
+)
+parser.add_argument("alvos", nargs="*", help="pastas RUN_ usadas por materializar e diff")
+parser.add_argument(
+    "--root", type=Path, action="append",
+    help="pasta a consolidar (padrão: a pasta deste script); repita para várias raízes numa só execução",
+)
+parser.add_argument(
+    "--workers", type=int, default=WORKERS_PADRAO,
+    help=f"threads de leitura (1 = sequencial; padrão: {WORKERS_PADRAO})",
+)
+parser.add_argument(
+    "--comprimir", action="store_true",
+    help="grava as saídas como .txt.gz com um frame gzip por bloco (extração continua seletiva)",
+)
+parser.add_argument(
+    "--blobs", action="store_true",
+    help="guarda o conteúdo em blobs por hash; a RUN_ recebe só o MANIFEST.json (ver materializar)",
+)
+parser.add_argument(
+    "--shards", type=int, metavar="TOKENS",
+    help="também divide a consolidação em SHARDS/shard_NNN.txt de até TOKENS tokens estimados "
+         "(mínimo: o cabeçalho do shard mais 256 tokens de conteúdo)",
+)
+parser.add_argument(
+    "--tamanho-maximo", type=int, metavar="BYTES",
+    help="pula (sem ler) arquivos maiores que BYTES",
+)
+parser.add_argument(
+    "--sem-triagem", action="store_true",
+    help="não pula binários, UTF-8 inválido e minificados pela amostra inicial (lê tudo, como antes)",
+)
+parser.add_argument(
+    "--compacto", action="store_true",
+    help="remove comentários, linhas vazias e espaços repetidos (fora de strings e regex); "
+         "as linhas originais ficam em MAPA_LINHAS.json",
+)
+parser.add_argument(
+    "--dedup", action="store_true",
+    help="arquivo com conteúdo idêntico a um já emitido vira só um bloco SAME_AS: <primeiro caminho>",
+)
+parser.add_argument(
+    "--git", action="store_true",
+    help="lista os arquivos pelo índice do git (git ls-files) em vez de varrer a árvore e "
+         "relê só o que mudou desde o commit da execução anterior (git diff)",
+)
+parser.add_argument(
+    "--nao-rastreados", action="store_true",
+    help="no --git, inclui também os arquivos não rastreados e não ignorados",
+)
+parser.add_argument(
+    "--historico-git", action="store_true",
+    help="acrescenta ao cabeçalho de cada arquivo o último commit, a data do autor e o número "
+         "de commits (um único git log para a árvore toda)",
+)
+parser.add_argument(
+    "--destinos", default="", metavar="LISTA",
+    help=f"saídas extras geradas na mesma leitura, separadas por vírgula: {', '.join(DESTINOS)} "
+         "(copia = copiar_com_cabecalho_e_log.py, unico = TUDO.py)",
+)
+parser.add_argument(
+    "--watch", action="store_true",
+    help="após consolidar, continua observando a árvore e atualiza só as pastas alteradas",
+)
+parser.add_argument(
+    "--polling", action="store_true",
+    help="no --watch, usa varredura periódica em vez do inotify",
+)
+parser.add_argument(
+    "--sem-pausa", action="store_true",
+    help="não espera Enter no final",
+)
+
+# ============================================================
+# EXECUÇÃO
+# ============================================================
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+
+    if args.watch and args.blobs:
+        parser.error("--watch não pode ser combinado com --blobs")
+    if args.watch and args.shards is not None:
+        parser.error("--watch não pode ser combinado com --shards (os SHARDS não são refeitos a cada mudança)")
+
+    if args.nao_rastreados and not args.git:
+        parser.error("--nao-rastreados só vale com --git")
+    if args.git and args.watch:
+        parser.error("--git não pode ser combinado com --watch")
+    if args.historico_git and args.watch:
+        parser.error("--historico-git não pode ser combinado com --watch")
+    for opcao in ("dedup", "compacto"):
+        if getattr(args, opcao) and (args.blobs or args.watch):
+            parser.error(f"--{opcao} não pode ser combinado com --blobs nem com --watch")
+
+    destinos = [d.strip() for d in args.destinos.split(",") if d.strip()]
+    desconhecidos = [d for d in destinos if d not in DESTINOS]
+    if desconhecidos:
+        parser.error(f"destinos desconhecidos: {', '.join(desconhecidos)} (use {', '.join(DESTINOS)})")
+    if destinos and (args.blobs or args.watch):
+        parser.error("--destinos não pode ser combinado com --blobs nem com --watch")
+
+    SCRIPT_PATH = Path(__file__).resolve()
+    raizes = args.root or [SCRIPT_PATH.parent]
+    if len(raizes) > 1 and args.watch:
+        parser.error("--watch só aceita um --root")
     try:
-        parte = caminho_arquivo.relative_to(ROOT).parts
-        if len(parte) > 1:
-            pasta_origem = parte[0]
-        else:
-            pasta_origem = "ROOT"
-    except Exception:
-        pasta_origem = "ROOT"
-
-    out.write(f"FILE: {caminho_arquivo}\n")
-    out.write(f"PASTA_ORIGEM: {pasta_origem}\n")
-    out.write(f"TAMANHO: {stat.st_size} bytes\n")
-    out.write(f"MODIFICADO_EM: {modificado}\n\n")
-    out.write(SEPARADOR_BLOCO + "\n")
-
-# ============================================================
-# PREPARAÇÃO DE DIRETÓRIOS
-# ============================================================
-
-BASE_CONSOLIDACAO.mkdir(exist_ok=True)
-PASTA_LOGS.mkdir(exist_ok=True)
-PASTA_RUN.mkdir(exist_ok=True)
-
-# ============================================================
-# VARREDURA GLOBAL DOS .js
-# ============================================================
-
-for caminho in ROOT.rglob("*.js"):
-
-    # Exclusões explícitas
-    if caminho == SCRIPT_PATH:
-        continue
-
-    if BASE_CONSOLIDACAO in caminho.parents:
-        continue
-
-    try:
-        relativo = caminho.relative_to(ROOT)
-    except Exception:
-        continue
-
-    partes = relativo.parts
-
-    if len(partes) == 1:
-        pasta_chave = "ROOT"
-    else:
-        pasta_chave = partes[0]
-
-    mapa_por_pasta.setdefault(pasta_chave, []).append(caminho)
-
-# ============================================================
-# PROCESSAMENTO POR PASTA
-# ============================================================
-
-for pasta in sorted(mapa_por_pasta.keys()):
-    arquivos = sorted(mapa_por_pasta[pasta], key=lambda p: str(p.relative_to(ROOT)))
-    nome_txt = f"{pasta}.txt"
-    path_txt = PASTA_RUN / nome_txt
-
-    bytes_txt = 0
-    arquivos_validos = []
-
-    # Primeiro: filtrar arquivos válidos
-    for arquivo in arquivos:
-        try:
-            _ = arquivo.read_text(encoding="utf-8")
-            arquivos_validos.append(arquivo)
-        except Exception as e:
-            registrar_erro(arquivo, e)
-
-    with open(path_txt, "w", encoding="utf-8") as out:
-        escrever_cabecalho_txt(out, pasta, len(arquivos_validos))
-
-        primeiro = True
-        for arquivo in arquivos_validos:
-            if not primeiro:
-                out.write(DELIMITADOR)
-
-            escrever_cabecalho_bloco(out, arquivo)
+        ROOT = (raizes[0] if len(raizes) == 1 else base_comum(raizes)).resolve()
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.shards is not None:
+        minimo = Fragmentador.orcamento_minimo(ROOT)
+        if args.shards < minimo:
+            parser.error(f"--shards precisa de ao menos {minimo} tokens (cabeçalho do shard + conteúdo)")
+
+    opcoes = {
+        "comprimir": args.comprimir,
+        "blobs": args.blobs,
+        "shards": args.shards,
+        "excluir": [SCRIPT_PATH],
+        "git": args.git,
+        "nao_rastreados": args.nao_rastreados,
+        "historico_git": args.historico_git,
+        "dedup": args.dedup,
+        "compacto": args.compacto,
+        "triagem": not args.sem_triagem,
+        "tamanho_maximo": args.tamanho_maximo,
+    }
+    if len(raizes) > 1:
+        opcoes["raizes"] = raizes
+
+    with Motor(workers=args.workers) as motor:
+
+        if args.comando == "materializar":
+            if not args.alvos:
+                parser.error("materializar precisa de ao menos uma pasta RUN_")
+
+            erros = False
+            for resultado in motor.materializar(ROOT, args.alvos, **opcoes):
+                print(f"✔ {resultado['run']}: {resultado['total_arquivos']} arquivos materializados")
+                erros = erros or bool(resultado["erros_leitura"])
+
+            sys.exit(1 if erros else 0)
+
+        if args.comando == "diff":
+            if len(args.alvos) != 2:
+                parser.error("diff precisa de exatamente duas pastas RUN_")
 
             try:
-                conteudo = arquivo.read_text(encoding="utf-8")
-            except Exception as e:
-                registrar_erro(arquivo, e)
-                continue
-
-            out.write(conteudo)
-            bytes_txt += len(conteudo.encode("utf-8"))
-            primeiro = False
-
-    tamanho_por_txt[nome_txt] = bytes_txt
-    total_arquivos += len(arquivos_validos)
-    total_bytes += bytes_txt
-
-# ============================================================
-# GERAR INDEX.txt
-# ============================================================
-
-with open(INDEX_PATH, "w", encoding="utf-8") as idx:
-    idx.write(f"ROOT: {ROOT}\n")
-    idx.write(f"DATA: {timestamp_humano}\n\n")
-
-    for nome_txt in sorted(tamanho_por_txt.keys()):
-        qt = len(mapa_por_pasta.get(nome_txt.replace(".txt", ""), []))
-        tamanho = tamanho_por_txt[nome_txt]
-        idx.write(f"{nome_txt:<12} — {qt} arquivos — {tamanho} bytes\n")
-
-    idx.write("\nTOTAL GERAL:\n")
-    idx.write(f"- Arquivos: {total_arquivos}\n")
-    idx.write(f"- Tamanho: {total_bytes} bytes\n")
-
-# ============================================================
-# GERAR CONSOLIDAÇÃO GERAL
-# ============================================================
-
-with open(ARQUIVO_CONSOLIDACAO_GERAL, "w", encoding="utf-8") as geral:
-    geral.write(f"ROOT: {ROOT}\n")
-    geral.write(f"DATA DA CONSOLIDAÇÃO: {timestamp_humano}\n\n")
-    geral.write(SEPARADOR_FORTE + "\n\n")
-
-    for nome_txt in sorted(tamanho_por_txt.keys()):
-        path_txt = PASTA_RUN / nome_txt
-        geral.write(f"\n\n### INÍCIO DE {nome_txt} ###\n\n")
-        geral.write(path_txt.read_text(encoding="utf-8"))
-
-# ============================================================
-# GERAR LOG
-# ============================================================
-
-fim_execucao = datetime.now()
-duracao = (fim_execucao - inicio_execucao).total_seconds()
-
-with open(LOG_PATH, "w", encoding="utf-8") as log:
-    log.write(f"DATA_INICIO: {timestamp_humano}\n")
-    log.write(f"ROOT: {ROOT}\n\n")
-
-    log.write(f"PASTAS_ENCONTRADAS: {len(mapa_por_pasta)}\n")
-    log.write(f"TOTAL_ARQUIVOS_JS: {total_arquivos}\n\n")
-
-    log.write("POR_PASTA:\n")
-    for pasta in sorted(mapa_por_pasta.keys()):
-        qtd = len(mapa_por_pasta[pasta])
-        log.write(f"- {pasta}: {qtd} arquivos\n")
+                contagem = motor.diff(ROOT, args.alvos[0], args.alvos[1], sys.stdout)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"❌ {e}", file=sys.stderr)
+                sys.exit(2)
+
+            print(
+                f"✔ {contagem['alterados']} alterados, {contagem['adicionados']} adicionados, "
+                f"{contagem['removidos']} removidos, {contagem['identicos']} idênticos (não lidos)",
+                file=sys.stderr,
+            )
+            # Como o diff(1): 1 quando há diferenças
+            sys.exit(1 if contagem["alterados"] + contagem["adicionados"] + contagem["removidos"] else 0)
+
+        if args.comando == "gc":
+            resultado = motor.coletar_lixo(ROOT)
+            print(f"✔ Blobs apagados: {resultado['blobs_apagados']} ({resultado['bytes_liberados']} bytes liberados)")
+            sys.exit(0)
 
-    log.write("\nERROS_DE_LEITURA:\n")
-    if erros_leitura:
-        for caminho, erro in erros_leitura:
-            log.write(f"- {caminho} → {erro}\n")
-    else:
-        log.write("Nenhum erro de leitura.\n")
-
-    log.write("\nARQUIVOS_GERADOS:\n")
-    for nome_txt in sorted(tamanho_por_txt.keys()):
-        log.write(f"- {nome_txt}\n")
-
-    log.write(f"- INDEX.txt\n")
-    log.write(f"- {ARQUIVO_CONSOLIDACAO_GERAL.name}\n\n")
-
-    log.write(f"DATA_FIM: {fim_execucao.strftime(FORMATO_DATA)}\n")
-    log.write(f"DURACAO: {duracao:.2f} segundos\n")
-
-# ============================================================
-# FINAL
-# ============================================================
-
-print("✔ Consolidação concluída com sucesso.")
-print(f"📁 Pasta gerada: {PASTA_RUN}")
-print(f"📄 Log: {LOG_PATH}")
-
-input("\nPressione Enter para fechar...")
+        try:
+            execucao = motor.nova_consolidacao(ROOT, destinos=destinos, **opcoes)
+            stats = execucao.executar()
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(2)
+
+        # ============================================================
+        # FINAL
+        # ============================================================
+
+        print("✔ Consolidação concluída com sucesso.")
+        print(f"📁 Pasta gerada: {stats['pasta_run']}")
+        print(f"📄 Log: {stats['log']}")
+        print(f"⏱ Tempos: {stats['relatorio_tempos']}")
+        if stats["ignorados"]:
+            motivos = ", ".join(f"{m}={n}" for m, n in sorted(stats["ignorados_por_motivo"].items()))
+            print(f"⚠ Arquivos ignorados: {len(stats['ignorados'])} ({motivos})")
+        for nome, resumo in stats["destinos"].items():
+            print(f"➕ {nome}: {resumo['saida']} ({resumo['arquivos']} arquivos)")
+
+        if args.watch:
+            execucao.observar(polling=args.polling, avisar=lambda mensagem: print(mensagem, flush=True))
+        elif not args.sem_pausa:
+            input("\nPressione Enter para fechar...")
+
+if __name__ == "__main__":
+    main()
@@ -1,213 +1,115 @@
 from pathlib import Path
-from datetime import datetime
+import argparse
+
+from motor_consolidacao import PACOTES, Motor, WORKERS_PADRAO
+
+"""
+CÓPIA ACHATADA DOS .js COM CABEÇALHO, INDEX E LOG
+-------------------------------------------------
+Linha de comando do Motor.copiar_com_cabecalho (motor_consolidacao.py).
+Por padrão copia a partir da pasta onde este script está; --root aponta
+para outra pasta e --sem-pausa dispensa o "Pressione Enter" do final.
+Os nomes achatados ficam em códigos_consolidados/nomes_copia.json e se
+repetem de uma RUN_ para a outra; sem nenhum .js alterado, nada é gravado
+(--forcar grava uma RUN_ nova mesmo assim). Com --espelho, em vez de uma
+RUN_ por execução, mantém um único espelho em códigos_consolidados/ESPELHO
+e só grava o que mudou. --pacote zip|tar grava a RUN_ como um único
+COPIA.zip / COPIA.tar.gz (INDEX.txt dentro), sem milhares de arquivos soltos.
+Leituras e gravações rodam em --workers threads; o progresso sai a uma taxa
+fixa e o final mostra arquivos/s, MB/s e a latência p95 por arquivo.
+"""
 
 # ============================================================
-# CONFIGURAÇÕES
+# ARGUMENTOS DE LINHA DE COMANDO
 # ============================================================
 
-FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
-FORMATO_RUN = "%Y-%m-%d_%H-%M-%S"
-SEPARADOR = "-" * 80
+parser = argparse.ArgumentParser(
+    description="Copia cada .js para RUN_<timestamp>/<pasta de topo>/ com cabeçalho de origem."
+)
+parser.add_argument(
+    "--root", type=Path,
+    help="pasta a copiar (padrão: a pasta deste script)",
+)
+parser.add_argument(
+    "--workers", type=int, default=WORKERS_PADRAO,
+    help=f"threads de leitura e gravação (padrão: {WORKERS_PADRAO}; 1 = sequencial)",
+)
+parser.add_argument(
+    "--espelho", action="store_true",
+    help="atualiza o espelho persistente (ESPELHO/): reescreve só os .js alterados e apaga os removidos",
+)
+parser.add_argument(
+    "--pacote", choices=tuple(PACOTES),
+    help="grava a cópia achatada num único COPIA.zip ou COPIA.tar.gz, com o INDEX.txt dentro",
+)
+parser.add_argument(
+    "--forcar", action="store_true",
+    help="grava uma RUN_ nova mesmo que nenhum .js tenha mudado desde a última",
+)
+parser.add_argument(
+    "--sem-pausa", action="store_true",
+    help="não espera Enter no final",
+)
 
 # ============================================================
-# INÍCIO
+# EXECUÇÃO
 # ============================================================
 
-inicio = datetime.now()
-timestamp_run = inicio.strftime(FORMATO_RUN)
-timestamp_humano = inicio.strftime(FORMATO_DATA)
-
-ROOT = Path(__file__).resolve().parent
-SCRIPT_PATH = Path(__file__).resolve()
-
-BASE_CONSOLIDACAO = ROOT / "códigos_consolidados"
-PASTA_RUN = BASE_CONSOLIDACAO / f"RUN_{timestamp_run}"
-
-LOG_PATH = PASTA_RUN / f"LOG_{timestamp_run}.txt"
-INDEX_PATH = PASTA_RUN / "INDEX.txt"
-
-BASE_CONSOLIDACAO.mkdir(exist_ok=True)
-PASTA_RUN.mkdir(exist_ok=True)
-
-print(f"Root: {ROOT}")
-print(f"Pasta de saída: {PASTA_RUN}")
-
-erros = []
-renomeacoes = []
-arquivos_index = []
-arquivos_copiados = 0
-
-# ============================================================
-# VARREDURA APENAS DE .js
-# ============================================================
-
-arquivos_encontrados = list(ROOT.rglob("*.js"))
-print(f"Arquivos .js encontrados no total: {len(arquivos_encontrados)}")
-
-for caminho in arquivos_encontrados:
-
-    # Excluir o próprio script
-    if caminho == SCRIPT_PATH:
-        continue
-
-    # Excluir tudo dentro de códigos_consolidados
-    if BASE_CONSOLIDACAO in caminho.parents:
-        continue
-
-    try:
-        relativo = caminho.relative_to(ROOT)
-    except Exception:
-        continue
-
-    partes = relativo.parts
-
-    # Determinar pasta de primeiro nível
-    if len(partes) == 1:
-        pasta_chave = "ROOT"
-        base_origem = ROOT
-    else:
-        pasta_chave = partes[0]
-        base_origem = ROOT / pasta_chave
-
-    # Pasta de destino achatada
-    pasta_destino = PASTA_RUN / pasta_chave
-    pasta_destino.mkdir(parents=True, exist_ok=True)
-
-    # 1. Tentar usar SEMPRE o nome original primeiro
-    destino = pasta_destino / caminho.name
-
-    nome_final = caminho.name
-    renomeado = False
-
-    # 2. Se houver colisão, renomear usando subpasta
-    if destino.exists():
-        try:
-            relativo_base = caminho.relative_to(base_origem)
-            partes_rel = relativo_base.parts
-
-            if len(partes_rel) > 1:
-                subpasta = partes_rel[-2]
-                stem = caminho.stem
-                suffix = caminho.suffix
-                nome_final = f"{stem}__{subpasta}{suffix}"
-            else:
-                # Arquivo direto na pasta base, usar contador
-                nome_final = f"{caminho.stem}__1{caminho.suffix}"
-
-        except Exception:
-            nome_final = f"{caminho.stem}__1{caminho.suffix}"
-
-        destino = pasta_destino / nome_final
-        renomeado = True
-
-    # 3. Se ainda colidir, adicionar contador incremental
-    contador = 1
-    while destino.exists():
-        stem = caminho.stem
-        suffix = caminho.suffix
-        nome_final = f"{stem}__{contador}{suffix}"
-        destino = pasta_destino / nome_final
-        contador += 1
-        renomeado = True
-
-    if renomeado:
-        renomeacoes.append((str(caminho), str(destino)))
-
-    print(f"Copiando: {caminho} -> {destino.relative_to(PASTA_RUN)}")
-
-    # Ler conteúdo
-    try:
-        conteudo = caminho.read_text(encoding="utf-8")
-    except Exception as e:
-        erros.append((str(caminho), repr(e)))
-        continue
-
-    # Cabeçalho
-    cabecalho = []
-    cabecalho.append(f"FILE_ORIGINAL: {caminho}")
-    cabecalho.append(f"PASTA_BASE: {pasta_chave}")
-    cabecalho.append(f"DATA_DA_EXTRACAO: {timestamp_humano}")
-    cabecalho.append(SEPARADOR)
-    cabecalho_texto = "\n".join(cabecalho) + "\n\n"
-
-    try:
-        with open(destino, "w", encoding="utf-8") as out:
-            out.write(cabecalho_texto)
-            out.write(conteudo)
-
-        tamanho = destino.stat().st_size
-        arquivos_index.append(
-            (str(destino.relative_to(PASTA_RUN)), tamanho, str(caminho))
+def main(argv=None):
+    args = parser.parse_args(argv)
+
+    SCRIPT_PATH = Path(__file__).resolve()
+    ROOT = (args.root or SCRIPT_PATH.parent).resolve()
+
+    if args.espelho and (args.forcar or args.pacote):
+        parser.error("--forcar e --pacote não se aplicam ao --espelho")
+
+    with Motor(workers=args.workers) as motor:
+        if args.espelho:
+            resultado = motor.espelhar(ROOT, excluir=[SCRIPT_PATH], avisar=print)
+        else:
+            resultado = motor.copiar_com_cabecalho(
+                ROOT, excluir=[SCRIPT_PATH], avisar=print, forcar=args.forcar, pacote=args.pacote
+            )
+
+    # ============================================================
+    # FINAL
+    # ============================================================
+
+    print("\n=== RESULTADO ===")
+    if args.espelho:
+        print(
+            f"Espelho: {resultado['arquivos']} arquivos — {resultado['novos']} novos, "
+            f"{resultado['reescritos']} reescritos, {len(resultado['removidos'])} removidos, "
+            f"{resultado['inalterados'] + resultado['conferidos']} intactos"
         )
-        arquivos_copiados += 1
-
-    except Exception as e:
-        erros.append((str(caminho), repr(e)))
-        continue
-
-# ============================================================
-# GERAR INDEX.txt
-# ============================================================
-
-total_bytes = sum(t for _, t, _ in arquivos_index)
-
-with open(INDEX_PATH, "w", encoding="utf-8") as idx:
-    idx.write(f"ROOT: {ROOT}\n")
-    idx.write(f"DATA_DA_EXTRACAO: {timestamp_humano}\n\n")
-
-    for destino_rel, tamanho, origem in sorted(arquivos_index):
-        idx.write(f"{destino_rel} — {tamanho} bytes\n")
-        idx.write(f"    ORIGEM: {origem}\n")
-
-    idx.write("\nTOTAL:\n")
-    idx.write(f"- Arquivos: {len(arquivos_index)}\n")
-    idx.write(f"- Tamanho total: {total_bytes} bytes\n")
-
-# ============================================================
-# GERAR LOG
-# ============================================================
-
-fim = datetime.now()
-duracao = (fim - inicio).total_seconds()
-
-with open(LOG_PATH, "w", encoding="utf-8") as log:
-    log.write(f"DATA_INICIO: {timestamp_humano}\n")
-    log.write(f"ROOT: {ROOT}\n\n")
-
-    log.write(f"ARQUIVOS_JS_COPIADOS: {arquivos_copiados}\n\n")
-
-    log.write("RENOMEACOES_AUTOMATICAS:\n")
-    if renomeacoes:
-        for origem, destino in renomeacoes:
-            log.write(f"- {origem} -> {destino}\n")
+        print(f"Pasta do espelho: {resultado['pasta_espelho']}")
     else:
-        log.write("Nenhuma renomeação foi necessária.\n")
-
-    log.write("\nERROS:\n")
-    if erros:
-        for caminho, erro in erros:
-            log.write(f"- {caminho} → {erro}\n")
+        if resultado["sem_alteracoes"]:
+            print("Nenhum .js mudou: a última RUN continua válida (use --forcar para gravar outra).")
+        else:
+            print(f"Arquivos .js copiados: {resultado['arquivos_copiados']} ({resultado['nomes_novos']} nomes novos)")
+            vazao = resultado["vazao"]
+            print(
+                f"Vazão: {vazao['arquivos_por_segundo']} arquivos/s, {vazao['mb_por_segundo']} MB/s, "
+                f"p95 {vazao['p95_ms']} ms por arquivo ({vazao['workers']} workers)"
+            )
+        print(f"Pasta RUN: {resultado['pasta_run']}")
+    if args.pacote:
+        print(f"PACOTE: {resultado['pacote']} (INDEX.txt dentro)")
     else:
-        log.write("Nenhum erro.\n")
-
-    log.write(f"\nDATA_FIM: {fim.strftime(FORMATO_DATA)}\n")
-    log.write(f"DURACAO: {duracao:.2f} segundos\n")
-
-# ============================================================
-# FINAL
-# ============================================================
+        print(f"INDEX: {resultado['index']}")
+    print(f"LOG: {resultado['log']}")
 
-print("\n=== RESULTADO ===")
-print(f"Arquivos .js copiados: {arquivos_copiados}")
-print(f"Pasta RUN: {PASTA_RUN}")
-print(f"INDEX: {INDEX_PATH}")
-print(f"LOG: {LOG_PATH}")
+    if resultado["renomeacoes"]:
+        print("\nHouve renomeações automáticas apenas onde houve colisão de nomes.")
 
-if renomeacoes:
-    print("\nHouve renomeações automáticas apenas onde houve colisão de nomes.")
+    if resultado["erros"]:
+        print("\nHouve erros. Verifique o LOG.")
 
-if erros:
-    print("\nHouve erros. Verifique o LOG.")
+    print("\nConcluído.")
+    if not args.sem_pausa:
+        input("\nPressione Enter para fechar...")
 
-print("\nConcluído.")
-input("\nPressione Enter para fechar...")
+if __name__ == "__main__":
+    main()
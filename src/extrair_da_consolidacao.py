@@ -0,0 +1,133 @@
+from pathlib import Path
+import argparse
+import json
+import mmap
+import sys
+import zlib
+
+"""
+EXTRATOR DE ARQUIVOS DE UMA CONSOLIDAÇÃO
+----------------------------------------
+Usa o INDEX.json gerado por CONSOLIDAÇÃO.py em cada RUN_<timestamp> para
+devolver o conteúdo de um único arquivo sem ler o resto da saída: o .txt é
+mapeado em memória (mmap) e só o trecho do bloco é copiado. Em execuções
+com --comprimir só o frame gzip do próprio bloco é descomprimido. Em
+execuções com --dedup, arquivos repetidos são lidos do bloco do primeiro.
+
+Uso: python extrair_da_consolidacao.py <RUN_...> <caminho> [--txt] [--bloco]
+"""
+
+# ============================================================
+# CONFIGURAÇÕES
+# ============================================================
+
+NOME_INDEX = "INDEX.json"
+VERSOES_INDEX = (1, 2, 3)
+
+# ============================================================
+# EXTRATOR
+# ============================================================
+
+class ExtratorConsolidacao:
+    """
+    Mantém o índice e os mmaps abertos entre consultas, de modo que cada
+    extração custa apenas a cópia do próprio trecho.
+    """
+
+    def __init__(self, pasta_run):
+        self.pasta_run = Path(pasta_run)
+        dados = json.loads((self.pasta_run / NOME_INDEX).read_text(encoding="utf-8"))
+
+        if dados.get("versao") not in VERSOES_INDEX:
+            raise ValueError(f"Versão de índice não suportada: {dados.get('versao')}")
+
+        self.root = Path(dados["root"])
+        self.sufixo = ".gz" if dados.get("comprimido") else ""
+        self.geral = dados["geral"]
+        self.arquivos = dados["arquivos"]
+        self._mapas = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def fechar(self):
+        for arquivo, mapa in self._mapas.values():
+            mapa.close()
+            arquivo.close()
+        self._mapas.clear()
+
+    def _mapa(self, nome_saida):
+        if nome_saida not in self._mapas:
+            arquivo = open(self.pasta_run / nome_saida, "rb")
+            mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapas[nome_saida] = (arquivo, mapa)
+        return self._mapas[nome_saida][1]
+
+    def chave(self, caminho):
+        """Aceita o caminho relativo ao ROOT ou o caminho absoluto do FILE:."""
+        caminho = Path(caminho)
+        if caminho.is_absolute():
+            try:
+                caminho = caminho.relative_to(self.root)
+            except ValueError:
+                pass
+        return caminho.as_posix()
+
+    def extrair_bytes(self, caminho, usar_txt=False, bloco=False):
+        entrada = self.arquivos.get(self.chave(caminho))
+        if entrada is None:
+            raise KeyError(f"Arquivo não consta no índice: {caminho}")
+
+        if not bloco and "mesmo_que" in entrada:
+            # Execução --dedup: o bloco só diz SAME_AS; o conteúdo está no primeiro
+            entrada = self.arquivos[entrada["mesmo_que"]]
+
+        if usar_txt:
+            mapa = self._mapa(entrada["txt"] + self.sufixo)
+            inicio = entrada["offset_txt"]
+            frame = entrada.get("frame_txt")
+        else:
+            mapa = self._mapa(self.geral)
+            inicio = entrada["offset_geral"]
+            frame = entrada.get("frame_geral")
+
+        if frame is not None:
+            # [offset no disco, bytes no disco, início do frame no texto]
+            offset_disco, tamanho_disco, inicio_frame = frame
+            mapa = zlib.decompress(mapa[offset_disco:offset_disco + tamanho_disco], wbits=31)
+            inicio -= inicio_frame
+
+        if bloco:
+            return mapa[inicio:inicio + entrada["tamanho_bloco"]]
+
+        inicio += entrada["inicio_conteudo"]
+        return mapa[inicio:inicio + entrada["bytes"]]
+
+    def extrair(self, caminho, usar_txt=False, bloco=False):
+        return self.extrair_bytes(caminho, usar_txt, bloco).decode("utf-8")
+
+def extrair(pasta_run, caminho, usar_txt=False, bloco=False):
+    with ExtratorConsolidacao(pasta_run) as extrator:
+        return extrator.extrair(caminho, usar_txt, bloco)
+
+# ============================================================
+# LINHA DE COMANDO
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extrai um arquivo de uma consolidação.")
+    parser.add_argument("run", help="pasta RUN_<timestamp> com o INDEX.json")
+    parser.add_argument("caminho", help="caminho relativo ao ROOT (ex.: core/config.js)")
+    parser.add_argument("--txt", action="store_true", help="ler do .txt da pasta em vez do geral")
+    parser.add_argument("--bloco", action="store_true", help="incluir o cabeçalho FILE: do bloco")
+    args = parser.parse_args()
+
+    try:
+        with ExtratorConsolidacao(args.run) as extrator:
+            sys.stdout.buffer.write(extrator.extrair_bytes(args.caminho, args.txt, args.bloco))
+    except (OSError, KeyError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,3488 @@
+from pathlib import Path
+from datetime import datetime, timezone
+from fnmatch import fnmatch
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+import cProfile
+import codecs
+import ctypes
+import gzip
+import difflib
+import hashlib
+import heapq
+import io
+import json
+import math
+import os
+import pstats
+import re
+import zlib
+import select
+import struct
+import subprocess
+import sys
+import tarfile
+import threading
+import time
+import traceback
+import tracemalloc
+import zipfile
+
+"""
+MOTOR DE CONSOLIDAÇÃO
+---------------------
+A lógica de CONSOLIDAÇÃO.py, copiar_com_cabecalho_e_log.py e TUDO.py como
+API importável: nada roda na importação, nada pede Enter no final e cada
+execução devolve um dicionário de estatísticas.
+
+    with Motor(workers=8) as motor:
+        stats = motor.consolidar("/projeto", comprimir=True)
+        motor.copiar_com_cabecalho("/projeto")
+        motor.concatenar("/projeto/src/kernel")
+
+Um mesmo Motor pode rodar várias execuções seguidas mantendo o pool de
+leitura e os manifestos já carregados de cada ROOT. Para gerar também a
+cópia achatada e o arquivo único lendo a árvore uma só vez:
+
+    motor.consolidar("/projeto", destinos=["copia", "unico", "jsonl", "tar"])
+"""
+
+# ============================================================
+# CONFIGURAÇÕES FIXAS (CONFORME ESPECIFICAÇÃO)
+# ============================================================
+
+SEPARADOR_FORTE = "=" * 80
+SEPARADOR_BLOCO = "-" * 80
+DELIMITADOR = "\n\n---\n\n"
+FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+FORMATO_RUN = "%Y-%m-%d_%H-%M-%S"
+
+# Pastas podadas na varredura ANTES de descer nelas.
+# Nomes exatos comparados com o nome da pasta; padrões (fnmatch)
+# comparados com o nome e com o caminho relativo ao ROOT.
+PASTAS_EXCLUIDAS = {"códigos_consolidados", "node_modules", ".git", "__pycache__"}
+PADROES_EXCLUIDOS = ("backups/pre-constants-migration-*", "pre-constants-migration-*", "RUN_*")
+
+# Leitura paralela: padrão igual ao do ThreadPoolExecutor. Cada thread
+# pode ter no máximo LEITURAS_POR_WORKER arquivos lidos à frente do escritor.
+WORKERS_PADRAO = min(32, (os.cpu_count() or 1) + 4)
+LEITURAS_POR_WORKER = 4
+
+# Progresso da cópia achatada: uma linha a cada INTERVALO_PROGRESSO
+# segundos, qualquer que seja o número de arquivos.
+INTERVALO_PROGRESSO = 0.5
+
+# Modo --comprimir: cada frame (um bloco FILE, o cabeçalho de um .txt ou
+# um marcador de seção) vira um membro gzip independente.
+NIVEL_COMPRESSAO = 6
+
+# Modo --shards: estimativa rápida de tokens por bytes (≈ 4 bytes por
+# token em código-fonte), sem depender de tokenizador externo.
+BYTES_POR_TOKEN = 4
+# Orçamento mínimo: o cabeçalho do shard mais TOKENS_MINIMOS_SHARD de
+# conteúdo (abaixo disso todo shard estoura e os arquivos viram migalhas).
+TOKENS_MINIMOS_SHARD = 256
+
+# Triagem antes da leitura completa: só os primeiros BYTES_AMOSTRA bytes são
+# lidos para recusar binários (NUL), UTF-8 inválido e código minificado
+# (alguma linha da amostra maior que LINHA_MAXIMA). Arquivos recusados, e os
+# maiores que o tamanho máximo configurado, são pulados e contados por motivo,
+# fora de erros_leitura.
+BYTES_AMOSTRA = 4096
+LINHA_MAXIMA = 1000
+MOTIVO_BINARIO = "binario"
+MOTIVO_UTF8 = "utf8_invalido"
+MOTIVO_MINIFICADO = "minificado"
+MOTIVO_TAMANHO = "acima_do_limite"
+
+# Um arquivo a consolidar: chave relativa ao ROOT, caminho mostrado no FILE:
+# e os dados de stat usados no cabeçalho do bloco e no manifesto.
+ItemArquivo = namedtuple("ItemArquivo", "chave caminho tamanho mtime_ns modificado")
+
+# Modo --watch: eventos que chegam dentro da janela de espera são aplicados
+# juntos; sem inotify (ou com --polling) a árvore é revarrida a cada intervalo.
+ESPERA_EVENTOS = 0.1
+INTERVALO_POLLING = 1.0
+
+# Índice de offsets de cada RUN_ (lido por extrair_da_consolidacao.py):
+# { "core/a.js": {txt, offset_txt, offset_geral, tamanho_bloco, inicio_conteudo, bytes, sha256} }
+# offset_* apontam para a linha "FILE:" do bloco em cada saída (posição no
+# texto descomprimido); o bloco tem os mesmos bytes nas duas, então tamanho
+# e início do conteúdo são comuns. No modo --comprimir cada entrada ganha
+# frame_txt/frame_geral = [offset no disco, bytes no disco, início do frame
+# no texto descomprimido]. Com --dedup, um arquivo cujo conteúdo já saiu
+# ganha um bloco "SAME_AS: <caminho>" e a entrada "mesmo_que" com a chave
+# do primeiro; o conteúdo deve ser lido pela entrada do primeiro.
+NOME_INDEX_JSON = "INDEX.json"
+VERSAO_INDEX = 3
+
+# Manifesto persistente (path, tamanho, mtime, hash e posição do conteúdo
+# no .txt por pasta da última execução) usado para reaproveitar blocos.
+NOME_MANIFESTO = "manifest.json"
+VERSAO_MANIFESTO = 1
+
+# Modo --git: a lista de arquivos vem de um único `git ls-files -s` (e,
+# opcionalmente, `git ls-files -o` para os não rastreados) em vez da
+# varredura. O manifesto guarda {"commit", "sujos"} da execução: na próxima,
+# só os caminhos de `git diff --name-only <commit>`, os que estavam sujos
+# naquela execução e os não rastreados são relidos; o resto vem do .txt anterior.
+MODO_SUBMODULO = "160000"
+
+# --historico-git: um único `git log` para a árvore toda. \x01 abre um commit
+# (hash \x02 data do autor); os demais registros (separados por NUL) são caminhos.
+FORMATO_LOG_GIT = "%x01%H%x02%ad"
+BYTES_LEITURA_GIT = 1 << 16
+
+# Armazém de conteúdo por hash, compartilhado entre todas as RUN_:
+# blobs/<2 primeiros dígitos>/<sha256>. No modo --blobs cada RUN_ guarda
+# apenas o MANIFEST.json com a lista ordenada de arquivos e seus hashes.
+NOME_MANIFESTO_RUN = "MANIFEST.json"
+VERSAO_MANIFESTO_RUN = 1
+
+NOME_BASE = "códigos_consolidados"
+
+# Nomes achatados do copiar_com_cabecalho_e_log.py, persistidos entre
+# execuções: { "core/sub/index.js": {nome: "core/index__sub.js", tamanho,
+# mtime_ns} }. Um arquivo conhecido mantém o nome; só os novos passam pela
+# regra __subpasta/__N. Se nada mudou desde a RUN_ anotada, nada é gravado.
+NOME_NOMES_COPIA = "nomes_copia.json"
+VERSAO_NOMES_COPIA = 1
+
+# Cópia achatada num único pacote (--pacote zip|tar): RUN_<ts>/COPIA.zip ou
+# COPIA.tar.gz, com os arquivos em ordem de caminho, o INDEX.txt por último
+# e data fixa em todas as entradas (o mesmo conteúdo gera o mesmo pacote).
+DATA_FIXA_PACOTE = (1980, 1, 1, 0, 0, 0)
+
+# Espelho achatado persistente (copiar_com_cabecalho_e_log.py --espelho):
+# códigos_consolidados/ESPELHO/<pasta de topo>/<nome>, INDEX.txt e LOG.txt.
+# ESTADO.json guarda { relativo: {nome, tamanho, mtime_ns, sha256, bytes} }:
+# tamanho e mtime iguais = nem lê; hash igual = não reescreve. O hash é do
+# conteúdo já com as quebras de linha normalizadas, como na cópia (versão 2;
+# a versão 1 guardava o dos bytes crus e é relida, mantendo os nomes).
+NOME_ESPELHO = "ESPELHO"
+NOME_ESTADO_ESPELHO = "ESTADO.json"
+VERSAO_ESTADO_ESPELHO = 2
+
+# Modo --compacto: mapa das linhas da saída para as linhas originais de
+# cada arquivo, gravado na RUN_ ao lado do INDEX.json.
+NOME_MAPA_LINHAS = "MAPA_LINHAS.json"
+VERSAO_MAPA_LINHAS = 1
+
+# Relatório de tempos gravado ao lado do LOG de cada execução
+# (LOGS/consolidacao_<ts>.tempos.json): parede e CPU por fase, vazão,
+# os arquivos de leitura mais lenta e os erros de leitura por tipo.
+VERSAO_RELATORIO = 1
+ARQUIVOS_MAIS_LENTOS = 10
+
+# CONSOLIDACAO_PERFIL=cprofile ou tracemalloc roda a execução dentro do
+# perfilador e grava o resultado em LOGS/ com o mesmo nome do LOG. O
+# cProfile só enxerga a thread chamadora: use --workers 1 para ver as leituras.
+VARIAVEL_PERFIL = "CONSOLIDACAO_PERFIL"
+PERFIS = ("cprofile", "tracemalloc")
+LINHAS_PERFIL = 40
+
+# ============================================================
+# FUNÇÕES AUXILIARES
+# ============================================================
+
+def texto_cabecalho_txt(root, data, nome_pasta, total_arquivos_txt):
+    return (
+        f"ROOT: {root}\n"
+        f"PASTA CONSOLIDADA: {nome_pasta}\n"
+        f"DATA DA CONSOLIDAÇÃO: {data}\n"
+        f"TOTAL DE ARQUIVOS: {total_arquivos_txt}\n\n"
+        + SEPARADOR_FORTE + "\n\n"
+    )
+
+def texto_cabecalho_bloco(item, historico=None):
+    # Determinar pasta origem imediata
+    if "/" in item.chave:
+        pasta_origem = item.chave.split("/", 1)[0]
+    else:
+        pasta_origem = "ROOT"
+
+    return (
+        f"FILE: {item.caminho}\n"
+        f"PASTA_ORIGEM: {pasta_origem}\n"
+        f"TAMANHO: {item.tamanho} bytes\n"
+        f"MODIFICADO_EM: {item.modificado}\n"
+        + texto_historico_git(historico)
+        + "\n" + SEPARADOR_BLOCO + "\n"
+    )
+
+def texto_historico_git(historico):
+    """Linhas GIT_* do cabeçalho (--historico-git); `historico` = [hash, data, commits] ou ausente."""
+    if historico is None:
+        return ""
+    commit, data, commits = historico if historico else ("-", "-", 0)
+    return (
+        f"GIT_ULTIMO_COMMIT: {commit}\n"
+        f"GIT_DATA_AUTOR: {data}\n"
+        f"GIT_COMMITS: {commits}\n"
+    )
+
+def criar_pasta_run(base, timestamp):
+    """
+    Cria RUN_<timestamp> com mkdir atômico. Se outra execução (deste ou de
+    outro processo) já criou a pasta no mesmo segundo, tenta RUN_<timestamp>_2,
+    _3... Nada é sobrescrito. Retorna (pasta, id da execução).
+    """
+    base.mkdir(exist_ok=True)
+    numero = 1
+    while True:
+        id_run = timestamp if numero == 1 else f"{timestamp}_{numero}"
+        pasta = base / f"RUN_{id_run}"
+        try:
+            pasta.mkdir()
+            return pasta, id_run
+        except FileExistsError:
+            numero += 1
+
+def temporario_unico(path):
+    """
+    Nome temporário ao lado de `path`, único por processo e thread: duas
+    execuções gravando o mesmo arquivo não dividem o .tmp.
+    """
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def gravar_json_atomico(path, dados):
+    """Grava o JSON num temporário único e publica com os.replace."""
+    temporario = temporario_unico(path)
+    try:
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temporario, path)
+    finally:
+        temporario.unlink(missing_ok=True)
+
+def base_comum(raizes):
+    """
+    Pasta onde fica o códigos_consolidados de uma execução com várias raízes.
+    As raízes precisam estar num mesmo projeto: a raiz do sistema de arquivos,
+    a pasta do usuário e as acima dela não servem de base (ValueError).
+    """
+    caminhos = [str(Path(r).resolve()) for r in raizes]
+    try:
+        base = Path(os.path.commonpath(caminhos))
+    except ValueError:
+        base = None  # unidades diferentes no Windows
+    casa = Path.home().resolve()
+    if base is None or base == Path(base.anchor) or base == casa or base in casa.parents:
+        raise ValueError(
+            f"Raízes sem pasta de projeto em comum ({', '.join(caminhos)}): "
+            "consolide-as em execuções separadas"
+        )
+    return base
+
+def estimar_tokens(dados):
+    return (len(dados) + BYTES_POR_TOKEN - 1) // BYTES_POR_TOKEN
+
+def dividir_em_partes(dados, limite_bytes):
+    """
+    Quebra o conteúdo de um arquivo maior que o orçamento em partes de até
+    `limite_bytes`, preferindo quebras de linha e nunca cortando um
+    caractere UTF-8 ao meio.
+    """
+    partes = []
+    inicio = 0
+    while len(dados) - inicio > limite_bytes:
+        fim = dados.rfind(b"\n", inicio, inicio + limite_bytes) + 1
+        if fim <= inicio:
+            # Linha única maior que o limite (ex.: código minificado)
+            fim = inicio + limite_bytes
+            while fim > inicio + 1 and (dados[fim] & 0xC0) == 0x80:
+                fim -= 1
+        partes.append(dados[inicio:fim])
+        inicio = fim
+    partes.append(dados[inicio:])
+    return partes
+
+class Fragmentador:
+    """
+    Modo --shards: recebe os blocos FILE na mesma passada da consolidação e
+    os distribui em SHARDS/shard_NNN.txt sob um orçamento de tokens. O shard
+    em montagem fica em memória (no máximo o orçamento) para que o cabeçalho
+    liste seus arquivos; um bloco só é dividido quando sozinho não cabe.
+    """
+
+    def __init__(self, pasta, orcamento, root, data):
+        self.pasta = pasta
+        self.orcamento = orcamento
+        self.root = root
+        self.data = data
+        self.total = 0
+        self.tokens_base = self.tokens_cabecalho(root, data)
+        self._limpar()
+
+    @staticmethod
+    def tokens_cabecalho(root, data):
+        """Custo do cabeçalho sem a lista de arquivos (com folga nos números)."""
+        return estimar_tokens(Fragmentador.texto_cabecalho(root, data, 999, 10 ** 9, []).encode("utf-8"))
+
+    @staticmethod
+    def orcamento_minimo(root):
+        """Menor orçamento aceito para shards de `root`."""
+        return Fragmentador.tokens_cabecalho(root, datetime.now().strftime(FORMATO_DATA)) + TOKENS_MINIMOS_SHARD
+
+    def _limpar(self):
+        self.blocos = []
+        self.arquivos = []
+        self.tokens = self.tokens_base
+
+    def _cabecalho(self, numero, tokens, arquivos):
+        return self.texto_cabecalho(self.root, self.data, numero, tokens, arquivos)
+
+    @staticmethod
+    def texto_cabecalho(root, data, numero, tokens, arquivos):
+        linhas = [
+            f"ROOT: {root}",
+            f"DATA DA CONSOLIDAÇÃO: {data}",
+            f"SHARD: {numero:03d}",
+            f"TOKENS_ESTIMADOS: {tokens}",
+            f"ARQUIVOS NO SHARD: {len(arquivos)}",
+        ]
+        linhas += [f"- {nome}" for nome in arquivos]
+        return "\n".join(linhas) + "\n\n" + SEPARADOR_FORTE + "\n\n"
+
+    def _custo(self, nome, bloco):
+        # Bloco + sua linha na lista do cabeçalho + o delimitador anterior
+        extra = len(f"- {nome}\n".encode("utf-8"))
+        if self.blocos:
+            extra += len(DELIMITADOR)
+        return estimar_tokens(bloco) + (extra + BYTES_POR_TOKEN - 1) // BYTES_POR_TOKEN
+
+    def _gravar(self):
+        if not self.arquivos:
+            return
+        self.total += 1
+        self.pasta.mkdir(exist_ok=True)
+        with open(self.pasta / f"shard_{self.total:03d}.txt", "wb") as f:
+            f.write(self._cabecalho(self.total, self.tokens, self.arquivos).encode("utf-8"))
+            f.write(DELIMITADOR.encode("utf-8").join(self.blocos))
+        self._limpar()
+
+    def _incluir(self, nome, bloco, custo):
+        self.blocos.append(bloco)
+        self.arquivos.append(nome)
+        self.tokens += custo
+
+    def adicionar(self, item, cabecalho_bloco, dados):
+        bloco = cabecalho_bloco + dados
+        custo = self._custo(item.chave, bloco)
+
+        if self.arquivos and self.tokens + custo > self.orcamento:
+            self._gravar()
+            custo = self._custo(item.chave, bloco)
+
+        if self.tokens + custo <= self.orcamento:
+            self._incluir(item.chave, bloco, custo)
+            return
+
+        # Arquivo sozinho maior que o orçamento: um shard por parte
+        moldura = b"PARTE: 000/000\n" + cabecalho_bloco
+        folga = self.orcamento - self.tokens - self._custo(f"{item.chave} (parte 000/000)", moldura)
+        partes = dividir_em_partes(dados, max(1, folga) * BYTES_POR_TOKEN)
+
+        for i, parte in enumerate(partes, 1):
+            nome = f"{item.chave} (parte {i}/{len(partes)})"
+            bloco = f"PARTE: {i}/{len(partes)}\n".encode("utf-8") + cabecalho_bloco + parte
+            self._incluir(nome, bloco, self._custo(nome, bloco))
+            self._gravar()
+
+    def fechar(self):
+        self._gravar()
+
+def comprimir_frame(dados):
+    # mtime=0 deixa o membro gzip determinístico entre execuções
+    return gzip.compress(dados, compresslevel=NIVEL_COMPRESSAO, mtime=0)
+
+def descomprimir_frame(membro):
+    return zlib.decompress(membro, wbits=31)
+
+class Saida:
+    """
+    Arquivo de saída que conta a posição lógica (texto descomprimido) e a
+    posição em disco. No modo --comprimir os trechos ficam pendentes até
+    fechar_frame(), que grava o frame como um membro gzip independente.
+    """
+
+    def __init__(self, arquivo, comprimir=False):
+        self.arquivo = arquivo
+        self.comprimir = comprimir
+        self.posicao = 0
+        self.posicao_disco = 0
+        self.inicio_frame = 0
+        self.pendente = []
+
+    def write(self, dados):
+        if isinstance(dados, str):
+            dados = dados.encode("utf-8")
+        if self.comprimir:
+            self.pendente.append(dados)
+        else:
+            self.arquivo.write(dados)
+            self.posicao_disco += len(dados)
+        self.posicao += len(dados)
+        return len(dados)
+
+    def gravar_membro(self, membro):
+        frame = [self.posicao_disco, len(membro), self.inicio_frame]
+        self.arquivo.write(membro)
+        self.posicao_disco += len(membro)
+        self.inicio_frame = self.posicao
+        self.pendente = []
+        return frame
+
+    def fechar_frame(self):
+        if not self.comprimir:
+            return None
+        return self.gravar_membro(comprimir_frame(b"".join(self.pendente)))
+
+class SaidaEspelhada:
+    """
+    Grava cada trecho, já codificado em UTF-8, no .txt da pasta e na
+    consolidação geral ao mesmo tempo. As posições nas duas saídas são
+    contadas a partir dos bytes realmente escritos; no modo --comprimir
+    cada frame é comprimido uma única vez e gravado igual nas duas.
+    """
+
+    def __init__(self, txt, geral):
+        self.txt = txt
+        self.geral = geral
+        self.ultimo_membro = None
+
+    @property
+    def posicao(self):
+        return self.txt.posicao
+
+    @property
+    def posicao_geral(self):
+        return self.geral.posicao
+
+    def write(self, dados):
+        if isinstance(dados, str):
+            dados = dados.encode("utf-8")
+        self.txt.write(dados)
+        self.geral.write(dados)
+        return len(dados)
+
+    def fechar_frame(self):
+        if not self.txt.comprimir:
+            return None, None
+        membro = self.ultimo_membro = comprimir_frame(b"".join(self.txt.pendente))
+        return self.txt.gravar_membro(membro), self.geral.gravar_membro(membro)
+
+class Cronometro:
+    """
+    Acumula tempo de parede e de CPU por fase. O tempo de CPU é o do
+    processo inteiro, então inclui as threads de leitura da fase.
+    """
+
+    def __init__(self):
+        self.fases = {}
+
+    @contextmanager
+    def fase(self, nome):
+        parede, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            acumulado = self.fases.setdefault(nome, {"parede": 0.0, "cpu": 0.0})
+            acumulado["parede"] += time.perf_counter() - parede
+            acumulado["cpu"] += time.process_time() - cpu
+
+    def total(self, chave):
+        return sum(f[chave] for f in self.fases.values())
+
+class Progresso:
+    """
+    Progresso com taxa fixa: avancar() a cada arquivo só guarda contadores e
+    chama `avisar` no máximo uma vez a cada `intervalo` segundos; fechar()
+    mostra a linha final. Usado só pela thread que consome os resultados.
+    """
+
+    def __init__(self, total, avisar, intervalo=INTERVALO_PROGRESSO):
+        self.total = total
+        self.avisar = avisar
+        self.intervalo = intervalo
+        self.feitos = 0
+        self.bytes = 0
+        self.inicio = time.perf_counter()
+        self.proximo = self.inicio + intervalo
+
+    def avancar(self, tamanho):
+        self.feitos += 1
+        self.bytes += tamanho
+        agora = time.perf_counter()
+        if agora >= self.proximo:
+            self.proximo = agora + self.intervalo
+            self.mostrar(agora)
+
+    def mostrar(self, agora):
+        segundos = agora - self.inicio
+        percentual = 100 * self.feitos / self.total if self.total else 100
+        taxa = self.feitos / segundos if segundos else 0
+        self.avisar(
+            f"Progresso: {self.feitos}/{self.total} arquivos ({percentual:.0f}%) — "
+            f"{self.bytes / 1e6:.1f} MB — {taxa:.0f} arquivos/s"
+        )
+
+    def fechar(self):
+        self.mostrar(time.perf_counter())
+
+def percentil(valores, fracao):
+    """Percentil por posição (sem interpolação) de uma lista não vazia."""
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(len(ordenados) * fracao) - 1)]
+
+class ArquivoIgnorado(Exception):
+    """Arquivo recusado pela triagem; `motivo` é um dos MOTIVO_*."""
+
+    def __init__(self, motivo):
+        super().__init__(motivo)
+        self.motivo = motivo
+
+def motivo_da_amostra(amostra, completa):
+    """Motivo para recusar o arquivo pelos seus primeiros bytes, ou None."""
+    if b"\0" in amostra:
+        return MOTIVO_BINARIO
+    try:
+        # Incremental: a amostra pode cortar um caractere no fim
+        codecs.getincrementaldecoder("utf-8")().decode(amostra, final=completa)
+    except UnicodeDecodeError:
+        return MOTIVO_UTF8
+    if max(len(linha) for linha in amostra.split(b"\n")) > LINHA_MAXIMA:
+        return MOTIVO_MINIFICADO
+    return None
+
+def ler_arquivo_js(caminho_arquivo, triagem=False):
+    """
+    Leitura única do arquivo em bytes. Valida UTF-8 e normaliza as quebras
+    de linha exatamente como read_text() fazia (\r\n e \r viram \n). Com
+    `triagem`, lê primeiro só a amostra e levanta ArquivoIgnorado sem ler o resto.
+    """
+    with open(caminho_arquivo, "rb") as f:
+        if triagem:
+            amostra = f.read(BYTES_AMOSTRA)
+            motivo = motivo_da_amostra(amostra, completa=len(amostra) < BYTES_AMOSTRA)
+            if motivo:
+                raise ArquivoIgnorado(motivo)
+            dados = amostra + f.read()
+        else:
+            dados = f.read()
+    dados.decode("utf-8")
+
+    if b"\r" in dados:
+        dados = dados.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+    return dados
+
+def _copy_file_range(fd_origem, fd_destino, offset, tamanho):
+    return os.copy_file_range(fd_origem, fd_destino, tamanho, offset)
+
+def _sendfile(fd_origem, fd_destino, offset, tamanho):
+    return os.sendfile(fd_destino, fd_origem, offset, tamanho)
+
+# Cópias arquivo→arquivo feitas pelo kernel, sem passar os bytes pelo
+# Python; tentadas nesta ordem antes da cópia em blocos.
+COPIAS_NO_KERNEL = [
+    copiar for nome, copiar in (("copy_file_range", _copy_file_range), ("sendfile", _sendfile))
+    if hasattr(os, nome)
+]
+
+def copiar_intervalo(origem, destino, inicio=0, tamanho=None):
+    """
+    Copia `tamanho` bytes de `origem` a partir de `inicio` (até o fim, se
+    None) para a posição atual de `destino`, ambos abertos em modo binário.
+    Usa copy_file_range/sendfile; se o sistema de arquivos ou a plataforma
+    recusar, o restante vai por leitura e escrita em blocos.
+    """
+    if tamanho is None:
+        tamanho = os.fstat(origem.fileno()).st_size - inicio
+
+    destino.flush()
+    posicao = destino.tell()
+    copiados = 0
+
+    for copiar in COPIAS_NO_KERNEL:
+        try:
+            while copiados < tamanho:
+                n = copiar(origem.fileno(), destino.fileno(), inicio + copiados, tamanho - copiados)
+                if n == 0:
+                    break
+                copiados += n
+            break
+        except OSError:
+            continue
+
+    # Reposiciona o buffer do Python depois das escritas direto no descritor
+    destino.seek(posicao + copiados)
+    if copiados < tamanho:
+        origem.seek(inicio + copiados)
+        restante = tamanho - copiados
+        while restante > 0:
+            bloco = origem.read(min(restante, 1024 * 1024))
+            if not bloco:
+                break
+            destino.write(bloco)
+            restante -= len(bloco)
+
+def corrigir_total_arquivos(path_txt, geral, inicio_secao, cabecalho_antigo, cabecalho_novo):
+    """
+    O cabeçalho do .txt anuncia o total de arquivos antes da leitura. Quando
+    algum arquivo falha, reescreve o cabeçalho no .txt e refaz a seção da
+    pasta no final da consolidação geral. `inicio_secao` é a posição (lógica,
+    em disco) da seção no arquivo geral e `cabecalho_antigo` os bytes do
+    cabeçalho como foram gravados. Retorna os deslocamentos (lógico, em disco).
+    """
+    gravado = comprimir_frame(cabecalho_novo) if geral.comprimir else cabecalho_novo
+    temporario = path_txt.with_suffix(".tmp")
+
+    with open(path_txt, "rb") as antigo, open(temporario, "wb") as novo:
+        novo.write(gravado)
+        copiar_intervalo(antigo, novo, len(cabecalho_antigo))
+    os.replace(temporario, path_txt)
+
+    logico, disco = inicio_secao
+    geral.arquivo.seek(disco)
+    geral.arquivo.truncate()
+    with open(path_txt, "rb") as corrigido:
+        copiar_intervalo(corrigido, geral.arquivo)
+
+    texto_antigo = descomprimir_frame(cabecalho_antigo) if geral.comprimir else cabecalho_antigo
+    deslocamento = len(cabecalho_novo) - len(texto_antigo)
+    deslocamento_disco = len(gravado) - len(cabecalho_antigo)
+
+    geral.posicao += deslocamento
+    geral.inicio_frame += deslocamento
+    geral.posicao_disco += deslocamento_disco
+
+    return deslocamento, deslocamento_disco
+
+def deslocar_frame(frame, deslocamento, deslocamento_disco):
+    if frame is not None:
+        frame[0] += deslocamento_disco
+        frame[2] += deslocamento
+
+def carregar_em_ordem(tarefas, workers, carregar, pool=None):
+    """
+    Lê as tarefas num pool limitado de threads e entrega os resultados na
+    mesma ordem de entrada, para que um único escritor produza exatamente a
+    mesma saída da execução sequencial. A janela de leituras antecipadas é
+    limitada para manter a memória constante. `pool` reaproveita um
+    ThreadPoolExecutor já aberto (o do Motor).
+    """
+    if workers <= 1:
+        for tarefa in tarefas:
+            yield carregar(tarefa)
+        return
+
+    if pool is None:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="leitura") as pool:
+            yield from carregar_em_ordem(tarefas, workers, carregar, pool)
+        return
+
+    tarefas = iter(tarefas)
+    pendentes = deque(
+        pool.submit(carregar, t)
+        for t in islice(tarefas, workers * LEITURAS_POR_WORKER)
+    )
+    try:
+        while pendentes:
+            futuro = pendentes.popleft()
+            for tarefa in islice(tarefas, 1):
+                pendentes.append(pool.submit(carregar, tarefa))
+            yield futuro.result()
+    finally:
+        for futuro in pendentes:
+            futuro.cancel()
+
+# ============================================================
+# DESTINOS (UMA LEITURA, VÁRIAS SAÍDAS)
+# ============================================================
+
+# Saídas extras alimentadas pela mesma passada que grava os .txt: cada
+# destino recebe adicionar(item, pasta, dados, sha256) na ordem do plano e,
+# no fim, fechar() devolve {saida, arquivos, bytes, ...} para o LOG.
+# Qualquer objeto com esses dois métodos e um `nome` serve como destino.
+
+def texto_cabecalho_copia(caminho, pasta_chave, data):
+    """Cabeçalho de cada arquivo do copiar_com_cabecalho_e_log.py."""
+    return (
+        f"FILE_ORIGINAL: {caminho}\n"
+        f"PASTA_BASE: {pasta_chave}\n"
+        f"DATA_DA_EXTRACAO: {data}\n"
+        f"{SEPARADOR_BLOCO}\n\n"
+    )
+
+def nome_sem_colisao(caminho, base_origem, usados):
+    """
+    Regra de nomes da cópia achatada: o nome original; se já estiver em
+    `usados`, <nome>__<subpasta>; se ainda estiver, <nome>__<N>. Retorna
+    (nome, renomeado).
+    """
+    ocupado = lambda nome: os.path.normcase(nome) in usados
+
+    nome = caminho.name
+    if not ocupado(nome):
+        return nome, False
+
+    try:
+        partes_rel = caminho.relative_to(base_origem).parts
+        if len(partes_rel) > 1:
+            nome = f"{caminho.stem}__{partes_rel[-2]}{caminho.suffix}"
+        else:
+            # Arquivo direto na pasta base, usar contador
+            nome = f"{caminho.stem}__1{caminho.suffix}"
+    except ValueError:
+        nome = f"{caminho.stem}__1{caminho.suffix}"
+
+    contador = 1
+    while ocupado(nome):
+        nome = f"{caminho.stem}__{contador}{caminho.suffix}"
+        contador += 1
+
+    return nome, True
+
+def carregar_nomes_copia(path):
+    """
+    (RUN_ anotada, formato dela, {relativo: {nome, tamanho, mtime_ns}}) de
+    NOME_NOMES_COPIA; vazio se não houver. Formato: "pasta", "zip" ou "tar".
+    """
+    try:
+        dados = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None, None, {}
+    if dados.get("versao") != VERSAO_NOMES_COPIA:
+        return None, None, {}
+    return dados.get("run"), dados.get("formato", "pasta"), dados.get("arquivos", {})
+
+def salvar_nomes_copia(path, run, formato, arquivos):
+    gravar_json_atomico(
+        path, {"versao": VERSAO_NOMES_COPIA, "run": run, "formato": formato, "arquivos": arquivos}
+    )
+
+def origem_da_copia(root, partes):
+    """(pasta de primeiro nível, pasta base para a regra __subpasta) de um .js copiado."""
+    if len(partes) == 1:
+        return "ROOT", root
+    return partes[0], root / partes[0]
+
+def texto_index_copia(root, data, arquivos_index):
+    """INDEX.txt da cópia achatada; `arquivos_index` = [(destino relativo, bytes, origem)]."""
+    total_bytes = sum(t for _, t, _ in arquivos_index)
+    linhas = [f"ROOT: {root}\n", f"DATA_DA_EXTRACAO: {data}\n\n"]
+    for destino_rel, tamanho, origem in sorted(arquivos_index):
+        linhas.append(f"{destino_rel} — {tamanho} bytes\n")
+        linhas.append(f"    ORIGEM: {origem}\n")
+    linhas.append("\nTOTAL:\n")
+    linhas.append(f"- Arquivos: {len(arquivos_index)}\n")
+    linhas.append(f"- Tamanho total: {total_bytes} bytes\n")
+    return "".join(linhas)
+
+class PacoteZip:
+    """COPIA.zip gravado em fluxo: uma entrada por arquivo, sem arquivos intermediários."""
+
+    extensao = ".zip"
+
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=NIVEL_COMPRESSAO)
+
+    def adicionar(self, nome, dados):
+        info = zipfile.ZipInfo(nome, date_time=DATA_FIXA_PACOTE)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        self.zip.writestr(info, dados)
+
+    def fechar(self):
+        self.zip.close()
+
+class PacoteTar:
+    """COPIA.tar.gz gravado em fluxo, com dono, data e cabeçalho gzip fixos."""
+
+    extensao = ".tar.gz"
+
+    def __init__(self, path):
+        self.path = path
+        self.arquivo = open(path, "wb")
+        self.gz = gzip.GzipFile(filename="", mode="wb", fileobj=self.arquivo, mtime=0, compresslevel=NIVEL_COMPRESSAO)
+        self.tar = tarfile.open(fileobj=self.gz, mode="w", format=tarfile.GNU_FORMAT)
+        self.mtime = int(datetime(*DATA_FIXA_PACOTE, tzinfo=timezone.utc).timestamp())
+
+    def adicionar(self, nome, dados):
+        info = tarfile.TarInfo(nome)
+        info.size = len(dados)
+        info.mtime = self.mtime
+        info.mode = 0o644
+        self.tar.addfile(info, io.BytesIO(dados))
+
+    def fechar(self):
+        self.tar.close()
+        self.gz.close()
+        self.arquivo.close()
+
+PACOTES = {"zip": PacoteZip, "tar": PacoteTar}
+
+def ler_para_copia(candidato):
+    """(conteúdo, erro, segundos) de um candidato de listar_para_copia; roda nas threads de leitura."""
+    inicio = time.perf_counter()
+    try:
+        return candidato[1].read_text(encoding="utf-8"), None, time.perf_counter() - inicio
+    except Exception as e:
+        return None, e, time.perf_counter() - inicio
+
+def gravar_copia(destino, texto):
+    """Grava um arquivo da cópia achatada; devolve (bytes no disco, segundos). Roda no pool."""
+    inicio = time.perf_counter()
+    dados = texto.encode("utf-8")
+    # Binário: LF em qualquer sistema, os mesmos bytes das entradas do --pacote
+    with open(destino, "wb") as out:
+        out.write(dados)
+    return len(dados), time.perf_counter() - inicio
+
+def carregar_estado_espelho(path):
+    try:
+        dados = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    arquivos = dados.get("arquivos", {})
+    if dados.get("versao") == 1:
+        # Sem hash: tudo é relido e reescrito uma vez, nos mesmos nomes
+        return {relativo: dict(entrada, sha256=None) for relativo, entrada in arquivos.items()}
+    if dados.get("versao") != VERSAO_ESTADO_ESPELHO:
+        return {}
+    return arquivos
+
+def salvar_estado_espelho(path, arquivos):
+    gravar_json_atomico(path, {"versao": VERSAO_ESTADO_ESPELHO, "arquivos": arquivos})
+
+class RegistroNomes:
+    """
+    Nomes já gravados em cada pasta de destino da cópia achatada. As
+    colisões são resolvidas em memória (sem um exists() por tentativa) e
+    cada pasta é criada uma única vez; o disco só é tocado na escrita. As
+    pastas de destino nascem vazias, dentro de uma RUN_ nova.
+    """
+
+    def __init__(self, criar_pastas=True):
+        self.por_pasta = {}     # { Path: {nomes (normcase)} }
+        self.criar_pastas = criar_pastas  # False: nomes dentro de um pacote, sem pastas no disco
+
+    def usados(self, pasta_destino):
+        usados = self.por_pasta.get(pasta_destino)
+        if usados is None:
+            if self.criar_pastas:
+                pasta_destino.mkdir(parents=True, exist_ok=True)
+            usados = self.por_pasta[pasta_destino] = set()
+        return usados
+
+    def destino(self, caminho, base_origem, pasta_destino):
+        """(destino, renomeado) para `caminho`; o nome só conta como usado após ocupar()."""
+        nome, renomeado = nome_sem_colisao(caminho, base_origem, self.usados(pasta_destino))
+        return pasta_destino / nome, renomeado
+
+    def ocupar(self, destino):
+        self.usados(destino.parent).add(os.path.normcase(destino.name))
+
+class DestinoCopiaAchatada:
+    """copiar_com_cabecalho_e_log.py: COPIA/<pasta de topo>/<nome> com cabeçalho + INDEX.txt."""
+
+    nome = "copia"
+
+    def __init__(self, pasta_run, root, data):
+        self.pasta = pasta_run / "COPIA"
+        self.root = Path(root)
+        self.data = data
+        self.indice = []
+        self.renomeacoes = []
+        self.nomes = RegistroNomes()
+
+    def adicionar(self, item, pasta, dados, hash_conteudo):
+        caminho = Path(item.caminho)
+        base_origem = self.root if pasta == "ROOT" else self.root / pasta
+
+        destino, renomeado = self.nomes.destino(caminho, base_origem, self.pasta / pasta)
+        if renomeado:
+            self.renomeacoes.append((item.caminho, str(destino)))
+
+        with open(destino, "wb") as out:
+            self.nomes.ocupar(destino)
+            out.write(texto_cabecalho_copia(caminho, pasta, self.data).encode("utf-8"))
+            out.write(dados)
+            tamanho = out.tell()
+        self.indice.append((str(destino.relative_to(self.pasta)), tamanho, item.caminho))
+
+    def fechar(self):
+        self.pasta.mkdir(exist_ok=True)
+        total_bytes = sum(t for _, t, _ in self.indice)
+        with open(self.pasta / "INDEX.txt", "wb") as idx:
+            idx.write(texto_index_copia(self.root, self.data, self.indice).encode("utf-8"))
+
+        return {
+            "saida": "COPIA/",
+            "arquivos": len(self.indice),
+            "bytes": total_bytes,
+            "renomeacoes": self.renomeacoes,
+        }
+
+class DestinoArquivoUnico:
+    """TUDO.py: o conteúdo de todos os arquivos num só consolidado.txt, separados por DELIMITADOR."""
+
+    nome = "unico"
+
+    def __init__(self, pasta_run, root, data):
+        self.path = pasta_run / "consolidado.txt"
+        self.arquivo = open(self.path, "wb")
+        self.arquivos = 0
+
+    def adicionar(self, item, pasta, dados, hash_conteudo):
+        if self.arquivos:
+            self.arquivo.write(DELIMITADOR.encode("utf-8"))
+        self.arquivo.write(dados)
+        self.arquivos += 1
+
+    def fechar(self):
+        tamanho = self.arquivo.tell()
+        self.arquivo.close()
+        return {"saida": self.path.name, "arquivos": self.arquivos, "bytes": tamanho}
+
+class DestinoJsonl:
+    """arquivos.jsonl: uma linha JSON por arquivo (chave, pasta, bytes, sha256, conteúdo)."""
+
+    nome = "jsonl"
+
+    def __init__(self, pasta_run, root, data):
+        self.path = pasta_run / "arquivos.jsonl"
+        self.arquivo = open(self.path, "w", encoding="utf-8", newline="\n")
+        self.arquivos = 0
+
+    def adicionar(self, item, pasta, dados, hash_conteudo):
+        registro = {
+            "arquivo": item.chave,
+            "pasta": pasta,
+            "bytes": len(dados),
+            "sha256": hash_conteudo,
+            "conteudo": dados.decode("utf-8"),
+        }
+        self.arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self.arquivos += 1
+
+    def fechar(self):
+        self.arquivo.close()
+        return {"saida": self.path.name, "arquivos": self.arquivos, "bytes": self.path.stat().st_size}
+
+class DestinoTar:
+    """arquivos.tar.gz: os arquivos com o caminho relativo ao ROOT (quebras de linha já normalizadas)."""
+
+    nome = "tar"
+
+    def __init__(self, pasta_run, root, data):
+        self.path = pasta_run / "arquivos.tar.gz"
+        self.tar = tarfile.open(self.path, "w:gz", compresslevel=NIVEL_COMPRESSAO)
+        self.arquivos = 0
+
+    def adicionar(self, item, pasta, dados, hash_conteudo):
+        info = tarfile.TarInfo(item.chave)
+        info.size = len(dados)
+        info.mtime = item.mtime_ns // 10 ** 9
+        self.tar.addfile(info, io.BytesIO(dados))
+        self.arquivos += 1
+
+    def fechar(self):
+        self.tar.close()
+        return {"saida": self.path.name, "arquivos": self.arquivos, "bytes": self.path.stat().st_size}
+
+DESTINOS = {
+    destino.nome: destino
+    for destino in (DestinoCopiaAchatada, DestinoArquivoUnico, DestinoJsonl, DestinoTar)
+}
+
+# ============================================================
+# MODO --compacto (REMOÇÃO DE COMENTÁRIOS E ESPAÇOS)
+# ============================================================
+
+# Tokens de JS relevantes para remover comentários e espaços sem tocar em
+# strings, template literals e regex. As quebras de linha entre comandos são
+# mantidas (ASI); só linhas vazias, indentação e espaços repetidos somem.
+_TOKEN_JS = re.compile(rb"""
+    (?P<espaco>[ \t\f\v]+)
+  | (?P<quebra>\n)
+  | (?P<linha>//[^\n]*)
+  | (?P<bloco>/\*.*?(?:\*/|\Z))
+  | (?P<string>'(?:\\.|[^'\\\n])*'?|"(?:\\.|[^"\\\n])*"?)
+  | (?P<template>`)
+  | (?P<barra>/)
+  | (?P<palavra>[A-Za-z0-9_$\x80-\xff]+)
+  | (?P<outro>.)
+""", re.S | re.X)
+_STRING_JS = re.compile(rb"""'(?:\\.|[^'\\\n])*'?|"(?:\\.|[^"\\\n])*"?""", re.S)
+_REGEX_JS = re.compile(rb"/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[A-Za-z]*")
+
+# Depois destes, "/" abre uma regex; depois de valores (nomes, números, ")" e "]"), é divisão
+_ANTES_DE_REGEX = frozenset(b"(,=:[!&|?{};+-*%<>~^")
+_PALAVRAS_ANTES_DE_REGEX = frozenset({
+    b"return", b"typeof", b"instanceof", b"in", b"of", b"new", b"delete", b"void",
+    b"throw", b"case", b"do", b"else", b"yield", b"await",
+})
+
+def _fim_template(dados, i):
+    """Posição logo após o template literal que começa em dados[i], com ${...} aninhados."""
+    i += 1
+    while i < len(dados):
+        c = dados[i]
+        if c == 0x5C:  # \
+            i += 2
+        elif c == 0x60:  # `
+            return i + 1
+        elif c == 0x24 and dados[i + 1:i + 2] == b"{":
+            i = _fim_expressao_template(dados, i + 2)
+        else:
+            i += 1
+    return len(dados)
+
+def _fim_expressao_template(dados, i):
+    """Posição logo após o "}" que fecha um ${...}."""
+    profundidade = 0
+    while i < len(dados):
+        c = dados[i]
+        if c in (0x22, 0x27):  # " '
+            i = _STRING_JS.match(dados, i).end()
+            continue
+        if c == 0x60:
+            i = _fim_template(dados, i)
+            continue
+        if c == 0x7B:  # {
+            profundidade += 1
+        elif c == 0x7D:  # }
+            if not profundidade:
+                return i + 1
+            profundidade -= 1
+        i += 1
+    return len(dados)
+
+def percentual_reducao(originais, compactos):
+    return f"-{100 * (originais - compactos) / originais:.1f}%" if originais else "-0.0%"
+
+def compactar_js(dados):
+    """
+    Remove comentários, linhas vazias, indentação e espaços repetidos de um
+    fonte JS (bytes UTF-8 com quebras \\n). Retorna (compactado, linhas), onde
+    linhas = [[linha compactada, linha original, quantidade], ...] mapeia em
+    trechos contínuos cada linha da saída para a linha do original.
+    """
+    saida = []
+    origem = []             # linha original de cada linha da saída
+    linha = 1
+    linha_vazia = True
+    espaco = False
+    anterior = None         # último token significativo, para decidir regex × divisão
+
+    def emitir(token):
+        nonlocal linha, linha_vazia, espaco
+        if linha_vazia:
+            origem.append(linha)
+            linha_vazia = False
+        elif espaco:
+            saida.append(b" ")
+        espaco = False
+        saida.append(token)
+        quebras = token.count(b"\n")
+        origem.extend(range(linha + 1, linha + 1 + quebras))
+        linha += quebras
+
+    def quebrar():
+        nonlocal linha_vazia, espaco
+        if not linha_vazia:
+            saida.append(b"\n")
+            linha_vazia = True
+        espaco = False
+
+    i = 0
+    while i < len(dados):
+        m = _TOKEN_JS.match(dados, i)
+        tipo, fim = m.lastgroup, m.end()
+
+        if tipo == "espaco":
+            espaco = True
+        elif tipo == "quebra":
+            quebrar()
+            linha += 1
+        elif tipo == "linha":
+            pass
+        elif tipo == "bloco":
+            quebras = m.group().count(b"\n")
+            if quebras:
+                quebrar()
+                linha += quebras
+            else:
+                espaco = True
+        elif tipo == "template":
+            fim = _fim_template(dados, i)
+            emitir(dados[i:fim])
+            anterior = b"`"
+        elif tipo == "barra":
+            regex = None
+            if anterior is None or anterior in _PALAVRAS_ANTES_DE_REGEX or (
+                len(anterior) == 1 and anterior[0] in _ANTES_DE_REGEX
+            ):
+                regex = _REGEX_JS.match(dados, i)
+            if regex:
+                fim = regex.end()
+                anterior = b"/regex/"
+            else:
+                anterior = b"/"
+            emitir(dados[i:fim])
+        else:
+            emitir(m.group())
+            anterior = m.group() if tipo in ("palavra", "outro") else b'""'
+
+        i = fim
+
+    if saida:
+        if not linha_vazia:
+            saida.append(b"\n")
+
+    linhas = []
+    for saida_n, original in enumerate(origem, 1):
+        if linhas and linhas[-1][0] + linhas[-1][2] == saida_n and linhas[-1][1] + linhas[-1][2] == original:
+            linhas[-1][2] += 1
+        else:
+            linhas.append([saida_n, original, 1])
+    return b"".join(saida), linhas
+
+# ============================================================
+# INOTIFY (MODO --watch)
+# ============================================================
+
+# Constantes de <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+MASCARA_INOTIFY = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+class Inotify:
+    """
+    Wrapper mínimo (ctypes) da API inotify do Linux: uma observação por
+    pasta não podada, com o prefixo relativo ao ROOT de cada uma.
+    """
+
+    def __init__(self, excluida):
+        self.excluida = excluida
+        # No Windows CDLL(None) nem existe (TypeError): falha como OSError, que vira polling
+        if not sys.platform.startswith("linux"):
+            raise OSError(f"inotify não existe em {sys.platform}")
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("libc sem inotify_init1")
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        self.prefixos = {}      # { wd: "core/sub/" }
+
+    def observar_arvore(self, raiz, prefixo=""):
+        pendentes = [(raiz, prefixo)]
+        while pendentes:
+            pasta, prefixo = pendentes.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(pasta), MASCARA_INOTIFY)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch falhou em {pasta}")
+            self.prefixos[wd] = prefixo
+
+            try:
+                with os.scandir(pasta) as it:
+                    for entrada in it:
+                        relativo = prefixo + entrada.name
+                        if entrada.is_dir(follow_symlinks=False) and not self.excluida(entrada.name, relativo):
+                            pendentes.append((entrada.path, relativo + "/"))
+            except OSError:
+                continue
+
+    def esquecer(self, prefixo):
+        for wd in [wd for wd, p in self.prefixos.items() if p.startswith(prefixo)]:
+            self.libc.inotify_rm_watch(self.fd, wd)
+            self.prefixos.pop(wd, None)
+
+    def ler(self, espera=None):
+        """Retorna [(prefixo, nome, máscara), ...]; lista vazia se nada chegou."""
+        prontos, _, _ = select.select([self.fd], [], [], espera)
+        if not prontos:
+            return []
+
+        dados = os.read(self.fd, 64 * 1024)
+        eventos = []
+        pos = 0
+        while pos < len(dados):
+            wd, mascara, _, tamanho = struct.unpack_from("iIII", dados, pos)
+            nome = os.fsdecode(dados[pos + 16:pos + 16 + tamanho].rstrip(b"\0"))
+            pos += 16 + tamanho
+
+            if mascara & IN_IGNORED:
+                self.prefixos.pop(wd, None)
+                continue
+            eventos.append((self.prefixos.get(wd), nome, mascara))
+        return eventos
+
+    def fechar(self):
+        os.close(self.fd)
+
+# ============================================================
+# EXECUÇÃO DE UMA CONSOLIDAÇÃO
+# ============================================================
+
+class Consolidacao:
+    """
+    Uma execução de CONSOLIDAÇÃO.py sobre `root`: varredura, leitura,
+    .txt por pasta, consolidação geral, INDEX, manifesto e LOG. Todo o
+    estado fica na instância, então várias execuções podem rodar em
+    sequência no mesmo processo.
+    """
+
+    def __init__(
+        self, motor, root, *, comprimir=False, blobs=False, shards=None,
+        pastas_excluidas=PASTAS_EXCLUIDAS, padroes_excluidos=PADROES_EXCLUIDOS,
+        extensoes=(".js",), excluir=(), destinos=(), git=False, nao_rastreados=False, dedup=False,
+        triagem=True, tamanho_maximo=None, compacto=False, historico_git=False, raizes=None,
+    ):
+        self.motor = motor
+        self.root = Path(root).resolve()
+        self.comprimir = comprimir
+        self.sufixo = ".gz" if comprimir else ""
+        self.modo_blobs = blobs
+        self.orcamento_shard = shards
+        if shards is not None and shards < Fragmentador.orcamento_minimo(self.root):
+            raise ValueError(
+                f"Orçamento de shards de {shards} tokens é pequeno demais: "
+                f"o mínimo para {self.root} é {Fragmentador.orcamento_minimo(self.root)}"
+            )
+        self.workers = motor.workers
+        self.pastas_excluidas = set(pastas_excluidas)
+        self.padroes_excluidos = tuple(padroes_excluidos)
+        self.extensoes = tuple(extensoes)
+        self.excluir = {Path(p).resolve() for p in excluir}
+
+        # Várias raízes sob `root`: { "src": "src", "pacotes/web": "pacotes__web" }
+        # (caminho relativo → nome da seção). Sem raízes, uma seção por pasta de topo.
+        self.raizes = {}
+        for raiz in raizes or ():
+            raiz = Path(raiz).resolve()
+            if raiz == self.root:
+                raise ValueError(f"Raízes sobrepostas: {raiz} contém as demais raízes")
+            if self.root not in raiz.parents:
+                raise ValueError(f"Raiz {raiz} precisa estar dentro de {self.root}")
+            relativo = raiz.relative_to(self.root).as_posix()
+            self.raizes[relativo] = relativo.replace("/", "__")
+        for relativo in self.raizes:
+            if any(outro != relativo and relativo.startswith(outro + "/") for outro in self.raizes):
+                raise ValueError(f"Raízes sobrepostas: {relativo} está dentro de outra raiz")
+
+        self.triagem = triagem
+        self.tamanho_maximo = tamanho_maximo
+        self.dedup = dedup
+        if dedup and blobs:
+            raise ValueError("dedup não se aplica ao modo blobs (não há texto gerado)")
+        self.compacto = compacto
+        if compacto and blobs:
+            raise ValueError("compacto não se aplica ao modo blobs (os blobs guardam o fonte original)")
+
+        self.modo_git = git
+        self.git_nao_rastreados = nao_rastreados
+        self.com_historico_git = historico_git
+        if nao_rastreados and not git:
+            raise ValueError("nao_rastreados só vale no modo git")
+
+        # Nomes de DESTINOS ou objetos com adicionar/fechar
+        self.destinos = list(destinos)
+        desconhecidos = [d for d in self.destinos if isinstance(d, str) and d not in DESTINOS]
+        if desconhecidos:
+            raise ValueError(f"Destinos desconhecidos: {', '.join(desconhecidos)} (use {', '.join(DESTINOS)})")
+        if self.destinos and blobs:
+            raise ValueError("destinos extras não podem ser combinados com blobs")
+
+        self.inicio_execucao = datetime.now()
+        self.timestamp_humano = self.inicio_execucao.strftime(FORMATO_DATA)
+
+        self.base = self.root / NOME_BASE
+        self.pasta_logs = self.base / "LOGS"
+        self.pasta_blobs = self.base / "blobs"
+        self.manifesto_path = self.base / NOME_MANIFESTO
+        self.definir_run(self.inicio_execucao.strftime(FORMATO_RUN))
+
+        self.erros_leitura = []
+        self.erros_por_tipo = Counter()
+        self.erros_vistos = None        # no --watch: erros já registrados, para não repetir a cada revarredura
+        self.ignorados = []             # [(caminho, motivo)] da triagem e do tamanho máximo
+        self.ignorados_por_motivo = Counter()
+        self.ignorados_vistos = set()
+        self.compactacao = {}           # { chave: {bytes_originais, linhas} } vindo das threads de leitura
+        self.tempos_leitura = []        # [(segundos, bytes, chave)] das leituras do disco
+        self.cronometro = Cronometro()
+        self.mapa_por_pasta = {}        # { "KERNEL": [Path, Path, ...], "ROOT": [...] }
+        self.stat_por_arquivo = {}      # { Path: os.stat_result } (vindo do DirEntry)
+        self.tamanho_por_txt = {}       # { "KERNEL.txt": bytes }
+        self.total_arquivos = 0
+        self.total_bytes = 0
+        self.pastas_visitadas = 0
+        self.pastas_podadas = 0
+        self.manifesto_novo = {}        # { "core/a.js": {tamanho, mtime_ns, sha256, txt, offset, bytes} }
+        self.arquivos_reutilizados = 0
+        self.arquivos_relidos = 0
+        self.blobs_novos = 0
+        self.tempo_escrita = 0.0
+        self.tamanho_descomprimido = 0
+        self.r = None
+        self.pasta_run_anterior = None
+        self.manifesto_anterior = {}
+        self.git_anterior = None        # {"commit", "sujos"} gravado pela execução anterior
+        self.git_commit = None
+        self.git_sujos = []             # alterados em relação ao HEAD + não rastreados, nesta execução
+        self.git_alterados = None       # None = decidir reaproveitamento por tamanho/mtime
+        self.historico_git = None       # { "core/a.js": [hash, data do autor, commits] } (--historico-git)
+        self.duplicados = 0
+        self.bytes_economizados = 0
+        self.git_rastreados = 0
+        self.git_listados_nao_rastreados = 0
+
+    # --------------------------------------------------------
+    # Apoio
+    # --------------------------------------------------------
+
+    def definir_run(self, id_run):
+        """Caminhos da RUN_ (e do LOG) para o id da execução."""
+        self.timestamp_str = id_run
+        self.pasta_run = self.base / f"RUN_{id_run}"
+        self.log_path = self.pasta_logs / f"consolidacao_{id_run}.log"
+        self.relatorio_path = self.log_path.with_suffix(".tempos.json")
+        self.arquivo_geral = self.pasta_run / f"consolidacao_{id_run}.txt{self.sufixo}"
+        self.index_path = self.pasta_run / "INDEX.txt"
+
+    def descartar_run(self):
+        """Apaga a RUN_ recém-criada de uma execução que falhou antes de gravar nela."""
+        try:
+            self.pasta_run.rmdir()
+        except OSError:
+            pass  # não está vazia: fica para o diagnóstico
+
+    def pasta_do_relativo(self, relativo):
+        """Seção (.txt) de um caminho relativo ao ROOT; None se estiver fora das raízes."""
+        if self.raizes:
+            for raiz, secao in self.raizes.items():
+                if relativo.startswith(raiz + "/"):
+                    return secao
+            return None
+        return relativo.split("/", 1)[0] if "/" in relativo else "ROOT"
+
+    def registrar_erro(self, path, exc):
+        if isinstance(exc, ArquivoIgnorado):
+            self.registrar_ignorado(path, exc.motivo)
+            return
+        erro = (str(path), repr(exc))
+        if self.erros_vistos is not None:
+            if erro in self.erros_vistos:
+                return
+            self.erros_vistos.add(erro)
+        self.erros_leitura.append(erro)
+        self.erros_por_tipo[type(exc).__name__] += 1
+
+    def registrar_ignorado(self, path, motivo):
+        ignorado = (str(path), motivo)
+        if ignorado in self.ignorados_vistos:
+            return  # o --watch refaz a triagem da pasta a cada atualização
+        self.ignorados_vistos.add(ignorado)
+        self.ignorados.append(ignorado)
+        self.ignorados_por_motivo[motivo] += 1
+
+    def chave_manifesto(self, caminho_arquivo):
+        return caminho_arquivo.relative_to(self.root).as_posix()
+
+    def item_do_arquivo(self, caminho_arquivo):
+        stat = self.stat_por_arquivo.get(caminho_arquivo) or caminho_arquivo.stat()
+        return ItemArquivo(
+            chave=self.chave_manifesto(caminho_arquivo),
+            caminho=str(caminho_arquivo),
+            tamanho=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            modificado=datetime.fromtimestamp(stat.st_mtime).strftime(FORMATO_DATA),
+        )
+
+    def ler_fonte(self, item):
+        """ler_arquivo_js cronometrado; roda nas threads de leitura."""
+        inicio = time.perf_counter()
+        dados = ler_arquivo_js(Path(item.caminho), self.triagem)
+        self.tempos_leitura.append((time.perf_counter() - inicio, len(dados), item.chave))
+        return dados
+
+    def itens_da_pasta(self, pasta):
+        """ItemArquivo da pasta em ordem de caminho, sem os maiores que tamanho_maximo."""
+        arquivos = sorted(self.mapa_por_pasta.get(pasta, []), key=lambda p: str(p.relative_to(self.root)))
+        itens = []
+        for item in map(self.item_do_arquivo, arquivos):
+            if self.tamanho_maximo is not None and item.tamanho > self.tamanho_maximo:
+                self.registrar_ignorado(item.caminho, MOTIVO_TAMANHO)
+            else:
+                itens.append(item)
+        return itens
+
+    def carregar_em_ordem(self, tarefas, carregar):
+        return carregar_em_ordem(tarefas, self.workers, carregar, self.motor.pool)
+
+    def resolver_run(self, nome):
+        pasta = Path(nome)
+        if not pasta.is_dir():
+            pasta = self.base / nome
+        return pasta
+
+    # --------------------------------------------------------
+    # Manifesto e reaproveitamento
+    # --------------------------------------------------------
+
+    def carregar_manifesto(self):
+        """
+        Lê (ou pega do cache do Motor) o manifesto da execução anterior. Só
+        é aproveitado se a pasta RUN a que ele se refere ainda existir e não
+        for a desta execução; qualquer problema vira execução completa.
+        """
+        nome_run, entradas, self.git_anterior = self.motor.manifesto(self.manifesto_path)
+        if not nome_run:
+            return None, {}
+
+        pasta_run = self.base / nome_run
+        if pasta_run == self.pasta_run or not pasta_run.is_dir():
+            return None, {}
+
+        return pasta_run, entradas
+
+    def entrada_reaproveitavel(self, item, nome_txt):
+        """
+        Retorna a entrada do manifesto se tamanho e mtime não mudaram (ou, no
+        modo git, se o caminho não está entre os alterados).
+        """
+        entrada = self.manifesto_anterior.get(item.chave)
+        if entrada is None or entrada.get("txt") != nome_txt:
+            return None
+
+        # Bloco compactado só serve para execução compactada, e vice-versa
+        if ("compacto" in entrada) != self.compacto:
+            return None
+
+        if self.git_alterados is not None:
+            return None if item.chave in self.git_alterados else entrada
+
+        if entrada["tamanho"] != item.tamanho or entrada["mtime_ns"] != item.mtime_ns:
+            return None
+
+        return entrada
+
+    def salvar_manifesto(self):
+        git = {"commit": self.git_commit, "sujos": self.git_sujos} if self.git_commit else None
+        dados = {"versao": VERSAO_MANIFESTO, "run": self.pasta_run.name, "arquivos": self.manifesto_novo}
+        if git:
+            dados["git"] = git
+
+        gravar_json_atomico(self.manifesto_path, dados)
+        self.motor.lembrar_manifesto(self.manifesto_path, self.pasta_run.name, self.manifesto_novo, git)
+
+    # --------------------------------------------------------
+    # Armazém de blobs
+    # --------------------------------------------------------
+
+    def caminho_blob(self, hash_conteudo):
+        return self.pasta_blobs / hash_conteudo[:2] / hash_conteudo
+
+    def ler_blob(self, hash_conteudo):
+        return self.caminho_blob(hash_conteudo).read_bytes()
+
+    def gravar_blob(self, hash_conteudo, dados):
+        """Grava o blob se ainda não existir. Retorna True quando ele é novo."""
+        destino = self.caminho_blob(hash_conteudo)
+        if destino.exists():
+            return False
+
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        # Nome temporário único: duas threads podem gravar o mesmo conteúdo
+        temporario = temporario_unico(destino)
+        temporario.write_bytes(dados)
+        os.replace(temporario, destino)
+        return True
+
+    # --------------------------------------------------------
+    # Leitura (executada nas threads do pool)
+    # --------------------------------------------------------
+
+    def ler_bloco_anterior(self, entrada):
+        """
+        Recupera os bytes de um arquivo inalterado direto do .txt da execução
+        anterior (ou do frame gzip, se ela foi comprimida, ou do blob, se ela
+        foi --blobs). Retorna None se o trecho não confere com o hash registrado.
+        """
+        if "mesmo_que" in entrada:
+            # Repetido: o conteúdo está no bloco do primeiro arquivo igual
+            entrada = self.manifesto_anterior.get(entrada["mesmo_que"])
+            if entrada is None or "mesmo_que" in entrada:
+                return None
+
+        frame = entrada.get("frame")
+        try:
+            if "offset" not in entrada:
+                dados = self.ler_blob(entrada["sha256"])
+            elif frame is None:
+                with open(self.pasta_run_anterior / entrada["txt"], "rb") as txt_anterior:
+                    txt_anterior.seek(entrada["offset"])
+                    dados = txt_anterior.read(entrada["bytes"])
+            else:
+                with open(self.pasta_run_anterior / (entrada["txt"] + ".gz"), "rb") as txt_anterior:
+                    txt_anterior.seek(frame[0])
+                    texto = descomprimir_frame(txt_anterior.read(frame[1]))
+                inicio = entrada["offset"] - frame[2]
+                dados = texto[inicio:inicio + entrada["bytes"]]
+        except (OSError, ValueError, zlib.error):
+            return None
+
+        if hashlib.sha256(dados).hexdigest() != entrada["sha256"]:
+            return None
+
+        return dados
+
+    def carregar_conteudo(self, tarefa):
+        """
+        Executada nas threads de leitura; nunca levanta exceção.
+        Retorna (dados, sha256, reaproveitado, erro).
+        """
+        item, entrada = tarefa
+        # --compacto com destinos extras: os destinos recebem o fonte original
+        # (a cópia e o JSONL descrevem o arquivo do disco, não o compactado)
+        guardar_original = self.compacto and self.destinos
+
+        if entrada is not None:
+            dados = self.ler_bloco_anterior(entrada)
+            if dados is not None:
+                if not self.compacto:
+                    return dados, entrada["sha256"], True, None
+                compactacao = dict(entrada["compacto"])
+                try:
+                    if guardar_original:
+                        compactacao["original"] = self.ler_fonte(item)
+                except Exception:
+                    pass  # releitura completa abaixo, que registra o erro
+                else:
+                    self.compactacao[item.chave] = compactacao
+                    return dados, entrada["sha256"], True, None
+
+        try:
+            dados = self.ler_fonte(item)
+            if self.compacto:
+                original = dados
+                dados, linhas = compactar_js(dados)
+                self.compactacao[item.chave] = {"bytes_originais": len(original), "linhas": linhas}
+                if guardar_original:
+                    self.compactacao[item.chave]["original"] = original
+        except Exception as e:
+            return None, None, False, e
+
+        return dados, hashlib.sha256(dados).hexdigest(), False, None
+
+    def carregar_para_blobs(self, tarefa):
+        """
+        Variante do modo --blobs: arquivo inalterado cujo blob já existe não é
+        lido; os demais são lidos e gravados no armazém na própria thread.
+        Retorna (bytes, sha256, reaproveitado, erro, blob_novo).
+        """
+        item, entrada = tarefa
+
+        if entrada is not None and self.caminho_blob(entrada["sha256"]).exists():
+            return entrada["bytes"], entrada["sha256"], True, None, False
+
+        try:
+            dados = self.ler_fonte(item)
+            hash_conteudo = hashlib.sha256(dados).hexdigest()
+            novo = self.gravar_blob(hash_conteudo, dados)
+        except Exception as e:
+            return None, None, False, e, False
+
+        return len(dados), hash_conteudo, False, None, novo
+
+    def carregar_do_blob(self, tarefa):
+        """Leitura usada por materializar: o conteúdo vem só do armazém."""
+        item, hash_conteudo = tarefa
+        try:
+            dados = self.ler_blob(hash_conteudo)
+        except OSError as e:
+            return None, None, True, e
+        return dados, hash_conteudo, True, None
+
+    # --------------------------------------------------------
+    # Escrita das saídas
+    # --------------------------------------------------------
+
+    def salvar_indice_offsets(self, pasta_destino, root, nome_geral, indice_offsets, reducao=None):
+        dados = {
+            "versao": VERSAO_INDEX,
+            "root": str(root),
+            "comprimido": self.comprimir,
+            "geral": nome_geral,
+            "arquivos": indice_offsets,
+        }
+        if reducao is not None:
+            # --compacto: { "core.txt": {bytes_originais, bytes} }
+            dados["compacto"] = {
+                nome_txt: {"bytes_originais": originais, "bytes": compactos}
+                for nome_txt, (originais, compactos) in reducao.items()
+            }
+        with open(pasta_destino / NOME_INDEX_JSON, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, sort_keys=True)
+
+    def salvar_mapa_linhas(self, linhas):
+        with open(self.pasta_run / NOME_MAPA_LINHAS, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "versao": VERSAO_MAPA_LINHAS,
+                    "formato": "[linha compactada, linha original, quantidade]",
+                    "arquivos": linhas,
+                },
+                f, ensure_ascii=False, sort_keys=True,
+            )
+
+    @staticmethod
+    def novo_resultado():
+        return {
+            "tamanho_por_txt": {},
+            "offsets": {},
+            "manifesto": {},
+            "secoes": {},
+            "total_arquivos": 0,
+            "total_bytes": 0,
+            "tamanho_descomprimido": 0,
+            "reutilizados": 0,
+            "relidos": 0,
+            "espera_leitura": 0.0,
+            "tempo_escrita": 0.0,
+            "destinos": {},
+            "linhas": {},               # --compacto: { chave: mapa de linhas }
+            "reducao": {},              # --compacto: { nome_txt: [bytes originais, bytes compactados] }
+            "primeiros": {},            # { sha256: ItemArquivo } do primeiro arquivo emitido (--dedup)
+            "duplicados": 0,
+            "bytes_economizados": 0,
+        }
+
+    def escrever_secao(
+        self, nome_txt, pasta, itens, resultados, path_txt, geral, root, data, r, fragmentador=None, destinos=(),
+    ):
+        """
+        Grava o .txt de uma pasta em `path_txt` e, no mesmo passo, o marcador e a
+        seção correspondentes em `geral`. Acumula totais, offsets e entradas de
+        manifesto em `r`; r["secoes"][nome_txt] recebe [início lógico, início em
+        disco, fim lógico, fim em disco] da seção (marcador incluído) em `geral`.
+        """
+        bytes_txt = 0
+        validos = 0
+        entradas_pasta = {}
+        offsets_pasta = {}
+
+        marcador = (geral.posicao, geral.posicao_disco)
+        geral.write(f"\n\n### INÍCIO DE {nome_txt} ###\n\n")
+        geral.fechar_frame()
+        inicio_secao = (geral.posicao, geral.posicao_disco)
+
+        with open(path_txt, "wb") as arquivo_txt:
+            txt = Saida(arquivo_txt, self.comprimir)
+            out = SaidaEspelhada(txt, geral)
+            cabecalho = texto_cabecalho_txt(root, data, pasta, len(itens)).encode("utf-8")
+            out.write(cabecalho)
+            out.fechar_frame()
+            cabecalho_gravado = out.ultimo_membro if self.comprimir else cabecalho
+
+            for item in itens:
+                t0 = time.perf_counter()
+                dados, hash_conteudo, reaproveitado, erro = next(resultados)
+                r["espera_leitura"] += time.perf_counter() - t0
+
+                if erro is not None:
+                    self.registrar_erro(item.caminho, erro)
+                    continue
+
+                if reaproveitado:
+                    r["reutilizados"] += 1
+                else:
+                    r["relidos"] += 1
+
+                compactacao = self.compactacao.pop(item.chave, None)
+                fonte_original = None
+                if compactacao is not None:
+                    fonte_original = compactacao.pop("original", None)
+                    r["linhas"][item.chave] = compactacao["linhas"]
+                    reducao = r["reducao"].setdefault(nome_txt, [0, 0])
+                    reducao[0] += compactacao["bytes_originais"]
+                    reducao[1] += len(dados)
+
+                if validos:
+                    out.write(DELIMITADOR)
+
+                # --dedup: conteúdo já emitido vira só uma referência ao primeiro
+                # (a não ser que a referência seja maior que o próprio arquivo)
+                original = r["primeiros"].setdefault(hash_conteudo, item) if self.dedup else item
+                emitido = dados
+                if original is not item:
+                    referencia = f"SAME_AS: {original.caminho}\n".encode("utf-8")
+                    if len(referencia) < len(dados):
+                        emitido = referencia
+                        r["duplicados"] += 1
+                        r["bytes_economizados"] += len(dados) - len(emitido)
+                    else:
+                        original = item
+
+                inicio_bloco = out.posicao
+                inicio_bloco_geral = out.posicao_geral
+                cabecalho_bloco = texto_cabecalho_bloco(item, self.historico_do_item(item)).encode("utf-8")
+                out.write(cabecalho_bloco)
+
+                offset = out.posicao
+                bytes_txt += out.write(emitido)
+                validos += 1
+
+                if fragmentador is not None:
+                    fragmentador.adicionar(item, cabecalho_bloco, emitido)
+                if fonte_original is not None:
+                    hash_original = hashlib.sha256(fonte_original).hexdigest()
+                    for destino in destinos:
+                        destino.adicionar(item, pasta, fonte_original, hash_original)
+                else:
+                    for destino in destinos:
+                        destino.adicionar(item, pasta, dados, hash_conteudo)
+
+                frame_txt, frame_geral = out.fechar_frame()
+
+                offsets_pasta[item.chave] = entrada_indice = {
+                    "txt": nome_txt,
+                    "offset_txt": inicio_bloco,
+                    "offset_geral": inicio_bloco_geral,
+                    "tamanho_bloco": offset - inicio_bloco + len(emitido),
+                    "inicio_conteudo": offset - inicio_bloco,
+                    "bytes": len(emitido),
+                    "sha256": hash_conteudo,
+                }
+
+                entradas_pasta[item.chave] = entrada_manifesto = {
+                    "tamanho": item.tamanho,
+                    "mtime_ns": item.mtime_ns,
+                    "sha256": hash_conteudo,
+                    "txt": nome_txt,
+                    "offset": offset,
+                    "bytes": len(dados),
+                }
+
+                if frame_txt is not None:
+                    entrada_indice["frame_txt"] = frame_txt
+                    entrada_indice["frame_geral"] = frame_geral
+                    entrada_manifesto["frame"] = list(frame_txt)
+
+                if compactacao is not None:
+                    entrada_manifesto["compacto"] = compactacao
+
+                if original is not item:
+                    # O manifesto aponta para o primeiro; o bloco daqui não tem o conteúdo
+                    entrada_indice["mesmo_que"] = original.chave
+                    entrada_manifesto["mesmo_que"] = original.chave
+                    del entrada_manifesto["offset"]
+                    entrada_manifesto.pop("frame", None)
+
+        if validos != len(itens):
+            cabecalho_novo = texto_cabecalho_txt(root, data, pasta, validos).encode("utf-8")
+            deslocamento, deslocamento_disco = corrigir_total_arquivos(
+                path_txt, geral, inicio_secao, cabecalho_gravado, cabecalho_novo
+            )
+            for entrada in entradas_pasta.values():
+                if "offset" in entrada:
+                    entrada["offset"] += deslocamento
+                    deslocar_frame(entrada.get("frame"), deslocamento, deslocamento_disco)
+            for entrada in offsets_pasta.values():
+                entrada["offset_txt"] += deslocamento
+                entrada["offset_geral"] += deslocamento
+                deslocar_frame(entrada.get("frame_txt"), deslocamento, deslocamento_disco)
+                deslocar_frame(entrada.get("frame_geral"), deslocamento, deslocamento_disco)
+
+        r["manifesto"].update(entradas_pasta)
+        r["offsets"].update(offsets_pasta)
+        r["secoes"][nome_txt] = [*marcador, geral.posicao, geral.posicao_disco]
+        r["tamanho_por_txt"][nome_txt] = bytes_txt
+        r["tamanho_descomprimido"] += geral.posicao - inicio_secao[0]
+        r["total_arquivos"] += validos
+        r["total_bytes"] += bytes_txt
+
+    def escrever_saidas(self, plano, resultados, path_geral, root, data, fragmentador=None, destinos=()):
+        """
+        Escritor único da consolidação: consome `resultados` na ordem do
+        `plano` [(nome_txt, pasta, [ItemArquivo, ...]), ...] e grava, na pasta
+        de `path_geral`, os .txt por pasta e a consolidação geral numa só passada
+        (e os shards, se houver `fragmentador`, e cada um dos `destinos` extras).
+        Retorna um dicionário com
+        totais, offsets, seções do arquivo geral e entradas de manifesto.
+        """
+        r = self.novo_resultado()
+        inicio_escrita = time.perf_counter()
+
+        with open(path_geral, "wb") as arquivo_geral:
+            geral = Saida(arquivo_geral, self.comprimir)
+            geral.write(f"ROOT: {root}\n")
+            geral.write(f"DATA DA CONSOLIDAÇÃO: {data}\n\n")
+            geral.write(SEPARADOR_FORTE + "\n\n")
+            geral.fechar_frame()
+
+            for nome_txt, pasta, itens in plano:
+                path_txt = path_geral.parent / (nome_txt + self.sufixo)
+                self.escrever_secao(
+                    nome_txt, pasta, itens, resultados, path_txt, geral, root, data, r, fragmentador, destinos
+                )
+
+            r["tamanho_descomprimido"] += geral.posicao
+            r["fim_geral"] = [geral.posicao, geral.posicao_disco]
+
+        if fragmentador is not None:
+            fragmentador.fechar()
+            r["shards"] = fragmentador.total
+
+        for destino in destinos:
+            r["destinos"][destino.nome] = destino.fechar()
+
+        r["tempo_escrita"] = time.perf_counter() - inicio_escrita - r["espera_leitura"]
+        return r
+
+    def salvar_manifesto_run(self, plano, hashes):
+        """MANIFEST.json da RUN_ no modo --blobs: tudo o que materializar precisa."""
+        pastas = []
+        for nome_txt, pasta, itens in plano:
+            pastas.append({
+                "txt": nome_txt,
+                "pasta": pasta,
+                "arquivos": [
+                    dict(item._asdict(), sha256=hashes[item.chave], **self.historico_para_manifesto(item))
+                    for item in itens if item.chave in hashes
+                ],
+            })
+
+        with open(self.pasta_run / NOME_MANIFESTO_RUN, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "versao": VERSAO_MANIFESTO_RUN,
+                    "root": str(self.root),
+                    "data": self.timestamp_humano,
+                    "geral": f"consolidacao_{self.timestamp_str}.txt",
+                    "pastas": pastas,
+                },
+                f, ensure_ascii=False, indent=1,
+            )
+
+    # --------------------------------------------------------
+    # Comandos auxiliares (materializar / gc / diff)
+    # --------------------------------------------------------
+
+    def materializar(self, pasta_run):
+        """
+        Reconstrói os .txt por pasta, a consolidação geral e o INDEX.json de uma
+        execução --blobs a partir do MANIFEST.json e do armazém de blobs. A
+        saída é idêntica à que a execução teria gravado diretamente.
+        """
+        dados = json.loads((pasta_run / NOME_MANIFESTO_RUN).read_text(encoding="utf-8"))
+        if dados.get("versao") != VERSAO_MANIFESTO_RUN:
+            raise ValueError(f"Versão de MANIFEST.json não suportada: {dados.get('versao')}")
+
+        plano = []
+        tarefas = []
+        for secao in dados["pastas"]:
+            itens = []
+            for registro in secao["arquivos"]:
+                item = ItemArquivo(*(registro[campo] for campo in ItemArquivo._fields))
+                itens.append(item)
+                tarefas.append((item, registro["sha256"]))
+                if "git" in registro:
+                    self.historico_git = self.historico_git or {}
+                    self.historico_git[item.chave] = registro["git"]
+            plano.append((secao["txt"], secao["pasta"], itens))
+
+        path_geral = pasta_run / (dados["geral"] + self.sufixo)
+        fragmentador = None
+        if self.orcamento_shard:
+            fragmentador = Fragmentador(pasta_run / "SHARDS", self.orcamento_shard, dados["root"], dados["data"])
+
+        resultados = self.carregar_em_ordem(tarefas, self.carregar_do_blob)
+        r = self.escrever_saidas(plano, resultados, path_geral, dados["root"], dados["data"], fragmentador)
+        self.salvar_indice_offsets(pasta_run, dados["root"], path_geral.name, r["offsets"])
+        return r
+
+    def coletar_lixo(self):
+        """
+        Apaga os blobs que nenhuma RUN_ existente (nem o manifest.json usado
+        para reaproveitamento) referencia. Retorna (blobs apagados, bytes liberados).
+        """
+        referenciados = set()
+
+        for manifesto_run in self.base.glob(f"RUN_*/{NOME_MANIFESTO_RUN}"):
+            dados = json.loads(manifesto_run.read_text(encoding="utf-8"))
+            for secao in dados["pastas"]:
+                referenciados.update(registro["sha256"] for registro in secao["arquivos"])
+
+        _, manifesto, _ = self.motor.manifesto(self.manifesto_path)
+        referenciados.update(entrada["sha256"] for entrada in manifesto.values())
+
+        apagados = 0
+        liberados = 0
+        if self.pasta_blobs.is_dir():
+            for blob in self.pasta_blobs.glob("*/*"):
+                if blob.name in referenciados:
+                    continue
+                liberados += blob.stat().st_size
+                blob.unlink()
+                apagados += 1
+
+        return apagados, liberados
+
+    def carregar_run(self, pasta_run):
+        """
+        Hashes por arquivo de uma RUN_, sem ler o conteúdo: do MANIFEST.json
+        (execução --blobs) ou do INDEX.json. Retorna (entradas, ler_conteudo),
+        onde ler_conteudo(entrada) devolve os bytes do arquivo naquela RUN_.
+        """
+        manifesto_run = pasta_run / NOME_MANIFESTO_RUN
+        if manifesto_run.exists():
+            dados = json.loads(manifesto_run.read_text(encoding="utf-8"))
+            entradas = {
+                registro["chave"]: registro
+                for secao in dados["pastas"] for registro in secao["arquivos"]
+            }
+            return entradas, lambda entrada: self.ler_blob(entrada["sha256"])
+
+        dados = json.loads((pasta_run / NOME_INDEX_JSON).read_text(encoding="utf-8"))
+        sufixo = ".gz" if dados.get("comprimido") else ""
+
+        entradas = dados["arquivos"]
+
+        def ler_conteudo(entrada):
+            entrada = entradas.get(entrada.get("mesmo_que"), entrada)
+            inicio = entrada["offset_txt"] + entrada["inicio_conteudo"]
+            frame = entrada.get("frame_txt")
+            with open(pasta_run / (entrada["txt"] + sufixo), "rb") as txt:
+                if frame is None:
+                    txt.seek(inicio)
+                    return txt.read(entrada["bytes"])
+                txt.seek(frame[0])
+                texto = descomprimir_frame(txt.read(frame[1]))
+            inicio -= frame[2]
+            return texto[inicio:inicio + entrada["bytes"]]
+
+        for entrada in entradas.values():
+            # INDEX.json de versões anteriores não guardava o hash
+            if "sha256" not in entrada:
+                entrada["sha256"] = hashlib.sha256(ler_conteudo(entrada)).hexdigest()
+        return entradas, ler_conteudo
+
+    def diff_runs(self, pasta_a, pasta_b, saida):
+        """
+        Compara duas RUN_ pelos hashes registrados e grava em `saida` o diff
+        unificado só dos arquivos alterados, adicionados ou removidos. Arquivos
+        com o mesmo hash não são abertos. Retorna os contadores por situação.
+        """
+        entradas_a, ler_a = self.carregar_run(pasta_a)
+        entradas_b, ler_b = self.carregar_run(pasta_b)
+
+        contagem = {"alterados": 0, "adicionados": 0, "removidos": 0, "identicos": 0}
+        diferentes = []
+        for chave in sorted(set(entradas_a) | set(entradas_b)):
+            a = entradas_a.get(chave)
+            b = entradas_b.get(chave)
+            if a is not None and b is not None and a["sha256"] == b["sha256"]:
+                contagem["identicos"] += 1
+                continue
+            diferentes.append((chave, a, b))
+
+        def carregar_par(tarefa):
+            chave, a, b = tarefa
+            antes = ler_a(a).decode("utf-8") if a is not None else ""
+            depois = ler_b(b).decode("utf-8") if b is not None else ""
+            return antes, depois
+
+        pares = self.carregar_em_ordem(diferentes, carregar_par)
+        for (chave, a, b), (antes, depois) in zip(diferentes, pares):
+            if a is None:
+                contagem["adicionados"] += 1
+            elif b is None:
+                contagem["removidos"] += 1
+            else:
+                contagem["alterados"] += 1
+
+            linhas = difflib.unified_diff(
+                antes.splitlines(keepends=True), depois.splitlines(keepends=True),
+                fromfile=f"{pasta_a.name}/{chave}" if a is not None else "/dev/null",
+                tofile=f"{pasta_b.name}/{chave}" if b is not None else "/dev/null",
+            )
+            for linha in linhas:
+                saida.write(linha)
+                if not linha.endswith("\n"):
+                    saida.write("\n\\ No newline at end of file\n")
+
+        return contagem
+
+    # --------------------------------------------------------
+    # Varredura
+    # --------------------------------------------------------
+
+    def pasta_excluida(self, nome, relativo):
+        if nome in self.pastas_excluidas:
+            return True
+        return any(fnmatch(nome, p) or fnmatch(relativo, p) for p in self.padroes_excluidos)
+
+    def varrer_arquivos_js(self, raiz, prefixo="", recursivo=True, mapa=None, stats=None):
+        """
+        Varredura única com os.scandir: poda as pastas excluídas antes de
+        descer nelas e guarda o stat do próprio DirEntry para os cabeçalhos.
+        É o único ponto que preenche mapa_por_pasta. O --watch usa `prefixo`
+        (caminho relativo de `raiz`, com "/" final) e `recursivo=False` para
+        revarrer uma só pasta, e `mapa`/`stats` próprios no modo polling.
+        """
+        mapa = self.mapa_por_pasta if mapa is None else mapa
+        stats = self.stat_por_arquivo if stats is None else stats
+
+        pendentes = [(raiz, prefixo)]
+        while pendentes:
+            pasta_atual, prefixo = pendentes.pop()
+            self.pastas_visitadas += 1
+
+            try:
+                with os.scandir(pasta_atual) as it:
+                    entradas = list(it)
+            except OSError as e:
+                self.registrar_erro(pasta_atual, e)
+                continue
+
+            for entrada in entradas:
+                relativo = prefixo + entrada.name
+
+                try:
+                    eh_pasta = entrada.is_dir(follow_symlinks=False)
+                except OSError:
+                    eh_pasta = False
+
+                if eh_pasta:
+                    if not recursivo:
+                        continue
+                    if self.pasta_excluida(entrada.name, relativo):
+                        self.pastas_podadas += 1
+                    else:
+                        pendentes.append((entrada.path, relativo + "/"))
+                    continue
+
+                if not entrada.name.endswith(self.extensoes):
+                    continue
+
+                caminho = Path(entrada.path)
+
+                # Exclusões explícitas
+                if caminho in self.excluir:
+                    continue
+
+                try:
+                    if not entrada.is_file():
+                        continue
+                    stats[caminho] = entrada.stat()
+                except OSError as e:
+                    self.registrar_erro(caminho, e)
+                    continue
+
+                mapa.setdefault(self.pasta_do_relativo(relativo), []).append(caminho)
+
+    # --------------------------------------------------------
+    # Modo --git (enumeração pelo índice do git)
+    # --------------------------------------------------------
+
+    def git(self, *args):
+        """Uma chamada ao git no ROOT; devolve a saída (use -z) decodificada."""
+        try:
+            saida = subprocess.run(["git", "-C", str(self.root), *args], capture_output=True, check=True).stdout
+        except OSError as e:
+            raise ValueError(f"git indisponível: {e}") from e
+        except subprocess.CalledProcessError as e:
+            detalhe = e.stderr.decode("utf-8", "replace").strip()
+            raise ValueError(f"git {args[0]} falhou em {self.root}: {detalhe}") from e
+        return saida.decode("utf-8", "surrogateescape")
+
+    def git_caminhos(self, *args):
+        """Caminhos relativos ao ROOT de um comando git com -z, filtrados pelas extensões."""
+        pathspecs = [f"*{extensao}" for extensao in self.extensoes]
+        return [c for c in self.git(*args, "-z", "--", *pathspecs).split("\0") if c]
+
+    def listar_pelo_git(self):
+        """
+        Substitui a varredura: os arquivos vêm do índice do git (e dos não
+        rastreados, se pedido), com as mesmas exclusões de pastas e o stat só
+        dos arquivos listados. Preenche mapa_por_pasta e decide, pelo git diff
+        contra o commit da execução anterior, quais arquivos precisam ser relidos.
+        """
+        try:
+            self.git_commit = self.git("rev-parse", "--verify", "HEAD").strip()
+        except ValueError:
+            self.git_commit = None  # repositório sem commits: ainda dá para listar o índice
+            self.git("rev-parse", "--git-dir")
+
+        rastreados = {}
+        for linha in self.git_caminhos("ls-files", "-s"):
+            metadados, relativo = linha.split("\t", 1)
+            if metadados.split(" ", 1)[0] != MODO_SUBMODULO:
+                rastreados[relativo] = True  # entradas em conflito repetem o caminho
+        nao_rastreados = self.git_caminhos("ls-files", "-o", "--exclude-standard") if self.git_nao_rastreados else []
+
+        self.git_rastreados = len(rastreados)
+        self.git_listados_nao_rastreados = len(nao_rastreados)
+
+        for relativo in [*rastreados, *nao_rastreados]:
+            pasta_chave = self.pasta_do_relativo(relativo)
+            if pasta_chave is None:
+                continue
+            partes = relativo.split("/")
+            if any(self.pasta_excluida(parte, "/".join(partes[:i + 1])) for i, parte in enumerate(partes[:-1])):
+                continue
+
+            caminho = self.root / relativo
+            if caminho in self.excluir:
+                continue
+
+            try:
+                stat = caminho.stat()
+            except OSError:
+                continue  # rastreado mas apagado da cópia de trabalho
+            if not caminho.is_file():
+                continue
+
+            self.stat_por_arquivo[caminho] = stat
+            self.mapa_por_pasta.setdefault(pasta_chave, []).append(caminho)
+
+        if self.git_commit:
+            sujos = set(self.git_caminhos("diff", "--name-only", "--relative", "HEAD"))
+            self.git_sujos = sorted(sujos.union(nao_rastreados))
+
+        anterior = self.git_anterior or {}
+        if self.git_commit and anterior.get("commit"):
+            if anterior["commit"] == self.git_commit:
+                alterados = set(self.git_sujos)
+            else:
+                try:
+                    alterados = set(self.git_caminhos("diff", "--name-only", "--relative", anterior["commit"]))
+                except ValueError:
+                    alterados = None  # commit anterior sumiu (rebase, gc): volta para tamanho/mtime
+            if alterados is not None:
+                self.git_alterados = alterados.union(anterior.get("sujos", ()), nao_rastreados)
+
+    # --------------------------------------------------------
+    # Histórico do git nos cabeçalhos (--historico-git)
+    # --------------------------------------------------------
+
+    def carregar_historico_git(self):
+        """
+        Último commit, data do autor e número de commits de cada arquivo, para
+        a árvore toda, num único `git log --name-only` lido em fluxo (nada de
+        um git por arquivo). O primeiro commit em que um caminho aparece é o
+        mais recente; os seguintes só incrementam a contagem.
+        """
+        pathspecs = [f"*{extensao}" for extensao in self.extensoes]
+        comando = [
+            "git", "-C", str(self.root), "log", "-z", "--name-only", "--relative", "--no-renames",
+            f"--format={FORMATO_LOG_GIT}", f"--date=format-local:{FORMATO_DATA}", "--", *pathspecs,
+        ]
+        historico = {}
+        commit = None
+        resto = b""
+        try:
+            processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            raise ValueError(f"git indisponível: {e}") from e
+
+        with processo:
+            for pedaco in iter(lambda: processo.stdout.read(BYTES_LEITURA_GIT), b""):
+                registros = (resto + pedaco).split(b"\0")
+                resto = registros.pop()
+                for registro in registros:
+                    registro = registro.lstrip(b"\n")
+                    if registro.startswith(b"\x01"):
+                        commit, data = registro[1:].decode("ascii").split("\x02", 1)
+                    elif registro and commit is not None:
+                        caminho = registro.decode("utf-8", "surrogateescape")
+                        entrada = historico.get(caminho)
+                        if entrada is None:
+                            historico[caminho] = [commit, data, 1]
+                        else:
+                            entrada[2] += 1
+            erro = processo.stderr.read().decode("utf-8", "replace").strip()
+
+        if processo.returncode:
+            if "does not have any commits" in erro:
+                return {}  # repositório recém-criado: ninguém tem histórico ainda
+            raise ValueError(f"git log falhou em {self.root}: {erro}")
+        return historico
+
+    def historico_do_item(self, item):
+        """[hash, data, commits], [] para arquivo sem histórico, ou None sem --historico-git."""
+        if self.historico_git is None:
+            return None
+        return self.historico_git.get(item.chave, [])
+
+    def historico_para_manifesto(self, item):
+        historico = self.historico_do_item(item)
+        return {} if historico is None else {"git": historico}
+
+    # --------------------------------------------------------
+    # Execução completa
+    # --------------------------------------------------------
+
+    def executar(self):
+        """
+        Roda a consolidação inteira e devolve as estatísticas (ver
+        estatisticas()). Com CONSOLIDACAO_PERFIL definido, roda dentro do
+        cProfile ou do tracemalloc.
+        """
+        perfil = os.environ.get(VARIAVEL_PERFIL, "").strip().lower()
+        if perfil and perfil not in PERFIS:
+            raise ValueError(f"{VARIAVEL_PERFIL} deve ser um de {', '.join(PERFIS)}, não {perfil!r}")
+
+        if perfil == "cprofile":
+            perfilador = cProfile.Profile()
+            perfilador.runcall(self.executar_fases)
+            self.gravar_cprofile(perfilador)
+        elif perfil == "tracemalloc":
+            tracemalloc.start()
+            try:
+                self.executar_fases()
+                self.gravar_tracemalloc(tracemalloc.take_snapshot(), tracemalloc.get_traced_memory())
+            finally:
+                tracemalloc.stop()
+        else:
+            self.executar_fases()
+
+        return self.estatisticas()
+
+    def executar_fases(self):
+        fase = self.cronometro.fase
+
+        with fase("preparacao"):
+            self.base.mkdir(exist_ok=True)
+            self.pasta_logs.mkdir(exist_ok=True)
+            _, id_run = criar_pasta_run(self.base, self.timestamp_str)
+            self.definir_run(id_run)
+            self.pasta_run_anterior, self.manifesto_anterior = self.carregar_manifesto()
+
+        try:
+            with fase("varredura"):
+                if self.modo_git:
+                    self.listar_pelo_git()
+                elif self.raizes:
+                    for raiz in self.raizes:
+                        self.varrer_arquivos_js(self.root / raiz, raiz + "/")
+                else:
+                    self.varrer_arquivos_js(self.root)
+            if self.com_historico_git:
+                with fase("historico_git"):
+                    self.historico_git = self.carregar_historico_git()
+        except ValueError:
+            # git recusou (fora de um repositório, git ausente): nada foi gravado ainda
+            self.descartar_run()
+            raise
+        self.processar()
+        with fase("index_txt"):
+            self.gravar_index_txt()
+        with fase("log"):
+            self.gravar_log()
+        self.gravar_relatorio()
+
+    def processar(self):
+        """
+        Processamento por pasta + consolidação geral em passada única. Cada
+        arquivo é lido uma única vez e seus bytes vão, no mesmo passo, para o
+        .txt da pasta e para a consolidação geral. As pastas seguem a ordem
+        dos nomes dos .txt, que é a ordem das seções no arquivo geral. As
+        leituras rodam em paralelo; a escrita fica toda na thread chamadora.
+        """
+        plano = []
+        for nome_txt, pasta in sorted((f"{p}.txt", p) for p in self.mapa_por_pasta):
+            plano.append((nome_txt, pasta, self.itens_da_pasta(pasta)))
+
+        tarefas = (
+            (item, self.entrada_reaproveitavel(item, nome_txt))
+            for nome_txt, _, itens in plano
+            for item in itens
+        )
+
+        if self.modo_blobs:
+            # Nada de .txt agora: só blobs novos e o MANIFEST.json da RUN_
+            hashes = {}
+            inicio_escrita = time.perf_counter()
+
+            with self.cronometro.fase("leitura_e_escrita"):
+                resultados = self.carregar_em_ordem(tarefas, self.carregar_para_blobs)
+                for nome_txt, _, itens in plano:
+                    bytes_txt = 0
+                    for item in itens:
+                        tamanho, hash_conteudo, reaproveitado, erro, novo = next(resultados)
+                        if erro is not None:
+                            self.registrar_erro(item.caminho, erro)
+                            continue
+
+                        if reaproveitado:
+                            self.arquivos_reutilizados += 1
+                        else:
+                            self.arquivos_relidos += 1
+                        self.blobs_novos += novo
+
+                        hashes[item.chave] = hash_conteudo
+                        bytes_txt += tamanho
+                        self.manifesto_novo[item.chave] = {
+                            "tamanho": item.tamanho,
+                            "mtime_ns": item.mtime_ns,
+                            "sha256": hash_conteudo,
+                            "txt": nome_txt,
+                            "bytes": tamanho,
+                        }
+                        self.total_arquivos += 1
+
+                    self.tamanho_por_txt[nome_txt] = bytes_txt
+                    self.total_bytes += bytes_txt
+
+            with self.cronometro.fase("manifesto"):
+                self.salvar_manifesto_run(plano, hashes)
+            self.tempo_escrita = time.perf_counter() - inicio_escrita
+        else:
+            fragmentador = None
+            if self.orcamento_shard:
+                fragmentador = Fragmentador(
+                    self.pasta_run / "SHARDS", self.orcamento_shard, self.root, self.timestamp_humano
+                )
+
+            destinos = [
+                DESTINOS[d](self.pasta_run, self.root, self.timestamp_humano) if isinstance(d, str) else d
+                for d in self.destinos
+            ]
+
+            with self.cronometro.fase("leitura_e_escrita"):
+                resultados = self.carregar_em_ordem(tarefas, self.carregar_conteudo)
+                r = self.r = self.escrever_saidas(
+                    plano, resultados, self.arquivo_geral, self.root, self.timestamp_humano, fragmentador, destinos
+                )
+            with self.cronometro.fase("index_json"):
+                self.salvar_indice_offsets(
+                    self.pasta_run, self.root, self.arquivo_geral.name, r["offsets"],
+                    r["reducao"] if self.compacto else None,
+                )
+                if self.compacto:
+                    self.salvar_mapa_linhas(r["linhas"])
+
+            self.manifesto_novo.update(r["manifesto"])
+            self.tamanho_por_txt = r["tamanho_por_txt"]
+            self.total_arquivos = r["total_arquivos"]
+            self.total_bytes = r["total_bytes"]
+            self.arquivos_reutilizados = r["reutilizados"]
+            self.arquivos_relidos = r["relidos"]
+            self.tempo_escrita = r["tempo_escrita"]
+            self.tamanho_descomprimido = r["tamanho_descomprimido"]
+            self.duplicados = r["duplicados"]
+            self.bytes_economizados = r["bytes_economizados"]
+
+        with self.cronometro.fase("manifesto"):
+            self.salvar_manifesto()
+
+    def gravar_index_txt(self):
+        with open(self.index_path, "w", encoding="utf-8") as idx:
+            idx.write(f"ROOT: {self.root}\n")
+            if self.raizes:
+                idx.write(f"RAIZES: {', '.join(self.raizes)}\n")
+            idx.write(f"DATA: {self.timestamp_humano}\n\n")
+
+            for nome_txt in sorted(self.tamanho_por_txt.keys()):
+                qt = len(self.mapa_por_pasta.get(nome_txt.replace(".txt", ""), []))
+                tamanho = self.tamanho_por_txt[nome_txt]
+                idx.write(f"{nome_txt:<12} — {qt} arquivos — {tamanho} bytes")
+                if self.compacto and self.r:
+                    originais, compactos = self.r["reducao"].get(nome_txt, (0, 0))
+                    idx.write(f" — compactado de {originais} bytes ({percentual_reducao(originais, compactos)})")
+                idx.write("\n")
+
+            idx.write("\nTOTAL GERAL:\n")
+            idx.write(f"- Arquivos: {self.total_arquivos}\n")
+            idx.write(f"- Tamanho: {self.total_bytes} bytes\n")
+
+    def gravar_log(self):
+        self.uso_disco = sum(f.stat().st_size for f in self.pasta_run.iterdir() if f.is_file())
+
+        self.fim_execucao = datetime.now()
+        self.duracao = (self.fim_execucao - self.inicio_execucao).total_seconds()
+
+        with open(self.log_path, "w", encoding="utf-8") as log:
+            log.write(f"DATA_INICIO: {self.timestamp_humano}\n")
+            log.write(f"ROOT: {self.root}\n")
+            if self.raizes:
+                log.write(f"RAIZES: {', '.join(f'{raiz} → {secao}.txt' for raiz, secao in self.raizes.items())}\n")
+            log.write("\n")
+
+            log.write(f"PASTAS_ENCONTRADAS: {len(self.mapa_por_pasta)}\n")
+            if self.modo_git:
+                alterados = "?" if self.git_alterados is None else len(self.git_alterados)
+                log.write(
+                    f"ENUMERACAO: git (HEAD {(self.git_commit or 'sem commits')[:12]}; "
+                    f"{self.git_rastreados} rastreados, {self.git_listados_nao_rastreados} não rastreados; "
+                    f"{alterados} alterados desde a execução anterior)\n"
+                )
+            if self.historico_git is not None:
+                com_historico = sum(1 for chave in self.manifesto_novo if chave in self.historico_git)
+                tempo = self.cronometro.fases.get("historico_git", {"parede": 0.0})["parede"]
+                log.write(
+                    f"HISTORICO_GIT: {com_historico} de {len(self.manifesto_novo)} arquivos com commits "
+                    f"(1 git log, {tempo:.3f}s)\n"
+                )
+            log.write(f"PASTAS_VISITADAS: {self.pastas_visitadas}\n")
+            log.write(f"PASTAS_PODADAS: {self.pastas_podadas}\n")
+            log.write(f"TOTAL_ARQUIVOS_JS: {self.total_arquivos}\n")
+            log.write(f"ARQUIVOS_REUTILIZADOS: {self.arquivos_reutilizados}\n")
+            log.write(f"ARQUIVOS_RELIDOS: {self.arquivos_relidos}\n")
+            if self.modo_blobs:
+                log.write(f"BLOBS_NOVOS: {self.blobs_novos}\n")
+            log.write(f"WORKERS_LEITURA: {self.workers}\n\n")
+
+            log.write("POR_PASTA:\n")
+            for pasta in sorted(self.mapa_por_pasta.keys()):
+                qtd = len(self.mapa_por_pasta[pasta])
+                log.write(f"- {pasta}: {qtd} arquivos\n")
+
+            log.write("\nERROS_DE_LEITURA:\n")
+            if self.erros_leitura:
+                for caminho, erro in self.erros_leitura:
+                    log.write(f"- {caminho} → {erro}\n")
+            else:
+                log.write("Nenhum erro de leitura.\n")
+
+            if self.ignorados:
+                contagem = ", ".join(f"{m}={n}" for m, n in sorted(self.ignorados_por_motivo.items()))
+                log.write(f"\nARQUIVOS_IGNORADOS ({contagem}):\n")
+                for caminho, motivo in self.ignorados:
+                    log.write(f"- {caminho} → {motivo}\n")
+
+            log.write("\nARQUIVOS_GERADOS:\n")
+            if self.modo_blobs:
+                log.write(f"- {NOME_MANIFESTO_RUN} (saídas sob demanda: materializar {self.pasta_run.name})\n")
+                log.write("- INDEX.txt\n\n")
+            else:
+                for nome_txt in sorted(self.tamanho_por_txt.keys()):
+                    log.write(f"- {nome_txt}{self.sufixo}\n")
+
+                log.write("- INDEX.txt\n")
+                log.write("- INDEX.json\n")
+                log.write(f"- {self.arquivo_geral.name}\n\n")
+
+            if self.r and self.r["destinos"]:
+                log.write("DESTINOS (mesma leitura):\n")
+                for nome, resumo in self.r["destinos"].items():
+                    log.write(f"- {nome}: {resumo['saida']} — {resumo['arquivos']} arquivos — {resumo['bytes']} bytes\n")
+                    for origem, destino in resumo.get("renomeacoes", ()):
+                        log.write(f"    RENOMEADO: {origem} -> {destino}\n")
+                log.write("\n")
+
+            log.write(f"DATA_FIM: {self.fim_execucao.strftime(FORMATO_DATA)}\n")
+            log.write(f"DURACAO: {self.duracao:.2f} segundos\n")
+            if self.orcamento_shard and not self.modo_blobs:
+                log.write(f"SHARDS: {self.r['shards']} (orçamento de {self.orcamento_shard} tokens estimados)\n")
+            log.write(f"TEMPO_ESCRITA: {self.tempo_escrita:.2f} segundos\n")
+            if self.compacto and self.r:
+                originais = sum(o for o, _ in self.r["reducao"].values())
+                compactos = sum(c for _, c in self.r["reducao"].values())
+                log.write(
+                    f"COMPACTACAO: {originais} bytes originais → {compactos} bytes "
+                    f"({percentual_reducao(originais, compactos)}; mapa de linhas em {NOME_MAPA_LINHAS})\n"
+                )
+            if self.dedup:
+                log.write(
+                    f"DEDUPLICACAO: {self.duplicados} arquivos repetidos viraram SAME_AS; "
+                    f"{self.bytes_economizados} bytes economizados "
+                    f"(~{(self.bytes_economizados + BYTES_POR_TOKEN - 1) // BYTES_POR_TOKEN} tokens)\n"
+                )
+            log.write(f"RELATORIO_TEMPOS: {self.relatorio_path.name}\n")
+            log.write(f"USO_DISCO: {self.uso_disco} bytes ({self.tamanho_descomprimido} bytes descomprimidos)\n")
+
+    def gravar_relatorio(self):
+        """Relatório JSON de tempos e vazão (ver VERSAO_RELATORIO)."""
+        parede = self.cronometro.total("parede")
+        lidos = self.tempos_leitura
+        segundos_lendo = sum(t for t, _, _ in lidos)
+        bytes_lidos = sum(b for _, b, _ in lidos)
+
+        fases = {
+            nome: {"parede": round(f["parede"], 6), "cpu": round(f["cpu"], 6)}
+            for nome, f in self.cronometro.fases.items()
+        }
+        if self.r:
+            # Leitura e escrita correm juntas: quanto o escritor esperou pelas
+            # threads de leitura e quanto gastou gravando .txt + geral (espelhados)
+            fases["leitura_e_escrita"]["espera_pela_leitura"] = round(self.r["espera_leitura"], 6)
+            fases["leitura_e_escrita"]["escrita"] = round(self.r["tempo_escrita"], 6)
+
+        relatorio = {
+            "versao": VERSAO_RELATORIO,
+            "root": str(self.root),
+            "run": self.pasta_run.name,
+            "inicio": self.timestamp_humano,
+            "workers": self.workers,
+            "parede": round(parede, 6),
+            "cpu": round(self.cronometro.total("cpu"), 6),
+            "fases": fases,
+            "vazao": {
+                "arquivos": self.total_arquivos,
+                "bytes": self.total_bytes,
+                "arquivos_por_segundo": round(self.total_arquivos / parede, 2) if parede else None,
+                "mb_por_segundo": round(self.total_bytes / parede / 1e6, 3) if parede else None,
+                "arquivos_lidos_do_disco": len(lidos),
+                "bytes_lidos_do_disco": bytes_lidos,
+                # Soma dos tempos das threads: vazão de uma leitura, não do pool
+                "mb_por_segundo_por_leitura": (
+                    round(bytes_lidos / segundos_lendo / 1e6, 3) if segundos_lendo else None
+                ),
+            },
+            "mais_lentos": [
+                {"arquivo": chave, "segundos": round(segundos, 6), "bytes": tamanho}
+                for segundos, tamanho, chave in heapq.nlargest(ARQUIVOS_MAIS_LENTOS, lidos)
+            ],
+            "erros_por_tipo": dict(sorted(self.erros_por_tipo.items())),
+            "ignorados_por_motivo": dict(sorted(self.ignorados_por_motivo.items())),
+        }
+
+        with open(self.relatorio_path, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        return relatorio
+
+    def gravar_cprofile(self, perfilador):
+        """<log>.cprofile (carregável com pstats) e um resumo por tempo acumulado."""
+        caminho = self.log_path.with_suffix(".cprofile")
+        perfilador.dump_stats(caminho)
+        with open(caminho.with_suffix(".cprofile.txt"), "w", encoding="utf-8") as f:
+            pstats.Stats(perfilador, stream=f).sort_stats("cumulative").print_stats(LINHAS_PERFIL)
+
+    def gravar_tracemalloc(self, snapshot, memoria):
+        atual, pico = memoria
+        with open(self.log_path.with_suffix(".tracemalloc.txt"), "w", encoding="utf-8") as f:
+            f.write(f"MEMORIA_ATUAL: {atual} bytes\n")
+            f.write(f"MEMORIA_PICO: {pico} bytes\n\n")
+            f.write(f"MAIORES_ALOCACOES (top {LINHAS_PERFIL}, por linha):\n")
+            for estatistica in snapshot.statistics("lineno")[:LINHAS_PERFIL]:
+                f.write(f"- {estatistica}\n")
+
+    def estatisticas(self):
+        """Resumo estruturado da execução (os mesmos números do LOG)."""
+        return {
+            "root": str(self.root),
+            "run": self.pasta_run.name,
+            "pasta_run": str(self.pasta_run),
+            "raizes": list(self.raizes),
+            "log": str(self.log_path),
+            "relatorio_tempos": str(self.relatorio_path),
+            "pastas": {
+                pasta: len(arquivos) for pasta, arquivos in sorted(self.mapa_por_pasta.items())
+            },
+            "bytes_por_txt": dict(self.tamanho_por_txt),
+            "total_arquivos": self.total_arquivos,
+            "total_bytes": self.total_bytes,
+            "arquivos_reutilizados": self.arquivos_reutilizados,
+            "arquivos_relidos": self.arquivos_relidos,
+            "blobs_novos": self.blobs_novos,
+            "enumeracao": "git" if self.modo_git else "varredura",
+            "git_commit": self.git_commit,
+            "git_alterados": None if self.git_alterados is None else len(self.git_alterados),
+            "historico_git": None if self.historico_git is None else len(self.historico_git),
+            "pastas_visitadas": self.pastas_visitadas,
+            "pastas_podadas": self.pastas_podadas,
+            "erros_leitura": list(self.erros_leitura),
+            "erros_por_tipo": dict(self.erros_por_tipo),
+            "ignorados": list(self.ignorados),
+            "ignorados_por_motivo": dict(self.ignorados_por_motivo),
+            "workers": self.workers,
+            "duracao": self.duracao,
+            "tempo_escrita": self.tempo_escrita,
+            "uso_disco": self.uso_disco,
+            "tamanho_descomprimido": self.tamanho_descomprimido,
+            "shards": self.r.get("shards", 0) if self.r else 0,
+            "destinos": dict(self.r["destinos"]) if self.r else {},
+            "reducao_por_txt": dict(self.r["reducao"]) if self.r else {},
+            "duplicados": self.duplicados,
+            "bytes_economizados": self.bytes_economizados,
+        }
+
+    # --------------------------------------------------------
+    # Modo --watch (atualização ao vivo)
+    # --------------------------------------------------------
+
+    def pastas_alteradas_por_varredura(self):
+        """
+        Revarre a árvore inteira e compara tamanho/mtime com o estado em
+        memória. Usado pelo polling, por overflow do inotify e na partida.
+        """
+        mapa = {}
+        stats = {}
+        self.varrer_arquivos_js(self.root, mapa=mapa, stats=stats)
+
+        def assinatura(m, s, pasta):
+            return {(c, s[c].st_size, s[c].st_mtime_ns) for c in m.get(pasta, [])}
+
+        return {
+            pasta for pasta in set(mapa) | set(self.mapa_por_pasta)
+            if assinatura(mapa, stats, pasta) != assinatura(self.mapa_por_pasta, self.stat_por_arquivo, pasta)
+        }
+
+    def pastas_do_evento(self, inotify, prefixo, nome, mascara):
+        """Traduz um evento inotify na pasta de topo afetada (ou None)."""
+        if mascara & IN_Q_OVERFLOW or prefixo is None:
+            return None
+
+        relativo = prefixo + nome
+        eh_pasta = bool(mascara & IN_ISDIR)
+
+        if eh_pasta:
+            if self.pasta_excluida(nome, relativo):
+                return set()
+            if mascara & IN_MOVED_FROM:
+                inotify.esquecer(relativo + "/")
+            if mascara & (IN_CREATE | IN_MOVED_TO):
+                inotify.observar_arvore(self.root / relativo, relativo + "/")
+        elif not nome.endswith(self.extensoes):
+            return set()
+
+        if "/" in relativo:
+            return {relativo.split("/", 1)[0]}
+        return {relativo if eh_pasta else "ROOT"}
+
+    def esperar_mudancas(self, inotify):
+        """
+        Bloqueia até haver mudança e devolve (pastas afetadas, instante do
+        primeiro evento). Eventos em rajada dentro de ESPERA_EVENTOS são juntados.
+        """
+        if inotify is None:
+            time.sleep(INTERVALO_POLLING)
+            inicio = time.perf_counter()
+            return self.pastas_alteradas_por_varredura(), inicio
+
+        eventos = inotify.ler()
+        inicio = time.perf_counter()
+        while eventos:
+            lote = inotify.ler(ESPERA_EVENTOS)
+            if not lote:
+                break
+            eventos += lote
+
+        pastas = set()
+        for prefixo, nome, mascara in eventos:
+            afetadas = self.pastas_do_evento(inotify, prefixo, nome, mascara)
+            if afetadas is None:
+                return self.pastas_alteradas_por_varredura(), inicio
+            pastas |= afetadas
+        return pastas, inicio
+
+    def revarrer_pasta(self, pasta):
+        for caminho in self.mapa_por_pasta.pop(pasta, []):
+            self.stat_por_arquivo.pop(caminho, None)
+
+        if pasta == "ROOT":
+            self.varrer_arquivos_js(self.root, recursivo=False)
+        elif (self.root / pasta).is_dir() and not self.pasta_excluida(pasta, pasta):
+            self.varrer_arquivos_js(self.root / pasta, pasta + "/")
+
+    def atualizar_pasta(self, pasta):
+        """
+        Regrava só o .txt de `pasta` (reaproveitando os blocos inalterados do
+        próprio .txt atual) e remenda a seção dela na consolidação geral: o
+        trecho anterior e o posterior são copiados como estão e os offsets das
+        seções seguintes são deslocados em memória.
+        """
+        secoes = self.r["secoes"]
+        fim_geral = self.r["fim_geral"]
+        offsets_geral = self.r["offsets"]
+
+        nome_txt = f"{pasta}.txt"
+        self.revarrer_pasta(pasta)
+        itens = self.itens_da_pasta(pasta)
+
+        path_txt = self.pasta_run / (nome_txt + self.sufixo)
+        path_secao = self.pasta_run / (nome_txt + ".secao.tmp")
+        r_pasta = self.novo_resultado()
+
+        with open(path_secao, "wb") as arquivo_secao:
+            if itens:
+                txt_novo = path_txt.with_name(path_txt.name + ".novo")
+                tarefas = ((item, self.entrada_reaproveitavel(item, nome_txt)) for item in itens)
+                resultados = self.carregar_em_ordem(tarefas, self.carregar_conteudo)
+                secao = Saida(arquivo_secao, self.comprimir)
+                self.escrever_secao(
+                    nome_txt, pasta, itens, resultados, txt_novo, secao, self.root, self.timestamp_humano, r_pasta
+                )
+                os.replace(txt_novo, path_txt)
+            else:
+                self.mapa_por_pasta.pop(pasta, None)
+                path_txt.unlink(missing_ok=True)
+
+        # Posição da seção no geral; pasta nova entra antes da seguinte na ordem
+        antiga = secoes.get(nome_txt)
+        if antiga is None:
+            seguintes = sorted(n for n in secoes if n > nome_txt)
+            inicio_l, inicio_d = secoes[seguintes[0]][:2] if seguintes else fim_geral
+            antiga = [inicio_l, inicio_d, inicio_l, inicio_d]
+        inicio_l, inicio_d, fim_l, fim_d = antiga
+
+        novo_l, novo_d = r_pasta["secoes"].get(nome_txt, [0, 0, 0, 0])[2:]
+        delta_l = novo_l - (fim_l - inicio_l)
+        delta_d = novo_d - (fim_d - inicio_d)
+
+        temporario = self.arquivo_geral.with_name(self.arquivo_geral.name + ".tmp")
+        with open(self.arquivo_geral, "rb") as antigo, open(temporario, "wb") as novo:
+            copiar_intervalo(antigo, novo, 0, inicio_d)
+            with open(path_secao, "rb") as arquivo_secao:
+                copiar_intervalo(arquivo_secao, novo)
+            copiar_intervalo(antigo, novo, fim_d)
+        os.replace(temporario, self.arquivo_geral)
+        path_secao.unlink()
+
+        # Estado em memória: seções, índice de offsets, manifesto e totais
+        for nome, posicoes in secoes.items():
+            if nome > nome_txt:
+                posicoes[:] = [posicoes[0] + delta_l, posicoes[1] + delta_d, posicoes[2] + delta_l, posicoes[3] + delta_d]
+        fim_geral[0] += delta_l
+        fim_geral[1] += delta_d
+
+        removidos = [chave for chave, entrada in offsets_geral.items() if entrada["txt"] == nome_txt]
+        for chave in removidos:
+            del offsets_geral[chave]
+        for entrada in offsets_geral.values():
+            if entrada["txt"] > nome_txt:
+                entrada["offset_geral"] += delta_l
+                deslocar_frame(entrada.get("frame_geral"), delta_l, delta_d)
+        for entrada in r_pasta["offsets"].values():
+            entrada["offset_geral"] += inicio_l
+            deslocar_frame(entrada.get("frame_geral"), inicio_l, inicio_d)
+        offsets_geral.update(r_pasta["offsets"])
+
+        for chave in [c for c, entrada in self.manifesto_novo.items() if entrada.get("txt") == nome_txt]:
+            del self.manifesto_novo[chave]
+        self.manifesto_novo.update(r_pasta["manifesto"])
+
+        self.total_arquivos += r_pasta["total_arquivos"] - len(removidos)
+        self.total_bytes += r_pasta["total_bytes"] - self.tamanho_por_txt.pop(nome_txt, 0)
+
+        if itens:
+            secoes[nome_txt] = [inicio_l, inicio_d, inicio_l + novo_l, inicio_d + novo_d]
+            self.tamanho_por_txt[nome_txt] = r_pasta["total_bytes"]
+        else:
+            secoes.pop(nome_txt, None)
+
+    def aplicar_mudancas(self, pastas, inicio, avisar):
+        erros_antes = len(self.erros_leitura)
+        inicio_atualizacao = time.perf_counter()
+
+        for pasta in sorted(pastas):
+            self.atualizar_pasta(pasta)
+
+        self.salvar_indice_offsets(self.pasta_run, self.root, self.arquivo_geral.name, self.r["offsets"])
+        self.salvar_manifesto()
+        self.gravar_index_txt()
+
+        fim = time.perf_counter()
+        latencia = (fim - inicio) * 1000
+        atualizacao = (fim - inicio_atualizacao) * 1000
+        nomes = ", ".join(f"{p}.txt" for p in sorted(pastas))
+        agora = datetime.now().strftime(FORMATO_DATA)
+
+        avisar(f"↻ {nomes} atualizado em {latencia:.1f} ms ({atualizacao:.1f} ms de escrita)")
+        for caminho, erro in self.erros_leitura[erros_antes:]:
+            avisar(f"⚠ {caminho} → {erro}")
+
+        with open(self.log_path, "a", encoding="utf-8") as log:
+            log.write(f"WATCH: {agora} — {nomes} — LATENCIA: {latencia:.1f} ms — ESCRITA: {atualizacao:.1f} ms\n")
+            for caminho, erro in self.erros_leitura[erros_antes:]:
+                log.write(f"- {caminho} → {erro}\n")
+
+    def observar(self, polling=False, avisar=None):
+        """
+        Mantém a consolidação desta RUN_ atualizada até Ctrl+C. O manifesto e o
+        índice de offsets ficam em memória; cada mudança regrava só o .txt da
+        pasta afetada e remenda a consolidação geral.
+        `avisar(mensagem)` recebe o início, cada atualização e o encerramento.
+        """
+        avisar = avisar or (lambda mensagem: None)
+        if self.r is None:
+            raise ValueError("observar() precisa de uma execução em texto já concluída (sem --blobs)")
+        if self.raizes:
+            raise ValueError("observar() não suporta várias raízes: use uma execução por raiz")
+        if self.com_historico_git:
+            raise ValueError("observar() não suporta historico_git: commits novos mudariam cabeçalhos de pastas intactas")
+        if self.compacto:
+            raise ValueError("observar() não suporta compacto: o MAPA_LINHAS e a redução por pasta não são remendados")
+        if self.orcamento_shard is not None:
+            raise ValueError("observar() não suporta shards: os SHARDS não são refeitos a cada mudança")
+        if self.dedup:
+            raise ValueError("observar() não suporta dedup: remendar uma pasta mudaria as referências SAME_AS")
+
+        # Os blocos inalterados passam a vir da própria RUN_ atual
+        self.pasta_run_anterior, self.manifesto_anterior = self.pasta_run, self.manifesto_novo
+        # Cada revarredura e cada releitura de pasta encontraria os mesmos erros de novo
+        self.erros_vistos = set(self.erros_leitura)
+
+        inotify = None
+        if not polling:
+            try:
+                inotify = Inotify(self.pasta_excluida)
+                inotify.observar_arvore(self.root)
+            except (OSError, AttributeError, TypeError) as e:
+                avisar(f"⚠ inotify indisponível ({e}); usando varredura a cada {INTERVALO_POLLING:g} s")
+                if inotify is not None:
+                    inotify.fechar()
+                inotify = None
+
+        modo = "inotify" if inotify is not None else f"varredura a cada {INTERVALO_POLLING:g} s"
+        avisar(f"👀 Observando {self.root} ({modo}). Ctrl+C para encerrar.")
+
+        # Mudanças feitas durante a consolidação inicial
+        pastas, inicio = self.pastas_alteradas_por_varredura(), time.perf_counter()
+        try:
+            while True:
+                if pastas:
+                    self.aplicar_mudancas(pastas, inicio, avisar)
+                pastas, inicio = self.esperar_mudancas(inotify)
+        except KeyboardInterrupt:
+            avisar("\n⏹ Observação encerrada.")
+        finally:
+            if inotify is not None:
+                inotify.fechar()
+
+# ============================================================
+# MOTOR (API PÚBLICA)
+# ============================================================
+
+class Motor:
+    """
+    Ponto de entrada da API. Guarda entre execuções o pool de leitura e os
+    manifestos já lidos de cada ROOT; use como context manager (ou chame
+    fechar()) para encerrar o pool.
+    """
+
+    def __init__(self, workers=WORKERS_PADRAO):
+        self.workers = max(1, workers)
+        self._pool = None
+        self._manifestos = {}       # { manifest.json: ((mtime_ns, tamanho), run, entradas) }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def fechar(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @property
+    def pool(self):
+        if self.workers <= 1:
+            return None
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="leitura")
+        return self._pool
+
+    # --------------------------------------------------------
+    # Cache de manifestos
+    # --------------------------------------------------------
+
+    @staticmethod
+    def _assinatura(path):
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def manifesto(self, path):
+        """(run, entradas, git) do manifest.json; só relê o arquivo se ele mudou no disco."""
+        try:
+            assinatura = self._assinatura(path)
+        except OSError:
+            return None, {}, None
+
+        em_cache = self._manifestos.get(path)
+        if em_cache is not None and em_cache[0] == assinatura:
+            return em_cache[1:]
+
+        try:
+            dados = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None, {}, None
+
+        if dados.get("versao") != VERSAO_MANIFESTO:
+            return None, {}, None
+
+        run, entradas, git = dados.get("run"), dados.get("arquivos", {}), dados.get("git")
+        self._manifestos[path] = (assinatura, run, entradas, git)
+        return run, entradas, git
+
+    def lembrar_manifesto(self, path, run, entradas, git=None):
+        self._manifestos[path] = (self._assinatura(path), run, entradas, git)
+
+    # --------------------------------------------------------
+    # CONSOLIDAÇÃO.py
+    # --------------------------------------------------------
+
+    def nova_consolidacao(self, root, **opcoes):
+        """
+        Prepara uma execução sem rodá-la (útil para o --watch). Opções:
+        comprimir, blobs, shards, pastas_excluidas, padroes_excluidos,
+        extensoes, excluir (caminhos de arquivos a ignorar) e raizes (subpastas
+        de `root` consolidadas como uma seção cada).
+        """
+        return Consolidacao(self, root, **opcoes)
+
+    def consolidar(self, root, **opcoes):
+        """Roda uma consolidação completa e devolve suas estatísticas."""
+        return self.nova_consolidacao(root, **opcoes).executar()
+
+    def consolidar_raizes(self, raizes, **opcoes):
+        """
+        Uma execução só para várias raízes (ex.: src, scripts e tests): uma
+        seção por raiz na mesma RUN_, gravada no códigos_consolidados da pasta
+        comum a todas, com o pool e o cache de manifesto deste Motor.
+        """
+        return self.consolidar(base_comum(raizes), raizes=raizes, **opcoes)
+
+    def materializar(self, root, runs, **opcoes):
+        execucao = self.nova_consolidacao(root, **opcoes)
+        resultados = []
+        for nome in runs:
+            pasta_run = execucao.resolver_run(nome)
+            erros_antes = len(execucao.erros_leitura)
+            r = execucao.materializar(pasta_run)
+            resultados.append({
+                "run": pasta_run.name,
+                "pasta_run": str(pasta_run),
+                "total_arquivos": r["total_arquivos"],
+                "total_bytes": r["total_bytes"],
+                "erros_leitura": execucao.erros_leitura[erros_antes:],
+            })
+        return resultados
+
+    def coletar_lixo(self, root):
+        apagados, liberados = self.nova_consolidacao(root).coletar_lixo()
+        return {"blobs_apagados": apagados, "bytes_liberados": liberados}
+
+    def diff(self, root, run_a, run_b, saida):
+        execucao = self.nova_consolidacao(root)
+        return execucao.diff_runs(execucao.resolver_run(run_a), execucao.resolver_run(run_b), saida)
+
+    # --------------------------------------------------------
+    # copiar_com_cabecalho_e_log.py
+    # --------------------------------------------------------
+
+    @staticmethod
+    def listar_para_copia(root, base, excluir, avisar):
+        """
+        Os .js de `root` para a cópia achatada, em ordem de caminho (os nomes
+        dos arquivos novos não dependem da ordem do rglob): [(relativo,
+        caminho, partes, (tamanho, mtime_ns) ou None)].
+        """
+        # Varredura apenas de .js
+        arquivos_encontrados = list(root.rglob("*.js"))
+        avisar(f"Arquivos .js encontrados no total: {len(arquivos_encontrados)}")
+
+        candidatos = []
+        for caminho in arquivos_encontrados:
+
+            # Exclusões explícitas (ex.: o próprio script)
+            if caminho in excluir:
+                continue
+
+            # Excluir tudo dentro de códigos_consolidados
+            if base in caminho.parents:
+                continue
+
+            try:
+                relativo = caminho.relative_to(root)
+            except Exception:
+                continue
+
+            try:
+                stat = caminho.stat()
+                assinatura = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                assinatura = None
+
+            candidatos.append((relativo.as_posix(), caminho, relativo.parts, assinatura))
+
+        candidatos.sort()
+        return candidatos
+
+    def copiar_com_cabecalho(self, root, excluir=(), avisar=None, forcar=False, pacote=None):
+        """
+        Copia cada .js de `root` para RUN_<ts>/<pasta de topo>/ (estrutura
+        achatada) com cabeçalho de origem, resolvendo colisões de nome com
+        __subpasta e __N, e grava INDEX.txt e LOG. Os nomes achatados ficam
+        em NOME_NOMES_COPIA e são reaproveitados nas execuções seguintes; se
+        nenhum .js mudou desde a última RUN_, nada é gravado (a não ser com
+        `forcar`) e o resultado aponta para ela com "sem_alteracoes".
+        Com `pacote` ("zip" ou "tar") a mesma estrutura vai, em fluxo, para um
+        único RUN_<ts>/COPIA.zip ou COPIA.tar.gz com o INDEX.txt dentro: as
+        leituras rodam no pool do Motor e as entradas saem na ordem de caminho.
+        `avisar(mensagem)` recebe as mensagens de progresso.
+        """
+        if pacote is not None and pacote not in PACOTES:
+            raise ValueError(f"Pacote desconhecido: {pacote} (use {', '.join(PACOTES)})")
+        avisar = avisar or (lambda mensagem: None)
+        root = Path(root).resolve()
+        excluir = {Path(p).resolve() for p in excluir}
+        formato = pacote or "pasta"
+
+        inicio = datetime.now()
+        timestamp_humano = inicio.strftime(FORMATO_DATA)
+
+        base = root / NOME_BASE
+        nomes_path = base / NOME_NOMES_COPIA
+        run_anterior, formato_anterior, anteriores = carregar_nomes_copia(nomes_path)
+
+        avisar(f"Root: {root}")
+        candidatos = self.listar_para_copia(root, base, excluir, avisar)
+
+        if not forcar and run_anterior and formato_anterior == formato and (base / run_anterior).is_dir():
+            atuais = {relativo: assinatura for relativo, _, _, assinatura in candidatos}
+            if atuais.keys() == anteriores.keys() and all(
+                atuais[relativo] == (entrada["tamanho"], entrada["mtime_ns"])
+                for relativo, entrada in anteriores.items()
+            ):
+                pasta_run = base / run_anterior
+                avisar(f"Nenhum .js mudou desde {run_anterior}: nada a gravar.")
+                return {
+                    "root": str(root),
+                    "run": run_anterior,
+                    "pasta_run": str(pasta_run),
+                    "index": None if pacote else str(pasta_run / "INDEX.txt"),
+                    "pacote": str(pasta_run / f"COPIA{PACOTES[pacote].extensao}") if pacote else None,
+                    "log": str(pasta_run / f"LOG_{run_anterior[len('RUN_'):]}.txt"),
+                    "sem_alteracoes": True,
+                    "arquivos_copiados": 0,
+                    "nomes_novos": 0,
+                    "vazao": None,
+                    "total_bytes": 0,
+                    "renomeacoes": [],
+                    "erros": [],
+                    "duracao": (datetime.now() - inicio).total_seconds(),
+                }
+
+        pasta_run, id_run = criar_pasta_run(base, inicio.strftime(FORMATO_RUN))
+        log_path = pasta_run / f"LOG_{id_run}.txt"
+        index_path = pasta_run / "INDEX.txt"
+        avisar(f"Pasta de saída: {pasta_run}")
+
+        erros = []
+        renomeacoes = []
+        arquivos_index = []
+        nomes = RegistroNomes(criar_pastas=pacote is None)
+        nomes_novos = {}
+
+        # Leituras no pool (à frente, em ordem); nomes decididos em série nesta
+        # thread; gravações de volta no pool, com no máximo `janela` pendentes.
+        # No pacote a gravação é em série (um único arquivo de saída).
+        saida_pacote = None
+        if pacote:
+            saida_pacote = PACOTES[pacote](pasta_run / f"COPIA{PACOTES[pacote].extensao}")
+        leituras = carregar_em_ordem(candidatos, self.workers, ler_para_copia, self.pool)
+        gravacoes = deque()
+        janela = self.workers * LEITURAS_POR_WORKER
+        latencias = []
+        progresso = Progresso(len(candidatos), avisar)
+        inicio_copia = time.perf_counter()
+
+        def concluir(relativo, caminho, assinatura, destino, tamanho, segundos):
+            arquivos_index.append(
+                (str(destino.relative_to(pasta_run)), tamanho, str(caminho))
+            )
+            tamanho_origem, mtime_origem = assinatura or (None, None)
+            nomes_novos[relativo] = {
+                "nome": destino.relative_to(pasta_run).as_posix(),
+                "tamanho": tamanho_origem,
+                "mtime_ns": mtime_origem,
+            }
+            latencias.append(segundos)
+            progresso.avancar(tamanho)
+
+        def concluir_gravacao():
+            futuro, contexto, segundos_leitura = gravacoes.popleft()
+            try:
+                tamanho, segundos = futuro.result()
+            except Exception as e:
+                erros.append((str(contexto[1]), repr(e)))
+                return
+            concluir(*contexto, tamanho, segundos_leitura + segundos)
+
+        # Nomes já atribuídos continuam reservados para os mesmos arquivos
+        presentes = {relativo for relativo, _, _, _ in candidatos}
+        for relativo, entrada in anteriores.items():
+            if relativo in presentes:
+                nomes.ocupar(pasta_run / entrada["nome"])
+
+        for relativo, caminho, partes, assinatura in candidatos:
+            pasta_chave, base_origem = origem_da_copia(root, partes)
+
+            anterior = anteriores.get(relativo)
+            if anterior is not None:
+                destino = pasta_run / anterior["nome"]
+                renomeado = destino.name != caminho.name
+            else:
+                # Pasta de destino achatada (criada uma vez; colisões resolvidas em memória)
+                destino, renomeado = nomes.destino(caminho, base_origem, pasta_run / pasta_chave)
+            if renomeado:
+                renomeacoes.append((str(caminho), str(destino)))
+
+            # Nome conhecido sem assinatura: reservado, mas não conta como inalterado
+            if anterior is not None:
+                nomes_novos[relativo] = {"nome": anterior["nome"], "tamanho": None, "mtime_ns": None}
+
+            # Ler conteúdo (já lido adiante pelo pool)
+            conteudo, erro, segundos_leitura = next(leituras)
+            if erro is not None:
+                erros.append((str(caminho), repr(erro)))
+                progresso.avancar(0)
+                continue
+
+            cabecalho_texto = texto_cabecalho_copia(caminho, pasta_chave, timestamp_humano)
+            nomes.ocupar(destino)
+            contexto = (relativo, caminho, assinatura, destino)
+
+            if saida_pacote is not None:
+                try:
+                    inicio_gravacao = time.perf_counter()
+                    dados = (cabecalho_texto + conteudo).encode("utf-8")
+                    saida_pacote.adicionar(destino.relative_to(pasta_run).as_posix(), dados)
+                except Exception as e:
+                    erros.append((str(caminho), repr(e)))
+                    continue
+                concluir(*contexto, len(dados), segundos_leitura + time.perf_counter() - inicio_gravacao)
+                continue
+
+            if self.pool is None:
+                try:
+                    tamanho, segundos = gravar_copia(destino, cabecalho_texto + conteudo)
+                except Exception as e:
+                    erros.append((str(caminho), repr(e)))
+                    continue
+                concluir(*contexto, tamanho, segundos_leitura + segundos)
+                continue
+
+            gravacoes.append((self.pool.submit(gravar_copia, destino, cabecalho_texto + conteudo), contexto, segundos_leitura))
+            while len(gravacoes) > janela:
+                concluir_gravacao()
+
+        while gravacoes:
+            concluir_gravacao()
+
+        progresso.fechar()
+        segundos_copia = time.perf_counter() - inicio_copia
+        arquivos_copiados = len(arquivos_index)
+        vazao = {
+            "workers": self.workers,
+            "segundos": round(segundos_copia, 6),
+            "arquivos_por_segundo": round(arquivos_copiados / segundos_copia, 2) if segundos_copia else None,
+            "mb_por_segundo": (
+                round(sum(t for _, t, _ in arquivos_index) / segundos_copia / 1e6, 3) if segundos_copia else None
+            ),
+            "p95_ms": round(percentil(latencias, 0.95) * 1000, 3) if latencias else None,
+        }
+
+        # INDEX.txt (dentro do pacote, por último, no modo pacote)
+        total_bytes = sum(t for _, t, _ in arquivos_index)
+        texto_index = texto_index_copia(root, timestamp_humano, arquivos_index)
+
+        if saida_pacote is not None:
+            saida_pacote.adicionar("INDEX.txt", texto_index.encode("utf-8"))
+            saida_pacote.fechar()
+            index_path = None
+        else:
+            with open(index_path, "wb") as idx:
+                idx.write(texto_index.encode("utf-8"))
+
+        # LOG
+        fim = datetime.now()
+        duracao = (fim - inicio).total_seconds()
+
+        with open(log_path, "w", encoding="utf-8") as log:
+            log.write(f"DATA_INICIO: {timestamp_humano}\n")
+            log.write(f"ROOT: {root}\n\n")
+
+            log.write(f"ARQUIVOS_JS_COPIADOS: {arquivos_copiados}\n")
+            log.write(
+                f"VAZAO: {vazao['arquivos_por_segundo']} arquivos/s, {vazao['mb_por_segundo']} MB/s, "
+                f"p95 {vazao['p95_ms']} ms por arquivo ({self.workers} workers)\n"
+            )
+            if saida_pacote is not None:
+                log.write(
+                    f"PACOTE: {saida_pacote.path.name} ({saida_pacote.path.stat().st_size} bytes, "
+                    f"INDEX.txt incluído)\n"
+                )
+            log.write("\n")
+
+            log.write("RENOMEACOES_AUTOMATICAS:\n")
+            if renomeacoes:
+                for origem, destino in renomeacoes:
+                    log.write(f"- {origem} -> {destino}\n")
+            else:
+                log.write("Nenhuma renomeação foi necessária.\n")
+
+            log.write("\nERROS:\n")
+            if erros:
+                for caminho, erro in erros:
+                    log.write(f"- {caminho} → {erro}\n")
+            else:
+                log.write("Nenhum erro.\n")
+
+            log.write(f"\nDATA_FIM: {fim.strftime(FORMATO_DATA)}\n")
+            log.write(f"DURACAO: {duracao:.2f} segundos\n")
+
+        salvar_nomes_copia(nomes_path, pasta_run.name, formato, nomes_novos)
+
+        return {
+            "root": str(root),
+            "run": pasta_run.name,
+            "pasta_run": str(pasta_run),
+            "index": None if index_path is None else str(index_path),
+            "pacote": None if saida_pacote is None else str(saida_pacote.path),
+            "log": str(log_path),
+            "sem_alteracoes": False,
+            "arquivos_copiados": arquivos_copiados,
+            "nomes_novos": sum(1 for relativo in nomes_novos if relativo not in anteriores),
+            "vazao": vazao,
+            "total_bytes": total_bytes,
+            "renomeacoes": renomeacoes,
+            "erros": erros,
+            "duracao": duracao,
+        }
+
+    def espelhar(self, root, excluir=(), avisar=None):
+        """
+        Mantém um único espelho achatado em códigos_consolidados/ESPELHO, com
+        a mesma regra de nomes e o mesmo cabeçalho da cópia, pagando só pelo
+        que mudou: arquivo com tamanho e mtime iguais nem é lido, com hash
+        igual não é reescrito, e o que sumiu da origem é apagado. INDEX.txt e
+        LOG.txt do espelho são regravados a cada sincronização.
+        """
+        avisar = avisar or (lambda mensagem: None)
+        root = Path(root).resolve()
+        excluir = {Path(p).resolve() for p in excluir}
+
+        inicio = datetime.now()
+        timestamp_humano = inicio.strftime(FORMATO_DATA)
+
+        base = root / NOME_BASE
+        pasta = base / NOME_ESPELHO
+        estado_path = pasta / NOME_ESTADO_ESPELHO
+        anteriores = carregar_estado_espelho(estado_path)
+
+        avisar(f"Root: {root}")
+        avisar(f"Pasta de saída: {pasta}")
+        candidatos = self.listar_para_copia(root, base, excluir, avisar)
+        presentes = {relativo for relativo, _, _, _ in candidatos}
+
+        # Primeiro as remoções: os nomes de quem sumiu ficam livres para os novos
+        removidos = []
+        for relativo, entrada in sorted(anteriores.items()):
+            if relativo not in presentes:
+                (pasta / entrada["nome"]).unlink(missing_ok=True)
+                removidos.append((str(root / relativo), entrada["nome"]))
+
+        nomes = RegistroNomes()
+        for relativo in presentes & anteriores.keys():
+            nomes.ocupar(pasta / anteriores[relativo]["nome"])
+
+        estado = {}
+        erros = []
+        renomeacoes = []
+        contagem = Counter()
+
+        for relativo, caminho, partes, assinatura in candidatos:
+            pasta_chave, base_origem = origem_da_copia(root, partes)
+            anterior = anteriores.get(relativo)
+
+            if anterior is not None and assinatura is not None and (
+                (anterior["tamanho"], anterior["mtime_ns"]) == assinatura and anterior["sha256"]
+            ):
+                estado[relativo] = anterior
+                contagem["inalterados"] += 1
+                continue
+
+            if anterior is not None:
+                destino = pasta / anterior["nome"]
+            else:
+                destino, renomeado = nomes.destino(caminho, base_origem, pasta / pasta_chave)
+                if renomeado:
+                    renomeacoes.append((str(caminho), str(destino)))
+            nome = destino.relative_to(pasta).as_posix()
+            tamanho_origem, mtime_origem = assinatura or (None, None)
+
+            # Mesma leitura da cópia (texto, quebras de linha normalizadas)
+            conteudo, erro, _ = ler_para_copia((relativo, caminho, partes, assinatura))
+            if erro is not None:
+                erros.append((str(caminho), repr(erro)))
+                # O nome continua reservado; a cópia antiga sai até a leitura voltar a funcionar
+                if anterior is not None:
+                    destino.unlink(missing_ok=True)
+                    estado[relativo] = {"nome": nome, "tamanho": None, "mtime_ns": None, "sha256": None, "bytes": None}
+                continue
+
+            dados = conteudo.encode("utf-8")
+            hash_conteudo = hashlib.sha256(dados).hexdigest()
+            if anterior is not None and anterior["sha256"] == hash_conteudo:
+                # Só o mtime mudou (touch, checkout): nada a reescrever
+                estado[relativo] = dict(anterior, tamanho=tamanho_origem, mtime_ns=mtime_origem)
+                contagem["conferidos"] += 1
+                continue
+
+            avisar(f"Copiando: {caminho} -> {nome}")
+            cabecalho = texto_cabecalho_copia(caminho, pasta_chave, timestamp_humano).encode("utf-8")
+            try:
+                with open(destino, "wb") as out:
+                    nomes.ocupar(destino)
+                    out.write(cabecalho)
+                    out.write(dados)
+            except Exception as e:
+                erros.append((str(caminho), repr(e)))
+                continue
+
+            estado[relativo] = {
+                "nome": nome,
+                "tamanho": tamanho_origem,
+                "mtime_ns": mtime_origem,
+                "sha256": hash_conteudo,
+                "bytes": len(cabecalho) + len(dados),
+            }
+            contagem["novos" if anterior is None else "reescritos"] += 1
+
+        # Pastas de topo que ficaram vazias
+        for pasta_vazia in sorted({(pasta / nome).parent for _, nome in removidos}, reverse=True):
+            try:
+                pasta_vazia.rmdir()
+            except OSError:
+                pass
+
+        # INDEX.txt (o espelho inteiro, sem reabrir os arquivos)
+        arquivos_index = sorted(
+            (entrada["nome"], entrada["bytes"], str(root / relativo))
+            for relativo, entrada in estado.items() if entrada["bytes"] is not None
+        )
+        total_bytes = sum(t for _, t, _ in arquivos_index)
+        pasta.mkdir(parents=True, exist_ok=True)
+        index_path = pasta / "INDEX.txt"
+        log_path = pasta / "LOG.txt"
+
+        with open(index_path, "wb") as idx:
+            idx.write(texto_index_copia(root, timestamp_humano, arquivos_index).encode("utf-8"))
+
+        salvar_estado_espelho(estado_path, estado)
+
+        # LOG (da última sincronização)
+        fim = datetime.now()
+        duracao = (fim - inicio).total_seconds()
+
+        with open(log_path, "w", encoding="utf-8") as log:
+            log.write(f"DATA_INICIO: {timestamp_humano}\n")
+            log.write(f"ROOT: {root}\n\n")
+
+            log.write(f"ARQUIVOS_NO_ESPELHO: {len(arquivos_index)}\n")
+            log.write(f"NOVOS: {contagem['novos']}\n")
+            log.write(f"REESCRITOS: {contagem['reescritos']}\n")
+            log.write(f"INALTERADOS: {contagem['inalterados']} (sem leitura)\n")
+            log.write(f"CONFERIDOS: {contagem['conferidos']} (mtime mudou, hash igual)\n")
+            log.write(f"REMOVIDOS: {len(removidos)}\n\n")
+
+            log.write("REMOCOES:\n")
+            if removidos:
+                for origem, nome in removidos:
+                    log.write(f"- {origem} -> {nome}\n")
+            else:
+                log.write("Nenhum arquivo removido.\n")
+
+            log.write("\nRENOMEACOES_AUTOMATICAS:\n")
+            if renomeacoes:
+                for origem, destino in renomeacoes:
+                    log.write(f"- {origem} -> {destino}\n")
+            else:
+                log.write("Nenhuma renomeação foi necessária.\n")
+
+            log.write("\nERROS:\n")
+            if erros:
+                for caminho, erro in erros:
+                    log.write(f"- {caminho} → {erro}\n")
+            else:
+                log.write("Nenhum erro.\n")
+
+            log.write(f"\nDATA_FIM: {fim.strftime(FORMATO_DATA)}\n")
+            log.write(f"DURACAO: {duracao:.2f} segundos\n")
+
+        return {
+            "root": str(root),
+            "pasta_espelho": str(pasta),
+            "index": str(index_path),
+            "log": str(log_path),
+            "arquivos": len(arquivos_index),
+            "novos": contagem["novos"],
+            "reescritos": contagem["reescritos"],
+            "inalterados": contagem["inalterados"],
+            "conferidos": contagem["conferidos"],
+            "removidos": removidos,
+            "total_bytes": total_bytes,
+            "renomeacoes": renomeacoes,
+            "erros": erros,
+            "duracao": duracao,
+        }
+
+    # --------------------------------------------------------
+    # TUDO.py
+    # --------------------------------------------------------
+
+    def concatenar(self, root, saida=None, avisar=None):
+        """
+        Junta todos os .js de `root` (ordem de caminho) num único arquivo,
+        separados por DELIMITADOR. Padrão: <root>/consolidado.txt.
+        """
+        avisar = avisar or (lambda mensagem: None)
+        inicio = time.perf_counter()
+        root = Path(root).resolve()
+        saida = Path(saida) if saida else root / "consolidado.txt"
+
+        avisar(f"Root detectado automaticamente: {root}")
+        avisar(f"Arquivo de saída: {saida}")
+
+        arquivos_js = sorted(root.rglob("*.js"))
+        avisar(f"Arquivos .js encontrados: {len(arquivos_js)}")
+
+        erros = []
+        escritos = 0
+        with open(saida, "w", encoding="utf-8") as out:
+            primeiro = True
+            for arquivo in arquivos_js:
+                avisar(f"Lendo: {arquivo.relative_to(root)}")
+
+                try:
+                    conteudo = arquivo.read_text(encoding="utf-8")
+                except Exception as e:
+                    avisar("❌ Erro ao ler arquivo:\n" + traceback.format_exc().rstrip())
+                    erros.append((str(arquivo), repr(e)))
+                    continue
+
+                if not primeiro:
+                    out.write(DELIMITADOR)
+
+                out.write(conteudo)
+                primeiro = False
+                escritos += 1
+
+        return {
+            "root": str(root),
+            "saida": str(saida),
+            "arquivos": escritos,
+            "erros": erros,
+            "duracao": time.perf_counter() - inicio,
+        }
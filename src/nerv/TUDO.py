@@ -1,42 +1,44 @@
 from pathlib import Path
+import argparse
+import sys
 import traceback
 
-print("=== INÍCIO DO SCRIPT ===")
+# O motor fica em src/, uma pasta acima desta
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-try:
-    ROOT = Path(__file__).resolve().parent
-    ARQUIVO_SAIDA = ROOT / "consolidado.txt"
+from motor_consolidacao import Motor
 
-    print(f"Root detectado automaticamente: {ROOT}")
-    print(f"Arquivo de saída: {ARQUIVO_SAIDA}")
+"""
+JUNTA TODOS OS .js NUM ÚNICO consolidado.txt
+--------------------------------------------
+Linha de comando do Motor.concatenar (motor_consolidacao.py). Por padrão
+junta a pasta onde este script está; um caminho opcional aponta para outra
+pasta e --sem-pausa dispensa o "Pressione Enter" do final.
+"""
 
-    arquivos_js = sorted(ROOT.rglob("*.js"))
+parser = argparse.ArgumentParser(description="Junta todos os .js da pasta num único consolidado.txt.")
+parser.add_argument("root", nargs="?", type=Path, help="pasta a juntar (padrão: a pasta deste script)")
+parser.add_argument("--sem-pausa", action="store_true", help="não espera Enter no final")
 
-    print(f"Arquivos .js encontrados: {len(arquivos_js)}")
+def main(argv=None):
+    args = parser.parse_args(argv)
 
-    with open(ARQUIVO_SAIDA, "w", encoding="utf-8") as out:
-        primeiro = True
-        for arquivo in arquivos_js:
-            print(f"Lendo: {arquivo.relative_to(ROOT)}")
+    print("=== INÍCIO DO SCRIPT ===")
 
-            try:
-                conteudo = arquivo.read_text(encoding="utf-8")
-            except Exception:
-                print("❌ Erro ao ler arquivo:")
-                traceback.print_exc()
-                continue
+    try:
+        ROOT = (args.root or Path(__file__).resolve().parent).resolve()
+        with Motor() as motor:
+            motor.concatenar(ROOT, avisar=print)
 
-            if not primeiro:
-                out.write("\n\n---\n\n")
+        print("✔ Consolidação concluída com sucesso.")
 
-            out.write(conteudo)
-            primeiro = False
+    except Exception:
+        print("❌ ERRO FATAL:")
+        traceback.print_exc()
 
-    print("✔ Consolidação concluída com sucesso.")
+    print("=== FIM DO SCRIPT ===")
+    if not args.sem_pausa:
+        input("\nPressione Enter para fechar...")
 
-except Exception:
-    print("❌ ERRO FATAL:")
-    traceback.print_exc()
-
-print("=== FIM DO SCRIPT ===")
-input("\nPressione Enter para fechar...")
+if __name__ == "__main__":
+    main()
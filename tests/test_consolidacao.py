@@ -0,0 +1,847 @@
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import shutil
+import subprocess
+import tarfile
+import sys
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+SCRIPT = SRC / "CONSOLIDAÇÃO.py"
+
+
+def importar(nome):
+    spec = importlib.util.spec_from_file_location(nome, SRC / f"{nome}.py")
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def criar_arvore(raiz):
+    (raiz / "core").mkdir()
+    (raiz / "core" / "a.js").write_text("const a = 1;\n", encoding="utf-8")
+    (raiz / "core" / "sub").mkdir()
+    (raiz / "core" / "sub" / "b.js").write_text("const b = 2;\n", encoding="utf-8")
+    (raiz / "main.js").write_text("require('./core/a');\n", encoding="utf-8")
+    (raiz / "node_modules" / "lib").mkdir(parents=True)
+    (raiz / "node_modules" / "lib" / "x.js").write_text("module.exports = 1;\n", encoding="utf-8")
+
+
+def comando(raiz, *args):
+    return [sys.executable, str(SCRIPT), "--root", str(raiz), "--sem-pausa", *args]
+
+
+def executar(raiz, *args):
+    subprocess.run(comando(raiz, *args), capture_output=True, check=True)
+    base = raiz / "códigos_consolidados"
+    run = sorted(base.glob("RUN_*"))[-1]
+    log = sorted((base / "LOGS").glob("*.log"))[-1]
+    return run, log.read_text(encoding="utf-8")
+
+
+def test_varredura_poda_pastas_excluidas(tmp_path):
+    criar_arvore(tmp_path)
+    run, log = executar(tmp_path)
+
+    assert sorted(p.name for p in run.glob("*.txt") if not p.name.startswith("consolidacao_")) == [
+        "INDEX.txt", "ROOT.txt", "core.txt",
+    ]
+    # node_modules e a própria códigos_consolidados
+    assert "PASTAS_PODADAS: 2" in log
+    assert "TOTAL_ARQUIVOS_JS: 3" in log
+    assert "x.js" not in (run / "core.txt").read_text(encoding="utf-8")
+
+
+def test_reexecucao_reaproveita_blocos_inalterados(tmp_path):
+    criar_arvore(tmp_path)
+    run_1, _ = executar(tmp_path)
+    manifesto = tmp_path / "códigos_consolidados" / "manifest.json"
+    assert manifesto.exists()
+
+    # Força outro RUN_<timestamp> e altera apenas um arquivo
+    run_1.rename(run_1.with_name("RUN_0000-00-00_00-00-00"))
+    dados = manifesto.read_text(encoding="utf-8").replace(run_1.name, "RUN_0000-00-00_00-00-00")
+    manifesto.write_text(dados, encoding="utf-8")
+    (tmp_path / "main.js").write_text("require('./core/sub/b');\n", encoding="utf-8")
+
+    run_2, log = executar(tmp_path)
+
+    assert "ARQUIVOS_REUTILIZADOS: 2" in log
+    assert "ARQUIVOS_RELIDOS: 1" in log
+    assert "const b = 2;" in (run_2 / "core.txt").read_text(encoding="utf-8")
+    assert "core/sub/b" in (run_2 / "ROOT.txt").read_text(encoding="utf-8")
+
+
+def test_arquivo_invalido_corrige_total_no_txt_e_no_geral(tmp_path):
+    criar_arvore(tmp_path)
+    (tmp_path / "core" / "quebrado.js").write_bytes(b"\xff\xfe\x00")
+    (tmp_path / "core" / "crlf.js").write_bytes(b"var c = 3;\r\n")
+    run, log = executar(tmp_path)
+
+    core = (run / "core.txt").read_bytes()
+    geral = next(run.glob("consolidacao_*.txt")).read_bytes()
+
+    assert b"TOTAL DE ARQUIVOS: 3\n" in core
+    assert b"var c = 3;\n" in core and b"\r" not in core
+    assert geral.endswith(core)
+    assert "quebrado.js" in log
+
+
+def test_leitura_paralela_gera_saida_identica_a_sequencial(tmp_path):
+    for i in range(3):
+        raiz = tmp_path / str(i)
+        raiz.mkdir()
+        criar_arvore(raiz)
+        for n in range(40):
+            (raiz / "core" / f"m{n:02}.js").write_text(f"module.exports = {n};\n", encoding="utf-8")
+
+    saidas = []
+    for i, workers in enumerate(("1", "2", "8")):
+        run, _ = executar(tmp_path / str(i), "--workers", workers)
+        texto = (run / "core.txt").read_text(encoding="utf-8").replace(str(tmp_path / str(i)), "")
+        saidas.append(re.sub(r"(DATA DA CONSOLIDAÇÃO|MODIFICADO_EM): .*", "", texto))
+
+    assert saidas[0] == saidas[1] == saidas[2]
+
+
+def test_extrator_usa_indice_de_offsets(tmp_path):
+    criar_arvore(tmp_path)
+    (tmp_path / "core" / "quebrado.js").write_bytes(b"\xff")
+    run, _ = executar(tmp_path)
+    extrator = importar("extrair_da_consolidacao")
+
+    with extrator.ExtratorConsolidacao(run) as ex:
+        assert sorted(ex.arquivos) == ["core/a.js", "core/sub/b.js", "main.js"]
+        assert ex.extrair("core/sub/b.js") == "const b = 2;\n"
+        assert ex.extrair(tmp_path / "main.js", usar_txt=True) == "require('./core/a');\n"
+        assert ex.extrair("core/a.js", bloco=True).startswith(f"FILE: {tmp_path / 'core' / 'a.js'}\n")
+
+
+def test_modo_comprimido_mantem_conteudo_e_extracao_por_frame(tmp_path):
+    criar_arvore(tmp_path)
+    (tmp_path / "core" / "quebrado.js").write_bytes(b"\xff")
+    run, log = executar(tmp_path, "--comprimir")
+
+    core = gzip.decompress((run / "core.txt.gz").read_bytes()).decode("utf-8")
+    geral = gzip.decompress(next(run.glob("consolidacao_*.txt.gz")).read_bytes()).decode("utf-8")
+    assert "TOTAL DE ARQUIVOS: 2\n" in core
+    assert geral.endswith(core)
+    assert "USO_DISCO:" in log and "TEMPO_ESCRITA:" in log
+
+    extrator = importar("extrair_da_consolidacao")
+    with extrator.ExtratorConsolidacao(run) as ex:
+        assert ex.extrair("core/sub/b.js") == "const b = 2;\n"
+        assert ex.extrair("core/a.js", usar_txt=True) == "const a = 1;\n"
+
+
+def test_modo_blobs_materializa_saida_identica_e_gc_limpa(tmp_path):
+    criar_arvore(tmp_path)
+    run_texto, _ = executar(tmp_path)
+    run_texto.rename(run_texto.with_name("RUN_0000-00-00_00-00-00"))
+    run_texto = run_texto.with_name("RUN_0000-00-00_00-00-00")
+
+    run_blobs, log = executar(tmp_path, "--blobs")
+    assert sorted(p.name for p in run_blobs.iterdir()) == ["INDEX.txt", "MANIFEST.json"]
+    assert "BLOBS_NOVOS: 3" in log
+
+    subprocess.run(comando(tmp_path, "materializar", run_blobs.name), check=True, capture_output=True)
+    assert (run_blobs / "INDEX.json").exists()
+    for nome in ("ROOT.txt", "core.txt"):
+        limpar = lambda b: re.sub(rb"DATA DA CONSOLIDA.*", b"", b)
+        assert limpar((run_blobs / nome).read_bytes()) == limpar((run_texto / nome).read_bytes())
+
+    shutil.rmtree(run_blobs)
+    (tmp_path / "códigos_consolidados" / "manifest.json").unlink()
+    saida = subprocess.run(comando(tmp_path, "gc"), check=True, capture_output=True)
+    assert "Blobs apagados: 3" in saida.stdout.decode("utf-8")
+
+
+def test_shards_respeitam_orcamento_e_so_dividem_arquivo_grande(tmp_path):
+    criar_arvore(tmp_path)
+    grande = "".join(f"const linha{i} = {i};\n" for i in range(400))
+    (tmp_path / "core" / "grande.js").write_text(grande, encoding="utf-8")
+
+    # Orçamentos que não cabem nem o cabeçalho do shard são recusados logo
+    for orcamento in ("0", "-5", "1", "30"):
+        saida = subprocess.run(comando(tmp_path, "--shards", orcamento), capture_output=True)
+        assert saida.returncode == 2 and "--shards precisa de ao menos" in saida.stderr.decode("utf-8")
+    saida = subprocess.run(comando(tmp_path, "--shards", "600", "--watch"), capture_output=True)
+    assert saida.returncode == 2 and "--watch não pode ser combinado com --shards" in saida.stderr.decode("utf-8")
+    assert not (tmp_path / "códigos_consolidados").exists()
+    motor_consolidacao = importar("motor_consolidacao")
+    with motor_consolidacao.Motor(workers=1) as motor, pytest.raises(ValueError, match="pequeno demais"):
+        motor.nova_consolidacao(tmp_path, shards=0)
+
+    run, log = executar(tmp_path, "--shards", "600")
+    with motor_consolidacao.Motor(workers=1) as motor:
+        execucao = motor.nova_consolidacao(tmp_path, shards=600)
+        execucao.executar()
+        with pytest.raises(ValueError, match="não suporta shards"):
+            execucao.observar(polling=True)
+
+    shards = sorted((run / "SHARDS").glob("shard_*.txt"))
+    assert f"SHARDS: {len(shards)} " in log
+
+    partes = []
+    for shard in shards:
+        texto = shard.read_text(encoding="utf-8")
+        assert (len(texto.encode("utf-8")) + 3) // 4 <= 600
+        listados = re.findall(r"^- (.+)$", texto, re.M)
+        assert len(listados) == int(re.search(r"ARQUIVOS NO SHARD: (\d+)", texto).group(1))
+        partes += [nome for nome in listados if "grande.js" in nome]
+        for nome in ("core/a.js", "core/sub/b.js", "main.js"):
+            if nome in listados:
+                assert texto.count(f"FILE: {tmp_path / nome}") == 1
+
+    assert len(partes) > 1
+    assert all("(parte " in nome for nome in partes)
+
+
+
+@pytest.mark.parametrize("copias", ["padrao", "blocos", "falha_no_meio"])
+def test_copiar_intervalo_copia_bytes_exatos(tmp_path, monkeypatch, copias):
+    motor_consolidacao = importar("motor_consolidacao")
+    dados = bytes(range(256)) * 5000  # 1,28 MB: mais de um bloco de 1 MB
+    (tmp_path / "origem.bin").write_bytes(dados)
+
+    if copias == "blocos":
+        monkeypatch.setattr(motor_consolidacao, "COPIAS_NO_KERNEL", [])
+    elif copias == "falha_no_meio":
+        chamadas = []
+
+        def falha_no_meio(fd_origem, fd_destino, offset, tamanho):
+            # A primeira chamada copia 1000 bytes; a seguinte falha como um FS sem suporte
+            if chamadas:
+                raise OSError("cópia no kernel recusada")
+            chamadas.append(offset)
+            os.lseek(fd_origem, offset, os.SEEK_SET)
+            return os.write(fd_destino, os.read(fd_origem, min(tamanho, 1000)))
+
+        monkeypatch.setattr(motor_consolidacao, "COPIAS_NO_KERNEL", [falha_no_meio])
+
+    inicio, tamanho = 12345, 1_100_000
+    with open(tmp_path / "origem.bin", "rb") as origem, open(tmp_path / "destino.bin", "wb") as destino:
+        destino.write(b"prefixo em buffer|")
+        motor_consolidacao.copiar_intervalo(origem, destino, inicio, tamanho)
+        destino.write(b"|meio|")
+        motor_consolidacao.copiar_intervalo(origem, destino, len(dados) - 7)
+        destino.write(b"|fim")
+
+    esperado = b"prefixo em buffer|" + dados[inicio:inicio + tamanho] + b"|meio|" + dados[-7:] + b"|fim"
+    assert (tmp_path / "destino.bin").read_bytes() == esperado
+    if copias == "falha_no_meio":
+        assert chamadas == [inicio]
+
+@pytest.mark.parametrize("modo", [[], ["--polling", "--comprimir"]])
+def test_watch_remenda_saidas_como_execucao_completa(tmp_path, modo):
+    criar_arvore(tmp_path)
+    base = tmp_path / "códigos_consolidados"
+
+    def esperar_atualizacoes(n):
+        limite = time.monotonic() + 15
+        while time.monotonic() < limite:
+            logs = list(base.glob("LOGS/*.log"))
+            log = logs[0].read_text(encoding="utf-8") if logs else ""
+            # O LOG completo (USO_DISCO) só existe depois da consolidação inicial
+            if "USO_DISCO:" in log and log.count("WATCH:") >= n:
+                return
+            time.sleep(0.05)
+        raise AssertionError(f"esperava {n} atualizações do --watch")
+
+    processo = subprocess.Popen(
+        comando(tmp_path, "--watch", *modo),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        esperar_atualizacoes(0)
+        time.sleep(0.3)
+        (tmp_path / "main.js").write_text("require('./core/sub/b');\n", encoding="utf-8")
+        esperar_atualizacoes(1)
+        (tmp_path / "novo").mkdir()
+        (tmp_path / "novo" / "n.js").write_text("let n = 1;\n", encoding="utf-8")
+        esperar_atualizacoes(2)
+    finally:
+        processo.terminate()
+        processo.wait()
+
+    run_watch = sorted(base.glob("RUN_*"))[-1]
+    run_watch = run_watch.rename(run_watch.with_name("RUN_0000-00-00_00-00-00"))
+    run_completa, _ = executar(tmp_path, *[m for m in modo if m != "--polling"])
+
+    def ler(caminho):
+        dados = caminho.read_bytes()
+        if caminho.suffix == ".gz":
+            dados = gzip.decompress(dados)
+        return re.sub(rb"DATA DA CONSOLIDA.*", b"", dados)
+
+    nomes = sorted(p.name for p in run_completa.glob("*.txt*") if not p.name.startswith("INDEX"))
+    assert len(nomes) == 4
+    for nome in nomes:
+        nome_watch = nome
+        if nome.startswith("consolidacao_"):
+            nome_watch = next(run_watch.glob("consolidacao_*")).name
+        assert ler(run_watch / nome_watch) == ler(run_completa / nome)
+
+    # Offsets lógicos; o tamanho dos frames gzip varia com a data nos cabeçalhos
+    def indice(run):
+        arquivos = json.loads((run / "INDEX.json").read_text(encoding="utf-8"))["arquivos"]
+        return {chave: {k: v for k, v in e.items() if not k.startswith("frame")} for chave, e in arquivos.items()}
+
+    assert indice(run_watch) == indice(run_completa)
+
+
+
+def test_watch_avisa_pelo_callback_sem_repetir_erros(tmp_path, capsys):
+    criar_arvore(tmp_path)
+    (tmp_path / "core" / "ruim.js").write_bytes(b"\xff\xfe invalido")
+    (tmp_path / "core" / "enorme.js").write_text("let x;\n" * 100, encoding="utf-8")
+    motor_consolidacao = importar("motor_consolidacao")
+
+    with motor_consolidacao.Motor(workers=1) as motor:
+        execucao = motor.nova_consolidacao(tmp_path, triagem=False, tamanho_maximo=200)
+        execucao.executar()
+        assert len(execucao.erros_leitura) == 1 and len(execucao.ignorados) == 1
+
+        eventos = iter([{"core"}, {"core"}, {"ROOT"}])
+
+        def esperar_mudancas(inotify):
+            try:
+                return next(eventos), time.perf_counter()
+            except StopIteration:
+                raise KeyboardInterrupt
+
+        execucao.esperar_mudancas = esperar_mudancas
+        mensagens = []
+        execucao.observar(polling=True, avisar=mensagens.append)
+
+    assert capsys.readouterr().out == ""
+    assert mensagens[0].startswith("👀 Observando") and mensagens[-1].endswith("Observação encerrada.")
+    assert [m.split(" atualizado")[0] for m in mensagens if m.startswith("↻")] == ["↻ core.txt"] * 2 + ["↻ ROOT.txt"]
+    assert len(execucao.erros_leitura) == 1 and not any(m.startswith("⚠") for m in mensagens)
+    assert execucao.ignorados == [(str(tmp_path / "core" / "enorme.js"), "acima_do_limite")]
+    assert execucao.ignorados_por_motivo == {"acima_do_limite": 1}
+
+
+@pytest.mark.parametrize("falha", [TypeError, OSError])
+def test_watch_sem_inotify_cai_para_varredura(tmp_path, monkeypatch, falha):
+    criar_arvore(tmp_path)
+    motor_consolidacao = importar("motor_consolidacao")
+
+    def sem_inotify(*args):
+        raise falha("sem inotify aqui")  # TypeError: o ctypes.CDLL(None) do Windows
+
+    # A própria classe recusa plataformas sem inotify com OSError (antes do ctypes)
+    with monkeypatch.context() as m:
+        m.setattr(motor_consolidacao.sys, "platform", "win32")
+        with pytest.raises(OSError, match="win32"):
+            motor_consolidacao.Inotify(lambda nome, relativo: False)
+
+    monkeypatch.setattr(motor_consolidacao, "Inotify", sem_inotify)
+    esperas = []
+
+    def esperar_mudancas(inotify):
+        esperas.append(inotify)
+        raise KeyboardInterrupt
+
+    with motor_consolidacao.Motor(workers=1) as motor:
+        execucao = motor.nova_consolidacao(tmp_path)
+        execucao.executar()
+        execucao.esperar_mudancas = esperar_mudancas
+        mensagens = []
+        execucao.observar(avisar=mensagens.append)
+
+    assert esperas == [None]
+    assert mensagens[0].startswith("⚠ inotify indisponível")
+    assert "(varredura a cada" in mensagens[1]
+
+def test_diff_entre_runs_so_le_arquivos_alterados(tmp_path):
+    criar_arvore(tmp_path)
+    (tmp_path / "velha").mkdir()
+    (tmp_path / "velha" / "v.js").write_text("const v = 0;\n", encoding="utf-8")
+    run_a, _ = executar(tmp_path)
+    run_a = run_a.rename(run_a.with_name("RUN_0000-00-00_00-00-00"))
+
+    (tmp_path / "main.js").write_text("require('./core/sub/b');\n", encoding="utf-8")
+    (tmp_path / "novo").mkdir()
+    (tmp_path / "novo" / "n.js").write_text("const novo = 3;", encoding="utf-8")
+    shutil.rmtree(tmp_path / "velha")
+    run_b, _ = executar(tmp_path, "--blobs")
+
+    # Nada em core/ mudou: o diff não pode precisar do core.txt de run_a
+    (run_a / "core.txt").unlink()
+
+    saida = subprocess.run(
+        comando(tmp_path, "diff", run_a.name, run_b.name),
+        capture_output=True,
+    )
+    patch = saida.stdout.decode("utf-8")
+
+    assert saida.returncode == 1
+    assert f"--- {run_a.name}/main.js\n+++ {run_b.name}/main.js\n" in patch
+    assert "-require('./core/a');\n+require('./core/sub/b');\n" in patch
+    assert f"--- /dev/null\n+++ {run_b.name}/novo/n.js\n" in patch
+    assert "+const novo = 3;\n\\ No newline at end of file\n" in patch
+    assert f"--- {run_a.name}/velha/v.js\n+++ /dev/null\n" in patch
+    assert "/core/a.js" not in patch and "/core/sub/b.js" not in patch
+    assert "1 alterados, 1 adicionados, 1 removidos, 2 idênticos" in saida.stderr.decode("utf-8")
+
+
+def test_motor_importavel_reaproveita_entre_execucoes(tmp_path):
+    criar_arvore(tmp_path)
+    motor_consolidacao = importar("motor_consolidacao")
+
+    with motor_consolidacao.Motor(workers=2) as motor:
+        primeira = motor.consolidar(tmp_path)
+        time.sleep(1.1)  # RUN_<timestamp> tem resolução de segundos
+        segunda = motor.consolidar(tmp_path)
+
+        # Os dois utilitários não podam node_modules (comportamento original)
+        juncao = motor.concatenar(tmp_path)
+        copia = motor.copiar_com_cabecalho(tmp_path)
+
+    assert primeira["total_arquivos"] == segunda["total_arquivos"] == 3
+    assert (primeira["arquivos_reutilizados"], segunda["arquivos_reutilizados"]) == (0, 3)
+    assert segunda["run"] != primeira["run"]
+    assert "ARQUIVOS_REUTILIZADOS: 3" in Path(segunda["log"]).read_text(encoding="utf-8")
+
+    assert copia["arquivos_copiados"] == 4 and not copia["erros"]
+    assert (Path(copia["pasta_run"]) / "core" / "b.js").read_text(encoding="utf-8").endswith("const b = 2;\n")
+    assert juncao["arquivos"] == 4 and Path(juncao["saida"]).is_file()
+
+
+@pytest.mark.parametrize("perfil", ["cprofile", "tracemalloc"])
+def test_relatorio_de_tempos_e_perfil_por_variavel(tmp_path, monkeypatch, perfil):
+    criar_arvore(tmp_path)
+    # UTF-8 inválido depois da amostra da triagem: só a leitura completa descobre
+    (tmp_path / "core" / "quebrado.js").write_bytes(b"x\n" * 3000 + b"\xff")
+    motor_consolidacao = importar("motor_consolidacao")
+
+    monkeypatch.setenv("CONSOLIDACAO_PERFIL", perfil)
+    with motor_consolidacao.Motor(workers=2) as motor:
+        stats = motor.consolidar(tmp_path)
+
+    relatorio = json.loads(Path(stats["relatorio_tempos"]).read_text(encoding="utf-8"))
+    assert list(relatorio["fases"]) == [
+        "preparacao", "varredura", "leitura_e_escrita", "index_json", "manifesto", "index_txt", "log",
+    ]
+    assert {"parede", "cpu", "espera_pela_leitura", "escrita"} <= set(relatorio["fases"]["leitura_e_escrita"])
+    assert relatorio["vazao"]["arquivos"] == 3
+    assert relatorio["vazao"]["arquivos_lidos_do_disco"] == 3
+    assert sorted(e["arquivo"] for e in relatorio["mais_lentos"]) == ["core/a.js", "core/sub/b.js", "main.js"]
+    assert relatorio["erros_por_tipo"] == {"UnicodeDecodeError": 1}
+
+    logs = tmp_path / "códigos_consolidados" / "LOGS"
+    sufixo = ".cprofile.txt" if perfil == "cprofile" else ".tracemalloc.txt"
+    assert (logs / Path(stats["log"]).with_suffix(sufixo).name).stat().st_size > 0
+
+
+def test_destinos_extras_saem_da_mesma_leitura(tmp_path):
+    criar_arvore(tmp_path)
+    (tmp_path / "core" / "sub" / "a.js").write_text("const a2 = 3;\n", encoding="utf-8")
+    run, log = executar(tmp_path, "--destinos", "copia,unico,jsonl,tar")
+
+    assert "ARQUIVOS_RELIDOS: 4" in log
+    assert "- copia: COPIA/ — 4 arquivos" in log
+
+    copia = run / "COPIA" / "core"
+    assert sorted(p.name for p in copia.iterdir()) == ["a.js", "a__sub.js", "b.js"]
+    assert (copia / "a__sub.js").read_text(encoding="utf-8").endswith("-" * 80 + "\n\nconst a2 = 3;\n")
+    assert "core/a__sub.js — " in (run / "COPIA" / "INDEX.txt").read_text(encoding="utf-8")
+
+    unico = (run / "consolidado.txt").read_text(encoding="utf-8").split("\n\n---\n\n")
+    assert sorted(unico) == sorted(["const a = 1;\n", "const a2 = 3;\n", "const b = 2;\n", "require('./core/a');\n"])
+
+    linhas = [json.loads(l) for l in (run / "arquivos.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert {l["arquivo"]: l["conteudo"] for l in linhas}["core/sub/b.js"] == "const b = 2;\n"
+
+    with tarfile.open(run / "arquivos.tar.gz") as tar:
+        assert sorted(tar.getnames()) == ["core/a.js", "core/sub/a.js", "core/sub/b.js", "main.js"]
+        assert tar.extractfile("main.js").read() == b"require('./core/a');\n"
+
+
+def test_modo_git_lista_pelo_indice_e_rele_so_o_que_mudou(tmp_path):
+    criar_arvore(tmp_path)
+
+    # Fora de um repositório: erro sem deixar RUN_ vazia para trás (nem _2, _3...)
+    fora = dict(os.environ, GIT_CEILING_DIRECTORIES=str(tmp_path.parent))
+    for _ in range(2):
+        assert subprocess.run(comando(tmp_path, "--git"), capture_output=True, env=fora).returncode == 2
+    assert list((tmp_path / "códigos_consolidados").glob("RUN_*")) == []
+
+    git = lambda *args: subprocess.run(["git", "-C", str(tmp_path), *args], check=True, capture_output=True)
+    git("init", "-q")
+    git("add", "-A")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "inicial")
+
+    _, log = executar(tmp_path, "--git")
+    assert "4 rastreados, 0 não rastreados" in log
+    assert "TOTAL_ARQUIVOS_JS: 3" in log and "PASTAS_VISITADAS: 0" in log
+
+    # Sujo na cópia de trabalho + um arquivo não rastreado
+    time.sleep(1.1)
+    (tmp_path / "core" / "a.js").write_text("const a = 'sujo';\n", encoding="utf-8")
+    (tmp_path / "novo.js").write_text("let novo;\n", encoding="utf-8")
+    _, log = executar(tmp_path, "--git", "--nao-rastreados")
+    assert "TOTAL_ARQUIVOS_JS: 4" in log
+    assert "ARQUIVOS_RELIDOS: 2" in log
+
+    # a.js volta ao commit (não aparece no git diff), main.js muda num commit novo
+    time.sleep(1.1)
+    git("checkout", "--", "core/a.js")
+    (tmp_path / "main.js").write_text("require('./core/sub/b');\n", encoding="utf-8")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-am", "main")
+    run, log = executar(tmp_path, "--git")
+    assert "TOTAL_ARQUIVOS_JS: 3" in log
+    assert "ARQUIVOS_RELIDOS: 2" in log and "ARQUIVOS_REUTILIZADOS: 1" in log
+    assert "const a = 1;\n" in (run / "core.txt").read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("modo", [[], ["--comprimir"]])
+def test_dedup_emite_same_as_e_extrator_segue_a_referencia(tmp_path, modo):
+    criar_arvore(tmp_path)
+    repetido = "const a = 1;\n" * 40
+    (tmp_path / "vendor").mkdir()
+    for caminho in ("core/a.js", "vendor/a.js", "core/sub/a2.js"):
+        (tmp_path / caminho).write_text(repetido, encoding="utf-8")
+    run, log = executar(tmp_path, "--dedup", *modo)
+
+    assert "DEDUPLICACAO: 2 arquivos repetidos viraram SAME_AS" in log
+    ler = (lambda p: gzip.decompress(p.read_bytes()).decode("utf-8")) if modo else (lambda p: p.read_text(encoding="utf-8"))
+    sufixo = ".gz" if modo else ""
+    assert f"SAME_AS: {tmp_path / 'core' / 'a.js'}\n" in ler(run / f"vendor.txt{sufixo}")
+    assert ler(run / f"core.txt{sufixo}").count(repetido) == 1
+
+    extrator = importar("extrair_da_consolidacao")
+    with extrator.ExtratorConsolidacao(run) as ex:
+        assert ex.extrair("vendor/a.js") == repetido
+        assert ex.extrair("core/sub/a2.js", usar_txt=True) == repetido
+        assert ex.extrair("vendor/a.js", bloco=True).endswith(f"SAME_AS: {tmp_path / 'core' / 'a.js'}\n")
+
+    # Reexecução: os repetidos também são reaproveitados pelo manifesto
+    time.sleep(1.1)
+    _, log = executar(tmp_path, "--dedup", *modo)
+    assert "ARQUIVOS_REUTILIZADOS: 5" in log and "ARQUIVOS_RELIDOS: 0" in log
+
+
+def test_triagem_pula_sem_ler_tudo_e_conta_motivos_a_parte(tmp_path):
+    criar_arvore(tmp_path)
+    (tmp_path / "core" / "binario.js").write_bytes(b"\x00asm" + b"\x01" * 10)
+    (tmp_path / "core" / "latin1.js").write_bytes("var s = 'ação';\n".encode("latin-1"))
+    (tmp_path / "core" / "bundle.min.js").write_text("var x=1;" * 200, encoding="utf-8")
+    (tmp_path / "core" / "grande.js").write_text("// grande\n" * 300, encoding="utf-8")
+    run, log = executar(tmp_path, "--tamanho-maximo", "2000")
+
+    assert "ARQUIVOS_IGNORADOS (acima_do_limite=1, binario=1, minificado=1, utf8_invalido=1):" in log
+    assert "Nenhum erro de leitura." in log
+    core = (run / "core.txt").read_text(encoding="utf-8")
+    assert "TOTAL DE ARQUIVOS: 2\n" in core
+    assert "binario.js" not in core and "var x=1;" not in core
+
+    motor_consolidacao = importar("motor_consolidacao")
+    amostra = motor_consolidacao.motivo_da_amostra
+    # Caractere de 2 bytes cortado no fim de uma amostra cheia não é erro
+    assert amostra(("a\n" * 2047 + "ç").encode("utf-8")[:4096], completa=False) is None
+    assert amostra("ç".encode("utf-8")[:1], completa=True) == "utf8_invalido"
+
+
+def test_compacto_remove_comentarios_e_mapeia_linhas(tmp_path):
+    criar_arvore(tmp_path)
+    fonte = (
+        "// cabeçalho\n"
+        "/* bloco\n   de comentário */\n"
+        "\n"
+        "const url = \"http://x//y\";   // fim\n"
+        "const re = /\\/\\*nao*\\//g;\n"
+        "const t = `a ${`b // c`} d`;\n"
+    )
+    (tmp_path / "core" / "comentado.js").write_text(fonte, encoding="utf-8")
+    run, log = executar(tmp_path, "--compacto", "--destinos", "copia,jsonl")
+
+    # Os destinos extras recebem o arquivo do disco, não o compactado
+    def confere_destinos(run):
+        copia = (run / "COPIA" / "core" / "comentado.js").read_text(encoding="utf-8")
+        assert copia.endswith("-" * 80 + "\n\n" + fonte)
+        linhas = [json.loads(l) for l in (run / "arquivos.jsonl").read_text(encoding="utf-8").splitlines()]
+        registro = {l["arquivo"]: l for l in linhas}["core/comentado.js"]
+        assert registro["conteudo"] == fonte
+        assert registro["sha256"] == hashlib.sha256(fonte.encode("utf-8")).hexdigest()
+
+    confere_destinos(run)
+
+    core = (run / "core.txt").read_text(encoding="utf-8")
+    assert "cabeçalho" not in core and "de comentário" not in core
+    assert 'const url = "http://x//y";\nconst re = /\\/\\*nao*\\//g;\nconst t = `a ${`b // c`} d`;\n' in core
+    assert "COMPACTACAO:" in log
+    assert re.search(r"core\.txt +— \d+ arquivos — \d+ bytes — compactado de \d+ bytes \(-\d+\.\d%\)",
+                     (run / "INDEX.txt").read_text(encoding="utf-8"))
+
+    mapa = json.loads((run / "MAPA_LINHAS.json").read_text(encoding="utf-8"))
+    assert mapa["arquivos"]["core/comentado.js"] == [[1, 5, 3]]
+    indice = json.loads((run / "INDEX.json").read_text(encoding="utf-8"))
+    assert indice["compacto"]["core.txt"]["bytes"] < indice["compacto"]["core.txt"]["bytes_originais"]
+
+    # Reexecução compactada reaproveita; sem --compacto o bloco antigo não serve
+    time.sleep(1.1)
+    run, log = executar(tmp_path, "--compacto", "--destinos", "copia,jsonl")
+    assert "ARQUIVOS_RELIDOS: 0" in log
+    confere_destinos(run)
+    assert '"original"' not in (run.parent / "manifest.json").read_text(encoding="utf-8")
+    _, log = executar(tmp_path)
+    assert "ARQUIVOS_REUTILIZADOS: 0" in log
+
+
+def test_historico_git_no_cabecalho_de_cada_arquivo(tmp_path):
+    criar_arvore(tmp_path)
+
+    # git log falhando (fora de um repositório) não deixa RUN_ vazia
+    fora = dict(os.environ, GIT_CEILING_DIRECTORIES=str(tmp_path.parent))
+    saida = subprocess.run(comando(tmp_path, "--historico-git"), capture_output=True, env=fora)
+    assert saida.returncode == 2 and list((tmp_path / "códigos_consolidados").glob("RUN_*")) == []
+
+    git = lambda *args: subprocess.run(["git", "-C", str(tmp_path), *args], check=True, capture_output=True)
+    commit = lambda msg: git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-am", msg)
+    git("init", "-q")
+    git("add", "-A")
+    commit("inicial")
+    (tmp_path / "main.js").write_text("require('./core/sub/b');\n", encoding="utf-8")
+    commit("main")
+    (tmp_path / "novo.js").write_text("let novo;\n", encoding="utf-8")
+    head = git("rev-parse", "HEAD").stdout.decode().strip()
+
+    run, log = executar(tmp_path, "--historico-git")
+    assert "HISTORICO_GIT: 3 de 4 arquivos com commits (1 git log" in log
+    root = (run / "ROOT.txt").read_text(encoding="utf-8")
+    assert f"GIT_ULTIMO_COMMIT: {head}\nGIT_DATA_AUTOR: " in root
+    assert "GIT_COMMITS: 2\n" in root
+    assert "FILE: " + str(tmp_path / "novo.js") in root and "GIT_ULTIMO_COMMIT: -\n" in root
+
+    # --blobs guarda o histórico no MANIFEST.json; materializar reproduz os cabeçalhos
+    time.sleep(1.1)
+    run_blobs, _ = executar(tmp_path, "--historico-git", "--blobs")
+    subprocess.run(comando(tmp_path, "materializar", run_blobs.name), check=True, capture_output=True)
+    limpar = lambda b: re.sub(rb"DATA DA CONSOLIDA.*", b"", b)
+    assert limpar((run_blobs / "ROOT.txt").read_bytes()) == limpar((run / "ROOT.txt").read_bytes())
+
+
+def test_varias_raizes_numa_run_e_ids_sem_colisao(tmp_path):
+    for nome in ("src", "scripts", "tests"):
+        (tmp_path / nome).mkdir()
+        criar_arvore(tmp_path / nome)
+    (tmp_path / "fora.js").write_text("let fora;\n", encoding="utf-8")
+    raizes = [tmp_path / "src", tmp_path / "scripts", tmp_path / "tests"]
+    motor_consolidacao = importar("motor_consolidacao")
+
+    with motor_consolidacao.Motor(workers=2) as motor:
+        primeira = motor.consolidar_raizes(raizes)
+        segunda = motor.consolidar_raizes(raizes)
+
+    assert primeira["pastas"] == {"scripts": 3, "src": 3, "tests": 3}
+    assert segunda["run"] != primeira["run"] and segunda["arquivos_reutilizados"] == 9
+    run = Path(primeira["pasta_run"])
+    assert run.parent == tmp_path / "códigos_consolidados"
+    assert sorted(p.name for p in run.glob("*.txt") if p.name != "INDEX.txt") == [
+        f"consolidacao_{primeira['run'][4:]}.txt", "scripts.txt", "src.txt", "tests.txt",
+    ]
+    assert "fora.js" not in (run / f"consolidacao_{primeira['run'][4:]}.txt").read_text(encoding="utf-8")
+
+    # Linha de comando: --root repetido; raízes sobrepostas são recusadas
+    saida = subprocess.run(comando(tmp_path / "src", "--root", str(tmp_path / "tests")), capture_output=True)
+    assert saida.returncode == 0 and b"RUN_" in saida.stdout
+    saida = subprocess.run(comando(tmp_path, "--root", str(tmp_path / "src")), capture_output=True)
+    assert saida.returncode == 2 and "Raízes sobrepostas" in saida.stderr.decode("utf-8")
+
+    # Raízes sem projeto em comum não gravam códigos_consolidados na raiz do disco
+    saida = subprocess.run(comando(tmp_path / "src", "--root", tmp_path.anchor), capture_output=True)
+    assert saida.returncode == 2 and "sem pasta de projeto em comum" in saida.stderr.decode("utf-8")
+    with motor_consolidacao.Motor(workers=1) as motor, pytest.raises(ValueError, match="em comum"):
+        motor.consolidar_raizes([tmp_path / "src", Path.home()])
+
+    # Execuções concorrentes no mesmo segundo não dividem a mesma RUN_
+    base = tmp_path / "códigos_consolidados"
+    ids = [motor_consolidacao.criar_pasta_run(base, "2000-01-01_00-00-00")[1] for _ in range(3)]
+    assert ids == ["2000-01-01_00-00-00", "2000-01-01_00-00-00_2", "2000-01-01_00-00-00_3"]
+
+
+
+def test_gravacoes_concorrentes_nao_dividem_o_temporario(tmp_path):
+    motor_consolidacao = importar("motor_consolidacao")
+    path = tmp_path / "nomes_copia.json"
+    erros = []
+
+    def gravar(numero):
+        arquivos = {f"f{i}.js": {"nome": f"{numero}_{i}.js"} for i in range(200)}
+        try:
+            for _ in range(30):
+                motor_consolidacao.salvar_nomes_copia(path, f"RUN_{numero}", "pasta", arquivos)
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=gravar, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert erros == []
+    run, formato, arquivos = motor_consolidacao.carregar_nomes_copia(path)
+    numero = run[len("RUN_"):]
+    assert formato == "pasta" and {e["nome"] for e in arquivos.values()} == {f"{numero}_{i}.js" for i in range(200)}
+    assert [p.name for p in tmp_path.iterdir()] == ["nomes_copia.json"]
+
+def test_registro_de_nomes_mantem_regra_subpasta_e_contador(tmp_path):
+    motor_consolidacao = importar("motor_consolidacao")
+    registro = motor_consolidacao.RegistroNomes()
+    origem = tmp_path / "pkg"
+    pasta_destino = tmp_path / "RUN" / "pkg"
+
+    def copiar(relativo, gravar=True):
+        destino, renomeado = registro.destino(origem / relativo, origem, pasta_destino)
+        if gravar:
+            registro.ocupar(destino)
+        return destino.name, renomeado
+
+    assert copiar("index.js") == ("index.js", False)
+    assert copiar("m1/index.js") == ("index__m1.js", True)
+    assert copiar("m2/m1/index.js") == ("index__1.js", True)
+    assert copiar("index__2.js") == ("index__2.js", False)
+    assert copiar("m3/index.js", gravar=False) == ("index__m3.js", True)  # falha de leitura: nome segue livre
+    assert copiar("m3/index.js") == ("index__m3.js", True)
+    assert copiar("m3/index.js") == ("index__3.js", True)
+    assert pasta_destino.is_dir() and not any(pasta_destino.iterdir())
+
+
+def test_copia_mantem_nomes_entre_runs_e_pula_sem_alteracoes(tmp_path):
+    for pasta in ("pkg", "pkg/m2"):
+        (tmp_path / pasta).mkdir(parents=True)
+        (tmp_path / pasta / "index.js").write_text(f"// {pasta}\n", encoding="utf-8")
+    motor_consolidacao = importar("motor_consolidacao")
+    nomes = lambda copia: sorted(
+        (p.read_text(encoding="utf-8").splitlines()[-1], p.name) for p in (Path(copia["pasta_run"]) / "pkg").iterdir()
+    )
+
+    with motor_consolidacao.Motor(workers=1) as motor:
+        primeira = motor.copiar_com_cabecalho(tmp_path)
+        assert nomes(primeira) == [("// pkg", "index.js"), ("// pkg/m2", "index__m2.js")]
+
+        # Sem mudanças: nenhuma RUN_ nova
+        repetida = motor.copiar_com_cabecalho(tmp_path)
+        assert repetida["sem_alteracoes"] and repetida["run"] == primeira["run"]
+        assert len(list((tmp_path / "códigos_consolidados").glob("RUN_*"))) == 1
+
+        # Um arquivo novo que viria antes na ordem não toma o nome dos antigos
+        (tmp_path / "pkg" / "a" / "m2").mkdir(parents=True)
+        (tmp_path / "pkg" / "a" / "m2" / "index.js").write_text("// pkg/a/m2\n", encoding="utf-8")
+        segunda = motor.copiar_com_cabecalho(tmp_path)
+
+    assert not segunda["sem_alteracoes"] and segunda["nomes_novos"] == 1
+    assert nomes(segunda) == [("// pkg", "index.js"), ("// pkg/a/m2", "index__1.js"), ("// pkg/m2", "index__m2.js")]
+
+
+def test_espelho_so_grava_o_que_mudou_e_apaga_removidos(tmp_path):
+    criar_arvore(tmp_path)
+    (tmp_path / "velho").mkdir()
+    (tmp_path / "velho" / "v.js").write_text("let v;\n", encoding="utf-8")
+    script = SRC / "copiar_com_cabecalho_e_log.py"
+    espelhar = lambda: subprocess.run(
+        [sys.executable, str(script), "--root", str(tmp_path), "--sem-pausa", "--espelho"],
+        check=True, capture_output=True,
+    )
+    espelho = tmp_path / "códigos_consolidados" / "ESPELHO"
+    (tmp_path / "core" / "crlf.js").write_bytes(b"let x;\r\nlet y;\r\n")
+
+    espelhar()
+    assert "NOVOS: 6" in (espelho / "LOG.txt").read_text(encoding="utf-8")
+
+    # O primeiro espelho é igual a uma cópia nova (quebras de linha inclusive)
+    motor_consolidacao = importar("motor_consolidacao")
+    with motor_consolidacao.Motor(workers=1) as motor:
+        copia = Path(motor.copiar_com_cabecalho(tmp_path)["pasta_run"])
+    limpar = lambda b: re.sub(rb"DATA_DA_EXTRACAO: .*", b"", b)
+    for arquivo in copia.rglob("*.js"):
+        assert limpar(arquivo.read_bytes()) == limpar((espelho / arquivo.relative_to(copia)).read_bytes())
+    assert (espelho / "core" / "crlf.js").read_bytes().endswith(b"let x;\nlet y;\n")
+    (tmp_path / "core" / "crlf.js").unlink()
+    intacto = espelho / "core" / "b.js"
+    mtime_intacto = intacto.stat().st_mtime_ns
+
+    time.sleep(0.05)
+    (tmp_path / "core" / "a.js").write_text("const a = 'mudou';\n", encoding="utf-8")
+    (tmp_path / "main.js").touch()
+    shutil.rmtree(tmp_path / "velho")
+    espelhar()
+
+    log = (espelho / "LOG.txt").read_text(encoding="utf-8")
+    assert "NOVOS: 0\nREESCRITOS: 1\nINALTERADOS: 2 (sem leitura)\nCONFERIDOS: 1" in log
+    assert "REMOVIDOS: 2" in log and not (espelho / "velho").exists()
+    assert intacto.stat().st_mtime_ns == mtime_intacto
+    assert (espelho / "core" / "a.js").read_text(encoding="utf-8").endswith("const a = 'mudou';\n")
+    index = (espelho / "INDEX.txt").read_text(encoding="utf-8")
+    assert "- Arquivos: 4\n" in index and "velho" not in index
+
+
+@pytest.mark.parametrize("pacote", ["zip", "tar"])
+def test_copia_em_pacote_sem_arquivos_soltos_e_com_index(tmp_path, pacote):
+    criar_arvore(tmp_path)
+    motor_consolidacao = importar("motor_consolidacao")
+
+    with motor_consolidacao.Motor(workers=3) as motor:
+        copia = motor.copiar_com_cabecalho(tmp_path, pacote=pacote)
+        pasta = motor.copiar_com_cabecalho(tmp_path)  # formato diferente: não pula
+
+    run = Path(copia["pasta_run"])
+    assert sorted(p.name for p in run.iterdir()) == [Path(copia["pacote"]).name, Path(copia["log"]).name]
+    if pacote == "zip":
+        with zipfile.ZipFile(copia["pacote"]) as z:
+            entradas = {info.filename: z.read(info) for info in z.infolist()}
+            assert {info.date_time for info in z.infolist()} == {(1980, 1, 1, 0, 0, 0)}
+    else:
+        with tarfile.open(copia["pacote"]) as t:
+            entradas = {m.name: t.extractfile(m).read() for m in t.getmembers()}
+
+    assert list(entradas) == ["core/a.js", "core/b.js", "ROOT/main.js", "node_modules/x.js", "INDEX.txt"]
+    assert "- Arquivos: 4\n" in entradas["INDEX.txt"].decode("utf-8")
+    assert not pasta["sem_alteracoes"]
+    limpar = lambda b: re.sub(rb"DATA_DA_EXTRACAO: .*", b"", b)
+    # Mesma política de quebra de linha (LF) na pasta e no pacote: bytes e INDEX iguais
+    for nome, dados in entradas.items():
+        assert limpar(dados) == limpar((Path(pasta["pasta_run"]) / nome).read_bytes())
+
+
+def test_copia_paralela_igual_a_sequencial_com_progresso_limitado(tmp_path):
+    for i in range(200):
+        pasta = tmp_path / f"p{i % 4}" / f"s{i % 7}"
+        pasta.mkdir(parents=True, exist_ok=True)
+        (pasta / f"m{i // 28}.js").write_text(f"// {i}\n", encoding="utf-8")
+    motor_consolidacao = importar("motor_consolidacao")
+
+    resultados = {}
+    for workers in (1, 6):
+        mensagens = []
+        with motor_consolidacao.Motor(workers=workers) as motor:
+            resultados[workers] = motor.copiar_com_cabecalho(tmp_path, avisar=mensagens.append, forcar=True)
+        progresso = [m for m in mensagens if m.startswith("Progresso:")]
+        assert not any(m.startswith("Copiando:") for m in mensagens)
+        assert 1 <= len(progresso) <= 5 and progresso[-1].startswith("Progresso: 200/200 arquivos (100%)")
+
+    vazao = resultados[6]["vazao"]
+    assert vazao["workers"] == 6 and vazao["arquivos_por_segundo"] > 0 and vazao["p95_ms"] > 0
+    assert "VAZAO: " in Path(resultados[6]["log"]).read_text(encoding="utf-8")
+
+    limpar = lambda b: re.sub(rb"DATA_DA_EXTRACAO: .*", b"", b)
+    sequencial, paralela = (Path(resultados[w]["pasta_run"]) for w in (1, 6))
+    arquivos = sorted(p.relative_to(sequencial) for p in sequencial.rglob("*.js"))
+    assert len(arquivos) == 200
+    assert arquivos == sorted(p.relative_to(paralela) for p in paralela.rglob("*.js"))
+    for relativo in [*arquivos, Path("INDEX.txt")]:
+        assert limpar((sequencial / relativo).read_bytes()) == limpar((paralela / relativo).read_bytes())
+
+    assert motor_consolidacao.percentil(list(range(1, 101)), 0.95) == 95
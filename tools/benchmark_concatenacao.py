@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+import motor_consolidacao
+
+"""
+BENCHMARK DA CONCATENAÇÃO DOS .txt POR PASTA NA CONSOLIDAÇÃO GERAL
+------------------------------------------------------------------
+Localização: root/tools/benchmark_concatenacao.py
+Monta .txt por pasta a partir de src/ e tests/ (mesmo agrupamento do
+CONSOLIDAÇÃO.py) e mede quanto custa juntá-los num arquivo geral:
+
+- read_text: como o CONSOLIDAÇÃO.py fazia (decodifica, reencoda, copia)
+- copyfileobj: cópia em blocos pelo Python, sem decodificar
+- copiar_intervalo: a função do motor_consolidacao.py, como é usada (com
+  COPIAS_NO_KERNEL), com cada cópia do kernel sozinha e [blocos], sem
+  nenhuma (o caminho de leitura e escrita em blocos dela)
+
+Uso: python tools/benchmark_concatenacao.py [--repeticoes N] [--escala N]
+"""
+
+# ==============================================================
+# CONFIGURAÇÃO
+# ==============================================================
+
+ROOT = Path(__file__).resolve().parent.parent
+PASTAS_ORIGEM = ("src", "tests")
+PASTAS_IGNORADAS = {"node_modules", "__pycache__", ".git", "códigos_consolidados"}
+EXTENSOES = {".js", ".py", ".json", ".md"}
+
+# ==============================================================
+# MONTAGEM DOS .txt POR PASTA
+# ==============================================================
+
+def montar_txts(destino, escala):
+    """Um .txt por pasta de topo, repetido `escala` vezes para engordar a árvore."""
+    por_pasta = {}
+    for origem in PASTAS_ORIGEM:
+        for pasta, subpastas, arquivos in os.walk(ROOT / origem):
+            subpastas[:] = sorted(p for p in subpastas if p not in PASTAS_IGNORADAS)
+            relativo = Path(pasta).relative_to(ROOT)
+            chave = "_".join(relativo.parts[:2])
+            for nome in sorted(arquivos):
+                caminho = Path(pasta) / nome
+                if caminho.suffix in EXTENSOES:
+                    por_pasta.setdefault(chave, []).append(caminho)
+
+    txts = []
+    for chave in sorted(por_pasta):
+        path_txt = destino / f"{chave}.txt"
+        with open(path_txt, "wb") as txt:
+            for _ in range(escala):
+                for caminho in por_pasta[chave]:
+                    dados = caminho.read_bytes()
+                    try:
+                        dados.decode("utf-8")
+                    except UnicodeDecodeError:
+                        continue
+                    txt.write(f"FILE: {caminho}\n\n".encode("utf-8") + dados + b"\n\n---\n\n")
+        txts.append(path_txt)
+    return txts
+
+# ==============================================================
+# MÉTODOS DE CONCATENAÇÃO
+# ==============================================================
+
+def concatenar_read_text(txts, path_geral):
+    with open(path_geral, "w", encoding="utf-8", newline="") as geral:
+        for path_txt in txts:
+            geral.write(f"\n\n### INÍCIO DE {path_txt.name} ###\n\n")
+            geral.write(path_txt.read_text(encoding="utf-8"))
+
+def _concatenar_binario(txts, path_geral, copiar):
+    with open(path_geral, "wb") as geral:
+        for path_txt in txts:
+            geral.write(f"\n\n### INÍCIO DE {path_txt.name} ###\n\n".encode("utf-8"))
+            geral.flush()
+            with open(path_txt, "rb") as txt:
+                copiar(txt, geral, os.fstat(txt.fileno()).st_size)
+
+def _copiar_copyfileobj(txt, geral, tamanho):
+    shutil.copyfileobj(txt, geral)
+
+def _copiar_pelo_motor(copias):
+    """motor_consolidacao.copiar_intervalo tentando só as `copias` do kernel dadas."""
+    def copiar(txt, geral, tamanho):
+        originais = motor_consolidacao.COPIAS_NO_KERNEL
+        motor_consolidacao.COPIAS_NO_KERNEL = copias
+        try:
+            motor_consolidacao.copiar_intervalo(txt, geral, 0, tamanho)
+        finally:
+            motor_consolidacao.COPIAS_NO_KERNEL = originais
+    return copiar
+
+METODOS = {
+    "read_text": concatenar_read_text,
+    "copyfileobj": lambda txts, path: _concatenar_binario(txts, path, _copiar_copyfileobj),
+}
+_VARIANTES_MOTOR = [("copiar_intervalo", list(motor_consolidacao.COPIAS_NO_KERNEL))]
+_VARIANTES_MOTOR += [
+    (f"copiar_intervalo[{copia.__name__.lstrip('_')}]", [copia]) for copia in motor_consolidacao.COPIAS_NO_KERNEL
+]
+_VARIANTES_MOTOR.append(("copiar_intervalo[blocos]", []))
+for _nome, _copias in _VARIANTES_MOTOR:
+    METODOS[_nome] = lambda txts, path, copias=_copias: _concatenar_binario(txts, path, _copiar_pelo_motor(copias))
+
+# ==============================================================
+# EXECUÇÃO
+# ==============================================================
+
+def medir(repeticoes, escala):
+    with tempfile.TemporaryDirectory(prefix="bench_concat_") as tmp:
+        tmp = Path(tmp)
+        txts = montar_txts(tmp, escala)
+        total = sum(p.stat().st_size for p in txts)
+        print(f"{len(txts)} .txt por pasta, {total / 1e6:.1f} MB no total ({repeticoes} repetições)\n")
+
+        referencia = None
+        for nome, concatenar in METODOS.items():
+            path_geral = tmp / f"geral_{nome}.txt"
+            tempos = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                try:
+                    concatenar(txts, path_geral)
+                except OSError as e:
+                    print(f"{nome:<34} indisponível aqui ({e})")
+                    break
+                tempos.append(time.perf_counter() - inicio)
+
+            if not tempos:
+                continue
+
+            digest = hashlib.sha256(path_geral.read_bytes()).hexdigest()
+            referencia = referencia or digest
+            melhor = min(tempos)
+            aviso = "" if digest == referencia else "   SAÍDA DIFERENTE!"
+            print(f"{nome:<34} melhor {melhor * 1000:8.2f} ms   {total / melhor / 1e6:8.1f} MB/s{aviso}")
+            path_geral.unlink()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara métodos de concatenação da consolidação geral.")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--escala", type=int, default=1, help="repete cada arquivo N vezes")
+    args = parser.parse_args()
+    medir(args.repeticoes, args.escala)